@@ -0,0 +1,128 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Hashable, Iterator, List, Optional, Set
+
+from PipelineProfiler import PipelineProfiler
+
+# Stages in the order RunAnalysis reports them, used to turn the current stage into a fraction
+AnalysisStages = ["Download", "Hash", "Features", "Model", "Evaluation", "Decode", "Backtest", "Store"]
+
+
+class JobCancelled(Exception):
+    """Raised inside a job at its next stage or indicator boundary after it was cancelled."""
+
+
+class JobProgress(PipelineProfiler):
+    """
+    Profiler that doubles as the progress and cancellation channel of a job.
+
+    Every section the pipeline opens updates the current stage, and opening a
+    section after Cancel raises JobCancelled, so a run stops at the next stage or
+    indicator boundary without any extra hooks in the pipeline.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(TrackMemory=False)
+        self.CurrentStage: Optional[str] = None
+        self.CompletedStages: List[str] = []
+        self.CancelRequested = threading.Event()
+
+    @contextmanager
+    def Section(self, Name: str, Category: str = "Stage") -> Iterator[Dict]:
+        if self.CancelRequested.is_set():
+            raise JobCancelled(f"Cancelled before {Name}")
+        if Category == "Stage":
+            self.CurrentStage = Name
+        with super().Section(Name, Category) as Record:
+            yield Record
+        if Category == "Stage":
+            self.CompletedStages.append(Name)
+
+    @property
+    def Fraction(self) -> float:
+        """Share of AnalysisStages completed so far."""
+        return len(set(self.CompletedStages) & set(AnalysisStages)) / len(AnalysisStages)
+
+
+class AnalysisJob:
+    """A submitted computation with its future, progress and the sessions waiting for it."""
+
+    def __init__(self, Key: Hashable) -> None:
+        self.Key = Key
+        self.Progress = JobProgress()
+        self.Future: Optional[Future] = None
+        self.Subscribers: Set[Hashable] = set()
+
+    @property
+    def Status(self) -> str:
+        """One of Queued, Running, Cancelled, Failed or Finished."""
+        if self.Future is None or (not self.Future.running() and not self.Future.done()):
+            return "Cancelled" if self.Progress.CancelRequested.is_set() else "Queued"
+        if not self.Future.done():
+            return "Running"
+        if self.Future.cancelled() or isinstance(self.Future.exception(), JobCancelled):
+            return "Cancelled"
+        return "Failed" if self.Future.exception() is not None else "Finished"
+
+    def Result(self) -> object:
+        """Return the result of a finished job; raises the job's exception if it failed."""
+        return self.Future.result()
+
+
+class JobManager:
+    """
+    Runs analyses on a background thread pool so the dashboard stays responsive.
+
+    Jobs are keyed by their inputs. Submitting a key that is queued, running or
+    finished returns the existing job, so identical requests from several
+    sessions share one computation and finished results are served again until
+    they drop out of the last FinishedJobs entries. A job is only cancelled when
+    every session that submitted it has cancelled.
+    """
+
+    def __init__(self, Workers: int = 2, FinishedJobs: int = 16) -> None:
+        self.Executor = ThreadPoolExecutor(max_workers=Workers, thread_name_prefix="Analysis")
+        self.FinishedJobs = FinishedJobs
+        self.Jobs: "OrderedDict[Hashable, AnalysisJob]" = OrderedDict()
+        self.Lock = threading.Lock()
+
+    def Submit(self, Key: Hashable, Function: Callable[[JobProgress], object],
+               Subscriber: Hashable = None) -> AnalysisJob:
+        """
+        Start Function(Progress) for Key unless a live or finished job for Key exists.
+        Function must open its stages as Progress sections, e.g. by passing it as the profiler.
+        """
+        with self.Lock:
+            Job = self.Jobs.get(Key)
+            # A cancelled job may still be running up to its next section, but it will not finish
+            if Job is None or Job.Progress.CancelRequested.is_set() or Job.Status == "Failed":
+                Job = AnalysisJob(Key)
+                self.Jobs[Key] = Job
+                Job.Future = self.Executor.submit(Function, Job.Progress)
+            self.Jobs.move_to_end(Key)
+            Job.Subscribers.add(Subscriber)
+            self._Evict()
+            return Job
+
+    def Get(self, Key: Hashable) -> Optional[AnalysisJob]:
+        with self.Lock:
+            return self.Jobs.get(Key)
+
+    def Cancel(self, Key: Hashable, Subscriber: Hashable = None) -> None:
+        """Withdraw Subscriber from the job and stop it once nobody is waiting for it any more."""
+        with self.Lock:
+            Job = self.Jobs.get(Key)
+            if Job is None:
+                return
+            Job.Subscribers.discard(Subscriber)
+            if not Job.Subscribers and not Job.Future.done():
+                Job.Progress.CancelRequested.set()
+                Job.Future.cancel()
+
+    def _Evict(self) -> None:
+        """Forget the oldest finished jobs beyond FinishedJobs; live jobs are always kept."""
+        Finished = [Key for Key, Job in self.Jobs.items() if Job.Future.done()]
+        for Key in Finished[:max(0, len(Finished) - self.FinishedJobs)]:
+            del self.Jobs[Key]
@@ -0,0 +1,231 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from BacktestingModule import RunBacktest
+from FeatureEngineering import DefaultIndicatorParameters, DefaultIndicators, FeatureEngineering
+from HiddenMarkovModel import HiddenMarkovModel
+from ModelEvaluation import EvaluateRegimePrediction
+from ModelRegistry import ModelRegistry
+from PipelineProfiler import AddFitReport, PipelineProfiler, ProfileSection
+
+
+def HashFrame(Data: pd.DataFrame) -> str:
+    """Return a content hash of a DataFrame covering its index, columns and values."""
+    Digest = hashlib.sha1(repr(list(Data.columns)).encode())
+    Digest.update(pd.util.hash_pandas_object(Data, index=True).to_numpy().tobytes())
+    return Digest.hexdigest()
+
+
+def _HashParameters(*Parts: object) -> str:
+    return hashlib.sha1(repr(Parts).encode()).hexdigest()
+
+
+def _CopyStats(Stats: pd.Series) -> pd.Series:
+    """Copy backtest statistics including the equity curve and trades frames they hold."""
+    Stats = Stats.copy()
+    for Key, Value in Stats.items():
+        if isinstance(Value, (pd.DataFrame, pd.Series)):
+            Stats[Key] = Value.copy()
+    return Stats
+
+
+class AnalysisPipeline:
+    """
+    Staged analysis pipeline: features -> scaled matrix and HMM fit -> decode -> evaluation -> backtest.
+
+    Every stage result is memoized under a hash of the input data and the parameters
+    it depends on, so rerunning with only new strategy parameters reuses the feature
+    frame, the fitted model and the decoded regimes and only reruns the backtest.
+    With a ModelRegistry and a ticker, fitted models are also persisted and reloaded
+    across sessions. A PipelineProfiler passed to Run records every stage, marking
+    the ones served from the cache, every indicator and the HMM fits. Runs are
+    serialized per pipeline, so one instance can be shared by background jobs.
+    """
+
+    def __init__(self, IndicatorsToApply: Optional[List[str]] = None,
+                 IndicatorParameters: Optional[Dict[str, Dict]] = None,
+                 NumberOfStates: int = 3, Iterations: int = 100, Restarts: int = 1, Workers: int = 1,
+                 CacheSize: int = 4, Registry: Optional[ModelRegistry] = None, CovarianceType: str = "full",
+                 VarianceRatio: Optional[float] = None, Whiten: bool = False) -> None:
+        self.IndicatorsToApply = DefaultIndicators if IndicatorsToApply is None else IndicatorsToApply
+        self.IndicatorParameters = DefaultIndicatorParameters if IndicatorParameters is None else IndicatorParameters
+        self.NumberOfStates = NumberOfStates
+        self.Iterations = Iterations
+        self.Restarts = Restarts
+        self.Workers = Workers
+        # Covariance and projection options of every HMM fit, including the holdout evaluation
+        self.ModelOptions = {"CovarianceType": CovarianceType, "VarianceRatio": VarianceRatio, "Whiten": Whiten}
+        self.CacheSize = CacheSize
+        self.Registry = Registry
+        self.StageCache: Dict[str, OrderedDict] = {}
+        self.ComputedStages: List[str] = []
+        self.Profiler: Optional[PipelineProfiler] = None
+        self.Lock = threading.RLock()
+
+    def _ModelArguments(self) -> Dict[str, object]:
+        """Constructor arguments shared by the pipeline's HMM fit and the holdout evaluation."""
+        return {"NumberOfStates": self.NumberOfStates, "Iterations": self.Iterations, "Restarts": self.Restarts,
+                "Workers": self.Workers, **self.ModelOptions}
+
+    def _ModelParametersKey(self, FeaturesKey: str) -> str:
+        return _HashParameters(FeaturesKey, self.NumberOfStates, self.Iterations, self.Restarts, self.ModelOptions)
+
+    def _Memoize(self, Stage: str, Key: str, Compute: Callable[[], object]) -> object:
+        """Return the cached result of Stage for Key, computing and storing it on a miss."""
+        Cache = self.StageCache.setdefault(Stage, OrderedDict())
+        with ProfileSection(self.Profiler, Stage) as Record:
+            Record["Cached"] = Key in Cache
+            if Key in Cache:
+                Cache.move_to_end(Key)
+                return Cache[Key]
+            Result = Compute()
+        self.ComputedStages.append(Stage)
+        Cache[Key] = Result
+        if len(Cache) > self.CacheSize:
+            Cache.popitem(last=False)
+        return Result
+
+    def ComputeFeatures(self, Data: pd.DataFrame, DataKey: str) -> Tuple[str, pd.DataFrame, List[str]]:
+        """Apply the technical indicators and LogReturn; returns the stage key, frame and feature columns."""
+        Key = _HashParameters(DataKey, self.IndicatorsToApply, self.IndicatorParameters)
+
+        def Compute() -> Tuple[pd.DataFrame, List[str]]:
+            Features = FeatureEngineering(self.Profiler).ApplyTechnicalAnalysis(
+                Data, self.IndicatorsToApply, self.IndicatorParameters
+            )
+            Features["LogReturn"] = np.log(Features["Close"]).diff()
+            OriginalColumns = ["Open", "High", "Low", "Close", "Volume"]
+            FeatureColumns = [Column for Column in Features.columns if Column not in OriginalColumns]
+            return Features, FeatureColumns
+
+        Features, FeatureColumns = self._Memoize("Features", Key, Compute)
+        return Key, Features, FeatureColumns
+
+    def FitModel(self, FeaturesKey: str, Features: pd.DataFrame, FeatureColumns: List[str],
+                 TickerSymbol: Optional[str] = None,
+                 Interval: Optional[str] = None) -> Tuple[str, HiddenMarkovModel, pd.Index, np.ndarray]:
+        """
+        Scale the training rows once and fit the HMM, or load it from the registry when one
+        is configured; returns the key, model, row index and scaled matrix.
+        """
+        Key = self._ModelParametersKey(FeaturesKey)
+
+        def Compute() -> Tuple[HiddenMarkovModel, pd.Index, np.ndarray]:
+            CleanData = Features.dropna(subset=FeatureColumns + ["LogReturn"])
+            if CleanData.empty:
+                raise ValueError(
+                    "No data available to train the HMM. "
+                    "Please ensure your dataset has sufficient rows without missing values for all features."
+                )
+            RegistryKey = None
+            if self.Registry is not None and TickerSymbol is not None:
+                RegistryKey = (
+                    TickerSymbol, Interval, FeatureColumns, CleanData.index[0], CleanData.index[-1],
+                    self.IndicatorParameters,
+                    {"NumberOfStates": self.NumberOfStates, "Iterations": self.Iterations, "Restarts": self.Restarts,
+                     **self.ModelOptions},
+                    FeaturesKey,
+                )
+                with ProfileSection(self.Profiler, "RegistryLoad", "Model") as Record:
+                    Model = self.Registry.Load(*RegistryKey)
+                    Record["Found"] = Model is not None
+                if Model is not None:
+                    return Model, CleanData.index, Model.TransformFeatures(CleanData[FeatureColumns].values)
+
+            Model = HiddenMarkovModel(**self._ModelArguments())
+            ScaledMatrix = Model.FitTransformFeatures(CleanData[FeatureColumns].values)
+            with ProfileSection(self.Profiler, "Fit", "Model") as Record:
+                Model.FitMatrix(ScaledMatrix, CleanData["LogReturn"].to_numpy())
+                AddFitReport(Record, Model.FitReport)
+            Model.TrainingIndex = CleanData.index
+            Model.FeatureColumns = list(FeatureColumns)
+            if RegistryKey is not None:
+                self.Registry.Save(Model, *RegistryKey)
+            return Model, CleanData.index, ScaledMatrix
+
+        Model, TrainingIndex, ScaledMatrix = self._Memoize("Model", Key, Compute)
+        return Key, Model, TrainingIndex, ScaledMatrix
+
+    def DecodeRegimes(self, ModelKey: str, Features: pd.DataFrame, FeatureColumns: List[str],
+                      Model: HiddenMarkovModel, TrainingIndex: pd.Index, ScaledMatrix: np.ndarray) -> pd.DataFrame:
+        """
+        Add Regime, MostLikelyState and StateProbability, the latter two shifted to the next bar,
+        and record ModelKey as the frame's RegimeKey attribute. Reuses the training matrix and Viterbi path when the decoded rows are the training rows.
+        """
+
+        def Compute() -> pd.DataFrame:
+            ResultData = Features.copy()
+            DecodeIndex = Features.dropna(subset=FeatureColumns).index
+            if DecodeIndex.equals(TrainingIndex):
+                ResultData = Model.AssignRegimes(ResultData, DecodeIndex, ScaledMatrix, Model.TrainingStates)
+            else:
+                DecodeMatrix = Model.TransformFeatures(Features.loc[DecodeIndex, FeatureColumns].values)
+                ResultData = Model.AssignRegimes(ResultData, DecodeIndex, DecodeMatrix)
+            ResultData["MostLikelyState"] = ResultData["MostLikelyState"].shift(-1)
+            ResultData["StateProbability"] = ResultData["StateProbability"].shift(-1)
+            # Lets a ResultsStore keep one copy of the regimes per model however many backtests use them
+            ResultData.attrs["RegimeKey"] = ModelKey
+            return ResultData
+
+        return self._Memoize("Decode", ModelKey, Compute)
+
+    def Evaluate(self, FeaturesKey: str, Features: pd.DataFrame, FeatureColumns: List[str]) -> Dict[str, float]:
+        """Holdout evaluation; it trains its own HMM, configured like FitModel's, on the first part of the data."""
+        return self._Memoize(
+            "Evaluation",
+            self._ModelParametersKey(FeaturesKey),
+            lambda: EvaluateRegimePrediction(
+                Features, FeatureColumns, Profiler=self.Profiler, ModelOptions=self._ModelArguments()
+            ),
+        )
+
+    def Run(self, Data: pd.DataFrame, TrailingTakeProfit: float, RiskPercent: float,
+            StateProbabilityThreshold: float, Engine: str = "event", TickerSymbol: Optional[str] = None,
+            Interval: Optional[str] = None,
+            Profiler: Optional[PipelineProfiler] = None) -> Tuple[pd.DataFrame, Dict[str, float], pd.Series]:
+        """
+        Run every stage, reusing memoized results, and return processed data,
+        evaluation metrics and backtest statistics like RunAnalysis. TickerSymbol and
+        Interval identify the model in the registry; Profiler collects the timings.
+        The results are copies, so callers may modify them without touching the cache.
+        """
+        with self.Lock:
+            self.ComputedStages = []
+            self.Profiler = Profiler
+            try:
+                RegimeData, Metrics, Stats = self._RunStages(
+                    Data, TrailingTakeProfit, RiskPercent, StateProbabilityThreshold, Engine, TickerSymbol, Interval
+                )
+            finally:
+                self.Profiler = None
+        return RegimeData.copy(), dict(Metrics), _CopyStats(Stats)
+
+    def _RunStages(self, Data: pd.DataFrame, TrailingTakeProfit: float, RiskPercent: float,
+                   StateProbabilityThreshold: float, Engine: str, TickerSymbol: Optional[str],
+                   Interval: Optional[str]) -> Tuple[pd.DataFrame, Dict[str, float], pd.Series]:
+        with ProfileSection(self.Profiler, "Hash"):
+            DataKey = HashFrame(Data)
+        FeaturesKey, Features, FeatureColumns = self.ComputeFeatures(Data, DataKey)
+        ModelKey, Model, TrainingIndex, ScaledMatrix = self.FitModel(
+            FeaturesKey, Features, FeatureColumns, TickerSymbol, Interval
+        )
+        Metrics = self.Evaluate(FeaturesKey, Features, FeatureColumns)
+        RegimeData = self.DecodeRegimes(ModelKey, Features, FeatureColumns, Model, TrainingIndex, ScaledMatrix)
+        BacktestKey = _HashParameters(ModelKey, TrailingTakeProfit, RiskPercent, StateProbabilityThreshold, Engine)
+        Stats = self._Memoize(
+            "Backtest",
+            BacktestKey,
+            lambda: RunBacktest(
+                RegimeData,
+                TrailingTakeProfit=TrailingTakeProfit,
+                RiskPercent=RiskPercent,
+                StateProbabilityThreshold=StateProbabilityThreshold,
+                Engine=Engine,
+            ),
+        )
+        return RegimeData, Metrics, Stats
@@ -1,5 +1,11 @@
 from backtesting import Backtest, Strategy
+from backtesting._stats import compute_stats
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from multiprocessing import shared_memory
+import numpy as np
 import pandas as pd
+from typing import Dict, List, Optional, Sequence, Tuple
 
 
 class RegimeStrategy(Strategy):
@@ -79,12 +85,221 @@ class RegimeStrategy(Strategy):
                 self.LowPrice = None
 
 
+def _ScanTradeExit(
+    Open: np.ndarray,
+    High: np.ndarray,
+    Low: np.ndarray,
+    Close: np.ndarray,
+    ExitSignal: np.ndarray,
+    FillBar: int,
+    Direction: int,
+    StopPrice: float,
+    ExtremePrice: float,
+    TrailingTakeProfit: float,
+) -> Tuple[int, bool]:
+    """
+    Find the first bar at or after FillBar where an open trade is exited.
+
+    The search runs over geometrically growing array windows so each trade costs
+    work proportional to its own length. Returns the bar index and whether the
+    exit came from the stop-loss order (True) or from the strategy (False);
+    the bar index equals len(Close) when the trade is still open at the end.
+    """
+    Length = len(Close)
+    Start = FillBar
+    Width = 256
+    while Start < Length:
+        Stop = min(Length, Start + Width)
+        CloseWindow = Close[Start:Stop]
+        if Direction > 0:
+            StopHit = Low[Start:Stop] <= StopPrice
+            Extremes = np.maximum.accumulate(np.maximum(CloseWindow, ExtremePrice))
+            TrailHit = CloseWindow <= Extremes * (1 - TrailingTakeProfit)
+        else:
+            StopHit = High[Start:Stop] >= StopPrice
+            Extremes = np.minimum.accumulate(np.minimum(CloseWindow, ExtremePrice))
+            TrailHit = CloseWindow >= Extremes * (1 + TrailingTakeProfit)
+        Hits = np.flatnonzero(StopHit | TrailHit | ExitSignal[Start:Stop])
+        if Hits.size:
+            Bar = Start + int(Hits[0])
+            return Bar, bool(StopHit[Hits[0]])
+        ExtremePrice = Extremes[-1]
+        Start = Stop
+        Width *= 2
+    return Length, False
+
+
+def _RunVectorizedBacktest(
+    Data: pd.DataFrame,
+    TrailingTakeProfit: float,
+    RiskPercent: float,
+    StateProbabilityThreshold: float,
+    Cash: float,
+) -> pd.Series:
+    """
+    Reproduce RegimeStrategy on NumPy arrays without the per-bar Strategy loop.
+
+    Signals are evaluated for every bar at once, then the simulation jumps from
+    one entry signal to the next and locates each exit with array scans. Order
+    handling follows backtesting.py: market orders fill at the next bar's open,
+    the entry stop-loss is checked intrabar from the fill bar onwards and
+    trades still open at the end are left out of the trade list.
+    """
+    Open = Data["Open"].to_numpy(dtype=float)
+    High = Data["High"].to_numpy(dtype=float)
+    Low = Data["Low"].to_numpy(dtype=float)
+    Close = Data["Close"].to_numpy(dtype=float)
+    Regime = Data["Regime"].to_numpy()
+    PredictedState = Data["MostLikelyState"].to_numpy()
+    Confident = Data["StateProbability"].to_numpy(dtype=float) >= StateProbabilityThreshold
+
+    IsUptrend = Regime == "Uptrend"
+    IsDowntrend = Regime == "Downtrend"
+    LongSignal = IsUptrend & (PredictedState == "Uptrend") & Confident
+    ShortSignal = IsDowntrend & (PredictedState == "Downtrend") & Confident
+    Sideway = ~(IsUptrend | IsDowntrend)
+    LongExit = Sideway | ShortSignal
+    ShortExit = Sideway | LongSignal
+    # The strategy only starts acting on the second bar
+    EntryBars = np.flatnonzero(LongSignal | ShortSignal)
+    EntryBars = EntryBars[EntryBars >= 1]
+
+    Length = len(Close)
+    CashChange = np.zeros(Length)
+    Unrealized = np.zeros(Length)
+    Trades: List[dict] = []
+    RiskCapital = Cash * RiskPercent
+    Balance = Cash
+    OutOfMoneyBar = None
+
+    def _OrderSize(SignalBar: int, CurrentEquity: float) -> int:
+        Price = Close[SignalBar]
+        RiskPerUnit = Price * TrailingTakeProfit
+        Size = int(RiskCapital / RiskPerUnit) if RiskPerUnit else 0
+        Size = min(Size, int(CurrentEquity / Price))
+        return max(Size, 1)
+
+    Bar = 1
+    PendingEntry = None
+    while True:
+        if PendingEntry is None:
+            Position = np.searchsorted(EntryBars, Bar)
+            if Position == len(EntryBars):
+                break
+            SignalBar = int(EntryBars[Position])
+            Direction = 1 if LongSignal[SignalBar] else -1
+            PendingEntry = (SignalBar, Direction, _OrderSize(SignalBar, Balance))
+
+        SignalBar, Direction, Size = PendingEntry
+        PendingEntry = None
+        FillBar = SignalBar + 1
+        if FillBar >= Length:
+            break
+        EntryPrice = Open[FillBar]
+        if Size * EntryPrice > Balance:
+            # The broker cancels orders that exceed the available margin
+            Bar = FillBar
+            continue
+
+        SignalClose = Close[SignalBar]
+        StopPrice = SignalClose * (1 - Direction * TrailingTakeProfit)
+        ExitSignal = LongExit if Direction > 0 else ShortExit
+        ExitBar, StoppedOut = _ScanTradeExit(
+            Open, High, Low, Close, ExitSignal, FillBar, Direction,
+            StopPrice, SignalClose, TrailingTakeProfit,
+        )
+        SignedSize = Direction * Size
+        if StoppedOut:
+            ExitPrice = min(Open[ExitBar], StopPrice) if Direction > 0 else max(Open[ExitBar], StopPrice)
+            CloseBar = ExitBar
+        else:
+            CloseBar = ExitBar + 1
+            ExitPrice = Open[CloseBar] if CloseBar < Length else np.nan
+
+        HeldEquity = Balance + SignedSize * (Close[FillBar:min(CloseBar, Length)] - EntryPrice)
+        Broke = np.flatnonzero(HeldEquity <= 0)
+        if Broke.size:
+            OutOfMoneyBar = FillBar + int(Broke[0])
+            CloseBar = OutOfMoneyBar
+            ExitPrice = Close[OutOfMoneyBar]
+            HeldEquity = HeldEquity[: Broke[0]]
+        Unrealized[FillBar:FillBar + len(HeldEquity)] = HeldEquity - Balance
+
+        if CloseBar >= Length:
+            break
+        ProfitLoss = SignedSize * (ExitPrice - EntryPrice)
+        CashChange[CloseBar] += ProfitLoss
+        Trades.append(
+            {
+                "Size": SignedSize,
+                "EntryBar": FillBar,
+                "ExitBar": CloseBar,
+                "EntryPrice": EntryPrice,
+                "ExitPrice": ExitPrice,
+                "SL": StopPrice,
+                "TP": None,
+                "PnL": ProfitLoss,
+                "Commission": 0.0,
+                "ReturnPct": Direction * (ExitPrice / EntryPrice - 1),
+            }
+        )
+        if OutOfMoneyBar is not None:
+            break
+
+        if StoppedOut:
+            Balance += ProfitLoss
+            Bar = ExitBar
+        elif ExitSignal[ExitBar] and not Sideway[ExitBar]:
+            # Reversal: the opposite entry is sized on equity at the signal bar
+            SignalEquity = Balance + SignedSize * (Close[ExitBar] - EntryPrice)
+            Balance += ProfitLoss
+            PendingEntry = (ExitBar, -Direction, _OrderSize(ExitBar, SignalEquity))
+        else:
+            Balance += ProfitLoss
+            Bar = CloseBar
+
+    Equity = Cash + np.cumsum(CashChange) + Unrealized
+    if Length > 1:
+        Equity[0] = Equity[1]
+    if OutOfMoneyBar is not None:
+        Equity[OutOfMoneyBar:] = 0
+
+    TradeColumns = [
+        "Size", "EntryBar", "ExitBar", "EntryPrice", "ExitPrice", "SL", "TP",
+        "PnL", "Commission", "ReturnPct",
+    ]
+    TradesFrame = pd.DataFrame(Trades, columns=TradeColumns)
+    TradesFrame["EntryTime"] = Data.index[TradesFrame["EntryBar"].to_numpy(dtype=int)]
+    TradesFrame["ExitTime"] = Data.index[TradesFrame["ExitBar"].to_numpy(dtype=int)]
+    TradesFrame["Duration"] = TradesFrame["ExitTime"] - TradesFrame["EntryTime"]
+    TradesFrame["Tag"] = None
+    return compute_stats(
+        trades=TradesFrame,
+        equity=Equity,
+        ohlc_data=Data,
+        strategy_instance=None,
+        risk_free_rate=0.0,
+    )
+
+
 def RunBacktest(
     Data: pd.DataFrame,
     TrailingTakeProfit: float = 0.05,
     RiskPercent: float = 0.05,
     StateProbabilityThreshold: float = 0.6,
+    Engine: str = "event",
 ) -> pd.DataFrame:
+    """
+    Backtest RegimeStrategy on data carrying regime predictions.
+
+    Engine "event" runs backtesting.Backtest bar by bar. Engine "vectorized"
+    simulates the same strategy on NumPy arrays and returns the same statistics
+    keys and equity curve, much faster for long intraday histories and
+    parameter sweeps; its `_strategy` entry is None.
+    """
+    if Engine not in ("event", "vectorized"):
+        raise ValueError(f"Unknown backtest engine: {Engine}")
+
     RequiredColumns = {
         "Open",
         "High",
@@ -99,6 +314,14 @@ def RunBacktest(
         raise ValueError(f"Dataframe is missing required columns: {MissingCols}")
 
     CleanData = Data.dropna(subset=["Close", "Regime", "MostLikelyState", "StateProbability"])
+    if Engine == "vectorized":
+        return _RunVectorizedBacktest(
+            CleanData,
+            TrailingTakeProfit=TrailingTakeProfit,
+            RiskPercent=RiskPercent,
+            StateProbabilityThreshold=StateProbabilityThreshold,
+            Cash=10000,
+        )
     bt = Backtest(CleanData, RegimeStrategy, cash=10000, commission=0.0)
     stats = bt.run(
         TrailingTakeProfit=TrailingTakeProfit,
@@ -106,3 +329,134 @@ def RunBacktest(
         StateProbabilityThreshold=StateProbabilityThreshold,
     )
     return stats
+
+
+OptimizableParameters = ("TrailingTakeProfit", "RiskPercent", "StateProbabilityThreshold")
+_NumericColumns = ["Open", "High", "Low", "Close", "StateProbability"]
+_LabelColumns = ["Regime", "MostLikelyState"]
+_WorkerData: Optional[pd.DataFrame] = None
+
+
+def _ShareBacktestData(Data: pd.DataFrame) -> Tuple[shared_memory.SharedMemory, dict]:
+    """
+    Copy the columns used by RegimeStrategy into one shared memory block.
+
+    Prices and probabilities are stored as float64, regime labels as integer
+    category codes and a DatetimeIndex as int64 nanoseconds, all in a single
+    (columns x rows) matrix. Returns the block and the layout needed to rebuild
+    the frame.
+    """
+    Labels = sorted(
+        Label for Label in pd.unique(Data[_LabelColumns].to_numpy().ravel()) if not pd.isna(Label)
+    )
+    Rows = [Data[Column].to_numpy(dtype=np.float64) for Column in _NumericColumns]
+    for Column in _LabelColumns:
+        Codes = pd.Categorical(Data[Column], categories=Labels).codes
+        Rows.append(Codes.astype(np.float64))
+    Layout = {"Labels": Labels, "Length": len(Data), "Tz": None, "Index": None}
+    if isinstance(Data.index, pd.DatetimeIndex):
+        UtcIndex = Data.index.tz_convert(None) if Data.index.tz is not None else Data.index
+        Rows.append(UtcIndex.to_numpy(dtype="datetime64[ns]").view(np.float64))
+        Layout["Tz"] = Data.index.tz
+    else:
+        Layout["Index"] = Data.index
+
+    Block = shared_memory.SharedMemory(create=True, size=max(1, len(Rows) * len(Data) * 8))
+    Matrix = np.ndarray((len(Rows), len(Data)), dtype=np.float64, buffer=Block.buf)
+    for Position, Row in enumerate(Rows):
+        Matrix[Position] = Row
+    Layout["Name"] = Block.name
+    Layout["Rows"] = len(Rows)
+    return Block, Layout
+
+
+def _AttachBacktestData(Layout: dict) -> None:
+    """Process pool initializer that rebuilds the shared frame once per worker."""
+    global _WorkerData
+    Block = shared_memory.SharedMemory(name=Layout["Name"])
+    try:
+        Matrix = np.ndarray((Layout["Rows"], Layout["Length"]), dtype=np.float64, buffer=Block.buf)
+        Columns = {Column: Matrix[Position].copy() for Position, Column in enumerate(_NumericColumns)}
+        for Offset, Column in enumerate(_LabelColumns):
+            Codes = Matrix[len(_NumericColumns) + Offset].astype(np.int64)
+            Columns[Column] = pd.Categorical.from_codes(Codes, categories=Layout["Labels"])
+        if Layout["Index"] is None:
+            Nanoseconds = Matrix[-1].view(np.int64)
+            Index = pd.DatetimeIndex(Nanoseconds.astype("datetime64[ns]"))
+            if Layout["Tz"] is not None:
+                Index = Index.tz_localize("UTC").tz_convert(Layout["Tz"])
+        else:
+            Index = Layout["Index"]
+        _WorkerData = pd.DataFrame(Columns, index=Index)
+        for Column in _LabelColumns:
+            _WorkerData[Column] = _WorkerData[Column].astype(object)
+    finally:
+        Block.close()
+
+
+def _RunGridPoint(Task: Tuple[Dict[str, float], str]) -> Dict[str, object]:
+    Parameters, Engine = Task
+    Stats = RunBacktest(_WorkerData, Engine=Engine, **Parameters)
+    Row: Dict[str, object] = dict(Parameters)
+    for Key, Value in Stats.items():
+        if not Key.startswith("_"):
+            Row[Key] = Value
+    return Row
+
+
+def OptimizeBacktest(
+    Data: pd.DataFrame,
+    Grid: Dict[str, Sequence[float]],
+    Workers: int = 1,
+    Maximize: str = "SQN",
+    Engine: str = "vectorized",
+) -> pd.DataFrame:
+    """
+    Run RunBacktest for every combination of the grid across a process pool.
+
+    Grid maps strategy parameter names (TrailingTakeProfit, RiskPercent,
+    StateProbabilityThreshold) to candidate values; parameters left out keep
+    their RunBacktest defaults. The OHLCV and regime columns are placed in
+    shared memory once and attached by each worker, so only parameter dicts
+    travel to the pool. Returns one row of statistics per combination, ranked
+    by the Maximize column.
+    """
+    global _WorkerData
+    UnknownParameters = set(Grid) - set(OptimizableParameters)
+    if UnknownParameters:
+        raise ValueError(f"Unknown strategy parameters in grid: {UnknownParameters}")
+    if Workers < 1:
+        raise ValueError("Workers must be at least 1")
+
+    Names = list(Grid)
+    Tasks = [(dict(zip(Names, Values)), Engine) for Values in product(*(Grid[Name] for Name in Names))]
+    if not Tasks:
+        return pd.DataFrame(columns=Names)
+
+    RequiredColumns = set(_NumericColumns + _LabelColumns)
+    MissingCols = RequiredColumns - set(Data.columns)
+    if MissingCols:
+        raise ValueError(f"Dataframe is missing required columns: {MissingCols}")
+
+    Block, Layout = _ShareBacktestData(Data)
+    try:
+        if Workers == 1:
+            _AttachBacktestData(Layout)
+            try:
+                Rows = [_RunGridPoint(Task) for Task in Tasks]
+            finally:
+                _WorkerData = None
+        else:
+            ChunkSize = max(1, len(Tasks) // (Workers * 4))
+            with ProcessPoolExecutor(
+                max_workers=Workers, initializer=_AttachBacktestData, initargs=(Layout,)
+            ) as Executor:
+                Rows = list(Executor.map(_RunGridPoint, Tasks, chunksize=ChunkSize))
+    finally:
+        Block.close()
+        Block.unlink()
+
+    Results = pd.DataFrame(Rows)
+    if Maximize in Results.columns:
+        Results = Results.sort_values(Maximize, ascending=False, na_position="last")
+    return Results.reset_index(drop=True)
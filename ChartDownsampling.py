@@ -0,0 +1,112 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+def MinMaxDownsample(Values: pd.Series, Points: int = 2000) -> pd.Series:
+    """
+    Reduce Values to about Points rows by keeping the minimum and maximum of each bucket.
+
+    Buckets hold equal numbers of bars, so every peak and trough survives at its own
+    timestamp and the series' visual envelope is unchanged. The first and last bars
+    are always kept.
+    """
+    Values = Values.dropna()
+    Length = len(Values)
+    if Length <= Points:
+        return Values
+    Width = -(-Length // max(1, Points // 2))
+    Rows = -(-Length // Width)
+    # Padding with the last value never wins a tie because argmin/argmax return the first occurrence
+    Grid = np.pad(Values.to_numpy(dtype=np.float64), (0, Rows * Width - Length), mode="edge").reshape(Rows, Width)
+    Offsets = np.arange(Rows) * Width
+    Keep = np.unique(np.r_[0, Offsets + Grid.argmin(axis=1), Offsets + Grid.argmax(axis=1), Length - 1])
+    return Values.iloc[Keep]
+
+
+def LargestTriangleThreeBuckets(Values: pd.Series, Points: int = 2000) -> pd.Series:
+    """
+    Reduce Values to Points rows with the Largest-Triangle-Three-Buckets algorithm.
+
+    Each bucket keeps the bar forming the largest triangle with the bar kept from
+    the previous bucket and the average of the next one, which follows the shape
+    of the line more closely than min/max bucketing at the same number of points.
+    Bars are spaced by position, so overnight and weekend gaps do not skew the areas.
+    """
+    Values = Values.dropna()
+    Length = len(Values)
+    if Length <= Points or Points < 3:
+        return Values
+    Y = Values.to_numpy(dtype=np.float64)
+    X = np.arange(Length, dtype=np.float64)
+    # Points - 2 buckets between the first and the last bar, which are always kept
+    Edges = np.linspace(1, Length - 1, Points - 1).astype(np.int64)
+    Selected = np.empty(Points, dtype=np.int64)
+    Selected[0], Selected[-1] = 0, Length - 1
+    Previous = 0
+    for Bucket in range(Points - 2):
+        Start, Stop = Edges[Bucket], Edges[Bucket + 1]
+        NextStop = Edges[Bucket + 2] if Bucket + 2 < len(Edges) else Length
+        AverageX = X[Stop:NextStop].mean()
+        AverageY = Y[Stop:NextStop].mean()
+        Areas = np.abs(
+            (X[Previous] - AverageX) * (Y[Start:Stop] - Y[Previous])
+            - (X[Previous] - X[Start:Stop]) * (AverageY - Y[Previous])
+        )
+        Previous = Start + int(Areas.argmax())
+        Selected[Bucket + 1] = Previous
+    return Values.iloc[Selected]
+
+
+DownsamplingMethods = {
+    "minmax": MinMaxDownsample,
+    "lttb": LargestTriangleThreeBuckets,
+}
+
+
+def WindowSeries(Values: pd.Series, Start: Optional[object] = None, End: Optional[object] = None,
+                 Points: int = 2000, Method: str = "minmax") -> pd.Series:
+    """
+    Slice Values to the visible range [Start, End] and downsample only that window,
+    so zooming in shows full resolution once the window holds fewer than Points bars.
+    """
+    if Method not in DownsamplingMethods:
+        raise ValueError(f"Unknown downsampling method '{Method}'. Choose from {list(DownsamplingMethods)}.")
+    return DownsamplingMethods[Method](Values.loc[Start:End], Points)
+
+
+def RegimeSpans(Regimes: pd.Series) -> pd.DataFrame:
+    """
+    Run-length encode a per-bar regime series into Start, End, Regime and Bars columns.
+
+    Each span ends where the next one starts so the shading tiles the chart; the last
+    span ends at the last bar. Bars without a regime, such as the indicator warm-up,
+    are left unshaded.
+    """
+    Codes, Labels = pd.factorize(Regimes)
+    # A window inside the warm-up has rows but no regime to shade
+    if not (Codes >= 0).any():
+        return pd.DataFrame({"Start": Regimes.index[:0], "End": Regimes.index[:0],
+                             "Regime": pd.Categorical([], categories=Labels), "Bars": np.empty(0, dtype=np.int64)})
+    Starts = np.flatnonzero(np.r_[True, Codes[1:] != Codes[:-1]])
+    Stops = np.r_[Starts[1:], len(Codes)]
+    Spans = pd.DataFrame({
+        "Start": Regimes.index[Starts],
+        "End": Regimes.index[np.minimum(Stops, len(Codes) - 1)],
+        "Regime": pd.Categorical.from_codes(np.maximum(Codes[Starts], 0), categories=Labels),
+        "Bars": Stops - Starts,
+    })
+    return Spans[Codes[Starts] >= 0].reset_index(drop=True)
+
+
+def ClipSpans(Spans: pd.DataFrame, Start: Optional[object] = None, End: Optional[object] = None) -> pd.DataFrame:
+    """Keep the spans overlapping [Start, End] and clip their bounds to it; Bars still counts the whole run."""
+    Spans = Spans.copy()
+    if Start is not None:
+        Spans = Spans[Spans["End"] >= Start]
+        Spans["Start"] = Spans["Start"].clip(lower=Start)
+    if End is not None:
+        Spans = Spans[Spans["Start"] <= End]
+        Spans["End"] = Spans["End"].clip(upper=End)
+    return Spans.reset_index(drop=True)
@@ -1,9 +1,21 @@
+import json
+import os
+import re
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
 import pandas as pd
-import yfinance as yf
+import pyarrow as pa
+import pyarrow.feather as feather
 
 
 def DownloadTradingData(TickerSymbol: str, StartDate: str, EndDate: str, Interval: str) -> pd.DataFrame:
     """Download OHLCV trading data from yfinance and return a DataFrame with a MultiIndex."""
+    # Imported here so the cache can run offline with another Downloader
+    import yfinance as yf
+
     Data = yf.download(
         tickers=TickerSymbol,
         start=StartDate,
@@ -19,3 +31,158 @@ def DownloadTradingData(TickerSymbol: str, StartDate: str, EndDate: str, Interva
     Data = Data.loc[:, Data.columns.get_level_values(1).isin(OhlcvColumns)]
     Data.columns = Data.columns.droplevel(0)
     return Data
+
+
+def _SubtractRanges(
+    Start: pd.Timestamp, End: pd.Timestamp, Covered: List[Tuple[pd.Timestamp, pd.Timestamp]]
+) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+    """Return the parts of [Start, End) that are not inside any covered [start, end) range."""
+    Missing = []
+    Cursor = Start
+    for CoveredStart, CoveredEnd in sorted(Covered):
+        if CoveredEnd <= Cursor:
+            continue
+        if CoveredStart >= End:
+            break
+        if CoveredStart > Cursor:
+            Missing.append((Cursor, CoveredStart))
+        Cursor = max(Cursor, CoveredEnd)
+        if Cursor >= End:
+            break
+    if Cursor < End:
+        Missing.append((Cursor, End))
+    return Missing
+
+
+def _MergeRanges(Ranges: List[Tuple[pd.Timestamp, pd.Timestamp]]) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+    """Merge overlapping or touching [start, end) ranges."""
+    Merged: List[Tuple[pd.Timestamp, pd.Timestamp]] = []
+    for RangeStart, RangeEnd in sorted(Ranges):
+        if Merged and RangeStart <= Merged[-1][1]:
+            Merged[-1] = (Merged[-1][0], max(Merged[-1][1], RangeEnd))
+        else:
+            Merged.append((RangeStart, RangeEnd))
+    return Merged
+
+
+_EntryLocks: Dict[str, threading.Lock] = {}
+_EntryLocksGuard = threading.Lock()
+
+
+def _EntryLock(DataPath: str) -> threading.Lock:
+    """Return the lock of one cache entry, shared by every OhlcvCache in the process."""
+    with _EntryLocksGuard:
+        return _EntryLocks.setdefault(os.path.abspath(DataPath), threading.Lock())
+
+
+def _AlignToIndex(Value: pd.Timestamp, Index: pd.Index) -> pd.Timestamp:
+    """Localize a naive date to the index timezone so both can be compared."""
+    Timezone = getattr(Index, "tz", None)
+    if Timezone is not None and Value.tzinfo is None:
+        return Value.tz_localize(Timezone)
+    return Value
+
+
+class OhlcvCache:
+    """
+    Persistent OHLCV cache with one Arrow IPC file per ticker and interval.
+    Only date ranges that were never downloaded before are fetched, and a range
+    that comes back empty on a weekday is fetched again on the next Load; cached
+    files are read through memory maps. Loads of the same ticker and interval are
+    serialized, so concurrent jobs and batch downloads never lose each other's ranges.
+    """
+
+    def __init__(self, CacheDirectory: str = ".ohlcv_cache",
+                 Downloader: Callable[[str, str, str, str], pd.DataFrame] = DownloadTradingData):
+        """
+        Args:
+            CacheDirectory: Directory that holds the cached files
+            Downloader: Function with the signature of DownloadTradingData used to fetch
+                missing ranges; a local fixture can be passed to work offline
+        """
+        self.CacheDirectory = CacheDirectory
+        self.Downloader = Downloader
+        os.makedirs(CacheDirectory, exist_ok=True)
+
+    def _GetPaths(self, TickerSymbol: str, Interval: str) -> Tuple[str, str]:
+        Key = re.sub(r"[^A-Za-z0-9_.-]", "_", f"{TickerSymbol}_{Interval}")
+        Base = os.path.join(self.CacheDirectory, Key)
+        return f"{Base}.arrow", f"{Base}.json"
+
+    def _ReadCoverage(self, MetadataPath: str) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+        if not os.path.exists(MetadataPath):
+            return []
+        with open(MetadataPath) as MetadataFile:
+            Metadata = json.load(MetadataFile)
+        return [(pd.Timestamp(Start), pd.Timestamp(End)) for Start, End in Metadata["Ranges"]]
+
+    def _ReadFrame(self, DataPath: str) -> Optional[pd.DataFrame]:
+        if not os.path.exists(DataPath):
+            return None
+        return feather.read_table(DataPath, memory_map=True).to_pandas()
+
+    def _WriteFrame(self, DataPath: str, MetadataPath: str, Data: pd.DataFrame,
+                    Coverage: List[Tuple[pd.Timestamp, pd.Timestamp]]) -> None:
+        # Write to uniquely named temporary files first so a crash never leaves a half-written
+        # cache entry and two writers never share a temporary file
+        Suffix = f".{uuid.uuid4().hex}.tmp"
+        Table = pa.Table.from_pandas(Data, preserve_index=True)
+        feather.write_feather(Table, DataPath + Suffix, compression="uncompressed")
+        with open(MetadataPath + Suffix, "w") as MetadataFile:
+            json.dump({"Ranges": [[Start.isoformat(), End.isoformat()] for Start, End in Coverage]}, MetadataFile)
+        os.replace(DataPath + Suffix, DataPath)
+        os.replace(MetadataPath + Suffix, MetadataPath)
+
+    def Load(self, TickerSymbol: str, StartDate: str, EndDate: str, Interval: str) -> pd.DataFrame:
+        """Return OHLCV data for [StartDate, EndDate), downloading only the ranges not cached yet."""
+        DataPath, MetadataPath = self._GetPaths(TickerSymbol, Interval)
+        with _EntryLock(DataPath):
+            Cached = self._LoadLocked(TickerSymbol, StartDate, EndDate, Interval, DataPath, MetadataPath)
+        Start, End = pd.Timestamp(StartDate), pd.Timestamp(EndDate)
+        if Cached is None:
+            return pd.DataFrame(columns=["Open", "High", "Low", "Close", "Volume"])
+        Index = Cached.index
+        Mask = (Index >= _AlignToIndex(Start, Index)) & (Index < _AlignToIndex(End, Index))
+        return Cached.loc[Mask]
+
+    def _LoadLocked(self, TickerSymbol: str, StartDate: str, EndDate: str, Interval: str,
+                    DataPath: str, MetadataPath: str) -> Optional[pd.DataFrame]:
+        """Read the cache entry, download and merge its missing ranges and write it back."""
+        Start, End = pd.Timestamp(StartDate), pd.Timestamp(EndDate)
+        Coverage = self._ReadCoverage(MetadataPath)
+        Cached = self._ReadFrame(DataPath)
+
+        MissingRanges = _SubtractRanges(Start, End, Coverage)
+        if MissingRanges:
+            Frames = [] if Cached is None else [Cached]
+            FetchedRanges = []
+            for MissingStart, MissingEnd in MissingRanges:
+                Downloaded = self.Downloader(
+                    TickerSymbol, MissingStart.strftime("%Y-%m-%d"), MissingEnd.strftime("%Y-%m-%d"), Interval
+                )
+                if not Downloaded.empty:
+                    Frames.append(Downloaded)
+                    FetchedRanges.append((MissingStart, MissingEnd))
+                elif pd.bdate_range(MissingStart, MissingEnd, inclusive="left").empty:
+                    # A weekend has no bars; any other empty download may be a failed request, so it is retried
+                    FetchedRanges.append((MissingStart, MissingEnd))
+            if Frames:
+                Cached = pd.concat(Frames)
+                Cached = Cached[~Cached.index.duplicated(keep="last")].sort_index()
+            # Today's bars are still forming, so never mark today as covered
+            Today = pd.Timestamp.now().normalize()
+            NewCoverage = [(FetchedStart, min(FetchedEnd, Today)) for FetchedStart, FetchedEnd in FetchedRanges]
+            Coverage = _MergeRanges(Coverage + [Range for Range in NewCoverage if Range[0] < Range[1]])
+            if Cached is not None:
+                self._WriteFrame(DataPath, MetadataPath, Cached, Coverage)
+        return Cached
+
+
+def DownloadBatchTradingData(TickerSymbols: List[str], StartDate: str, EndDate: str, Interval: str,
+                             Cache: Optional[OhlcvCache] = None, Workers: int = 4) -> Dict[str, pd.DataFrame]:
+    """Load OHLCV data for several tickers through the cache, fetching tickers concurrently."""
+    if Cache is None:
+        Cache = OhlcvCache()
+    with ThreadPoolExecutor(max_workers=Workers) as Executor:
+        Frames = Executor.map(lambda Ticker: Cache.Load(Ticker, StartDate, EndDate, Interval), TickerSymbols)
+        return dict(zip(TickerSymbols, Frames))
@@ -1,15 +1,194 @@
+import inspect
+import math
+from collections import deque
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Callable, Optional
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import List, Dict, Callable, Deque, Optional, Tuple, Union
+
+from PipelineProfiler import PipelineProfiler, ProfileSection
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; the NumPy kernel is used instead
+    njit = None
+
+
+def _RollingMeanAbsoluteDeviationNumpy(Values: np.ndarray, Window: int, ChunkSize: int = 65536) -> np.ndarray:
+    """Rolling mean absolute deviation over strided window views, processed in chunks to bound memory."""
+    Result = np.full(len(Values), np.nan)
+    if Window < 1 or len(Values) < Window:
+        return Result
+    Windows = sliding_window_view(Values, Window)
+    for Start in range(0, len(Windows), ChunkSize):
+        Chunk = Windows[Start:Start + ChunkSize]
+        Means = Chunk.mean(axis=1, keepdims=True)
+        Result[Start + Window - 1:Start + Window - 1 + len(Chunk)] = np.abs(Chunk - Means).mean(axis=1)
+    return Result
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _RollingMeanAbsoluteDeviationCompiled(Values, Window):
+        Result = np.full(len(Values), np.nan)
+        for End in range(Window - 1, len(Values)):
+            Total = 0.0
+            for Position in range(End - Window + 1, End + 1):
+                Total += Values[Position]
+            Mean = Total / Window
+            Deviation = 0.0
+            for Position in range(End - Window + 1, End + 1):
+                Deviation += abs(Values[Position] - Mean)
+            Result[End] = Deviation / Window
+        return Result
+
+
+def RollingMeanAbsoluteDeviation(Values: np.ndarray, Window: int) -> np.ndarray:
+    """
+    Mean absolute deviation of each trailing window, NaN until the window is full.
+    Uses a numba kernel when numba is installed and the NumPy kernel otherwise.
+    """
+    Values = np.ascontiguousarray(Values, dtype=np.float64)
+    if njit is not None and Window >= 1:
+        return _RollingMeanAbsoluteDeviationCompiled(Values, Window)
+    return _RollingMeanAbsoluteDeviationNumpy(Values, Window)
+
+
+DefaultIndicators = [
+    "SMA",
+    "EMA",
+    "RSI",
+    "MACD",
+    "BollingerBands",
+    "OnBalanceVolume",
+    "WilliamsPercentR",
+    "CommodityChannelIndex",
+]
+DefaultIndicatorParameters = {
+    "SMA": {"Window": 20},
+    "EMA": {"Window": 12},
+    "RSI": {"Window": 14},
+    "MACD": {"FastPeriod": 12, "SlowPeriod": 26, "SignalPeriod": 9},
+    "BollingerBands": {"Window": 20, "StandardDeviations": 2.0},
+    "OnBalanceVolume": {},
+    "WilliamsPercentR": {"Window": 14},
+    "CommodityChannelIndex": {"Window": 20},
+}
+
+
+def _TrueRange(Data) -> pd.Series:
+    High = Data["High"]
+    Low = Data["Low"]
+    Close = Data["Close"]
+
+    TR1 = High - Low
+    TR2 = np.abs(High - Close.shift())
+    TR3 = np.abs(Low - Close.shift())
+    return np.maximum(TR1, np.maximum(TR2, TR3))
+
+
+# Intermediate series shared between indicators; each takes the data and keyword parameters
+IndicatorPrimitives: Dict[str, Callable[..., pd.Series]] = {
+    "Difference": lambda Data, ColumnName="Close": Data[ColumnName].diff(),
+    "ExponentialMean": lambda Data, Span, ColumnName="Close": Data[ColumnName].ewm(span=Span).mean(),
+    "RollingMean": lambda Data, Window, ColumnName="Close": Data[ColumnName].rolling(window=Window).mean(),
+    "RollingStd": lambda Data, Window, ColumnName="Close": Data[ColumnName].rolling(window=Window).std(),
+    "RollingMax": lambda Data, Window, ColumnName="High": Data[ColumnName].rolling(window=Window).max(),
+    "RollingMin": lambda Data, Window, ColumnName="Low": Data[ColumnName].rolling(window=Window).min(),
+    "TrueRange": _TrueRange,
+    "TypicalPrice": lambda Data: (Data["High"] + Data["Low"] + Data["Close"]) / 3,
+}
+PrimitiveRequest = Tuple[str, Dict]
+
+
+def _PrimitiveKey(Name: str, Parameters: Dict) -> Tuple:
+    """Key of a primitive with its defaults filled in, so equal requests match however they are spelled."""
+    if Name not in IndicatorPrimitives:
+        raise KeyError(f"Unknown indicator primitive '{Name}'")
+    Bound = inspect.signature(IndicatorPrimitives[Name]).bind(None, **Parameters)
+    Bound.apply_defaults()
+    return (Name,) + tuple(sorted((Key, Value) for Key, Value in Bound.arguments.items() if Key != "Data"))
+
+
+class PrimitiveCache:
+    """
+    Computes each indicator primitive once per dataset.
+
+    Indicators call Get with a primitive name and its parameters; the first call
+    computes the series and later calls with the same parameters return it.
+    Release drops series that no remaining indicator of a plan needs.
+    """
+
+    def __init__(self, Data):
+        self.Data = Data
+        self.Series: Dict[Tuple, pd.Series] = {}
+        self.Computed: List[Tuple] = []
+
+    def Get(self, Name: str, **Parameters) -> pd.Series:
+        Key = _PrimitiveKey(Name, Parameters)
+        if Key not in self.Series:
+            self.Series[Key] = IndicatorPrimitives[Name](self.Data, **Parameters)
+            self.Computed.append(Key)
+        return self.Series[Key]
+
+    def Release(self, Keys: List[Tuple]) -> None:
+        for Key in Keys:
+            self.Series.pop(Key, None)
+
+
+_FeatureProbeRows = 64
+
+
+class _FeatureMatrixFrame:
+    """
+    Minimal DataFrame stand-in used by ComputeFeatureMatrix.
+
+    Reading a column returns the source OHLCV series or a view of an already
+    written feature column; assigning a column writes it into the preallocated
+    matrix. Custom indicators work with it as long as they only read and assign
+    columns with Data[...].
+    """
+
+    def __init__(self, Source: pd.DataFrame, Matrix: np.ndarray, FeatureColumns: List[str]):
+        self.Source = Source
+        self.Matrix = Matrix
+        self.index = Source.index
+        self.ColumnPositions = {Column: Position for Position, Column in enumerate(FeatureColumns)}
+        self.Written = set()
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.Source.columns) + [Column for Column in self.ColumnPositions if Column in self.Written]
+
+    def __contains__(self, Column: str) -> bool:
+        return Column in self.Written or Column in self.Source.columns
+
+    def __getitem__(self, Column: str) -> pd.Series:
+        if Column in self.Written:
+            return pd.Series(self.Matrix[:, self.ColumnPositions[Column]], index=self.index, name=Column, copy=False)
+        return self.Source[Column]
+
+    def __setitem__(self, Column: str, Values) -> None:
+        if Column not in self.ColumnPositions:
+            raise KeyError(f"Column '{Column}' was not produced when the feature columns were discovered")
+        self.Matrix[:, self.ColumnPositions[Column]] = np.asarray(Values)
+        self.Written.add(Column)
+
+    def CheckComplete(self) -> None:
+        Missing = [Column for Column in self.ColumnPositions if Column not in self.Written]
+        if Missing:
+            raise ValueError(f"Feature columns were not written: {Missing}")
 
 
 class FeatureEngineering:
     """
     Dynamic feature engineering class for technical analysis indicators.
     Allows flexible addition of technical indicators with customizable parameters.
+    With a PipelineProfiler every indicator is timed as its own section.
     """
     
-    def __init__(self):
+    def __init__(self, Profiler: Optional[PipelineProfiler] = None):
+        self.Profiler = Profiler
         self.TechnicalIndicators: Dict[str, Callable] = {
             "SMA": self._CalculateSimpleMovingAverage,
             "EMA": self._CalculateExponentialMovingAverage,
@@ -22,11 +201,44 @@ class FeatureEngineering:
             "WilliamsPercentR": self._CalculateWilliamsPercentR,
             "CommodityChannelIndex": self._CalculateCommodityChannelIndex,
         }
+        # Primitives each indicator reads, as a function of its parameters
+        self.IndicatorDependencies: Dict[str, Callable[..., List[PrimitiveRequest]]] = {
+            "SMA": lambda Window=20, ColumnName="Close": [
+                ("RollingMean", {"Window": Window, "ColumnName": ColumnName}),
+            ],
+            "EMA": lambda Window=20, ColumnName="Close": [
+                ("ExponentialMean", {"Span": Window, "ColumnName": ColumnName}),
+            ],
+            "RSI": lambda Window=14, ColumnName="Close": [("Difference", {"ColumnName": ColumnName})],
+            "MACD": lambda FastPeriod=12, SlowPeriod=26, SignalPeriod=9, ColumnName="Close": [
+                ("ExponentialMean", {"Span": FastPeriod, "ColumnName": ColumnName}),
+                ("ExponentialMean", {"Span": SlowPeriod, "ColumnName": ColumnName}),
+            ],
+            "BollingerBands": lambda Window=20, StandardDeviations=2.0, ColumnName="Close": [
+                ("RollingMean", {"Window": Window, "ColumnName": ColumnName}),
+                ("RollingStd", {"Window": Window, "ColumnName": ColumnName}),
+            ],
+            "ATR": lambda Window=14: [("TrueRange", {})],
+            "Stochastic": lambda KPeriod=14, DPeriod=3: [
+                ("RollingMin", {"Window": KPeriod, "ColumnName": "Low"}),
+                ("RollingMax", {"Window": KPeriod, "ColumnName": "High"}),
+            ],
+            "OnBalanceVolume": lambda: [("Difference", {"ColumnName": "Close"})],
+            "WilliamsPercentR": lambda Window=14: [
+                ("RollingMax", {"Window": Window, "ColumnName": "High"}),
+                ("RollingMin", {"Window": Window, "ColumnName": "Low"}),
+            ],
+            "CommodityChannelIndex": lambda Window=20: [("TypicalPrice", {})],
+        }
     
     def ApplyTechnicalAnalysis(self, Data: pd.DataFrame, IndicatorsToApply: List[str], 
                               IndicatorParameters: Optional[Dict[str, Dict]] = None) -> pd.DataFrame:
         """
         Apply selected technical indicators to the dataframe.
+
+        Runs the execution plan of BuildExecutionPlan, so intermediates shared by
+        several indicators, such as the rolling mean of SMA and BollingerBands, are
+        computed once.
         
         Args:
             Data: DataFrame with OHLCV data
@@ -36,50 +248,142 @@ class FeatureEngineering:
         Returns:
             DataFrame with additional technical indicator columns
         """
-        ResultData = Data.copy()
-        
+        for Indicator in IndicatorsToApply:
+            if Indicator not in self.TechnicalIndicators:
+                print(f"Warning: Indicator '{Indicator}' not found in available indicators")
+        return self._RunExecutionPlan(Data.copy(), IndicatorsToApply, IndicatorParameters)
+
+    def BuildExecutionPlan(self, IndicatorsToApply: List[str],
+                           IndicatorParameters: Optional[Dict[str, Dict]] = None) -> List[Dict]:
+        """
+        Order the requested indicators and resolve the primitives they share.
+
+        Unknown indicators are skipped.
+
+        Returns:
+            One step per known indicator with its Indicator name, Parameters, the
+            Primitives keys it reads and the Release keys no later step needs
+        """
         if IndicatorParameters is None:
             IndicatorParameters = {}
-        
+        Plan = []
         for Indicator in IndicatorsToApply:
-            if Indicator in self.TechnicalIndicators:
-                Parameters = IndicatorParameters.get(Indicator, {})
-                ResultData = self.TechnicalIndicators[Indicator](ResultData, **Parameters)
-            else:
-                print(f"Warning: Indicator '{Indicator}' not found in available indicators")
-        
-        return ResultData
+            if Indicator not in self.TechnicalIndicators:
+                continue
+            Parameters = IndicatorParameters.get(Indicator, {})
+            Declare = self.IndicatorDependencies.get(Indicator)
+            Requests = Declare(**Parameters) if Declare is not None else []
+            Plan.append({
+                "Indicator": Indicator,
+                "Parameters": Parameters,
+                "Primitives": [_PrimitiveKey(Name, PrimitiveParameters) for Name, PrimitiveParameters in Requests],
+                "Release": [],
+            })
+
+        LastUse = {}
+        for Position, Step in enumerate(Plan):
+            for Key in Step["Primitives"]:
+                LastUse[Key] = Position
+        for Key, Position in LastUse.items():
+            Plan[Position]["Release"].append(Key)
+        return Plan
+
+    def _RunExecutionPlan(self, Data, IndicatorsToApply: List[str],
+                          IndicatorParameters: Optional[Dict[str, Dict]]):
+        """Run the plan on Data, a DataFrame or _FeatureMatrixFrame that the indicators extend in place."""
+        Primitives = PrimitiveCache(Data)
+        for Step in self.BuildExecutionPlan(IndicatorsToApply, IndicatorParameters):
+            Function = self.TechnicalIndicators[Step["Indicator"]]
+            # Shared primitives are computed by, and timed with, the first indicator that reads them
+            with ProfileSection(self.Profiler, Step["Indicator"], "Indicator"):
+                if Step["Indicator"] in self.IndicatorDependencies:
+                    Data = Function(Data, Primitives=Primitives, **Step["Parameters"])
+                else:
+                    Data = Function(Data, **Step["Parameters"])
+            Primitives.Release(Step["Release"])
+        return Data
     
-    def AddCustomIndicator(self, IndicatorName: str, IndicatorFunction: Callable):
+    def ComputeFeatureMatrix(self, Data: pd.DataFrame, IndicatorsToApply: List[str],
+                             IndicatorParameters: Optional[Dict[str, Dict]] = None,
+                             DType: type = np.float64,
+                             IncludeLogReturn: bool = True) -> Tuple[np.ndarray, List[str]]:
+        """
+        Low-memory alternative to ApplyTechnicalAnalysis.
+
+        The feature columns are discovered on a short prefix of Data, then a single
+        C-contiguous (rows, features) matrix of DType is preallocated and every
+        indicator writes its output straight into its column. Data is neither copied
+        nor extended, so with DType=np.float32 the features take a quarter of the
+        memory of the DataFrame path and the matrix can be passed to the HMM as is.
+
+        Returns:
+            Tuple of the feature matrix and its column names
+        """
+        if IndicatorParameters is None:
+            IndicatorParameters = {}
+        Probe = self.ApplyTechnicalAnalysis(Data.iloc[:_FeatureProbeRows], IndicatorsToApply, IndicatorParameters)
+        FeatureColumns = [Column for Column in Probe.columns if Column not in Data.columns]
+        if IncludeLogReturn:
+            FeatureColumns.append("LogReturn")
+
+        Matrix = np.empty((len(Data), len(FeatureColumns)), dtype=DType)
+        Frame = _FeatureMatrixFrame(Data, Matrix, FeatureColumns)
+        self._RunExecutionPlan(Frame, IndicatorsToApply, IndicatorParameters)
+        if IncludeLogReturn:
+            Frame["LogReturn"] = np.log(Data["Close"]).diff()
+        Frame.CheckComplete()
+        return Matrix, FeatureColumns
+
+    def AddCustomIndicator(self, IndicatorName: str, IndicatorFunction: Callable,
+                           Dependencies: Optional[Union[List[PrimitiveRequest], Callable[..., List[PrimitiveRequest]]]] = None):
         """
         Add a custom technical indicator to the available indicators.
+
+        An indicator that declares Dependencies is called with a Primitives keyword
+        holding the shared PrimitiveCache, and reads them with
+        Primitives.Get(Name, **Parameters) instead of recomputing them. The shared
+        series must not be modified in place.
         
         Args:
             IndicatorName: Name of the new indicator
             IndicatorFunction: Function that takes DataFrame and returns DataFrame with new columns
+            Dependencies: (primitive name, parameters) pairs from IndicatorPrimitives, or a
+                function of the indicator parameters returning them
         """
         self.TechnicalIndicators[IndicatorName] = IndicatorFunction
+        if Dependencies is None:
+            self.IndicatorDependencies.pop(IndicatorName, None)
+        elif callable(Dependencies):
+            self.IndicatorDependencies[IndicatorName] = Dependencies
+        else:
+            self.IndicatorDependencies[IndicatorName] = lambda **Parameters: list(Dependencies)
     
     def GetAvailableIndicators(self) -> List[str]:
         """Return list of available technical indicators."""
         return list(self.TechnicalIndicators.keys())
     
     def _CalculateSimpleMovingAverage(self, Data: pd.DataFrame, Window: int = 20, 
-                                    ColumnName: str = "Close") -> pd.DataFrame:
+                                    ColumnName: str = "Close",
+                                    Primitives: Optional[PrimitiveCache] = None) -> pd.DataFrame:
         """Calculate Simple Moving Average."""
-        Data[f"SMA_{Window}"] = Data[ColumnName].rolling(window=Window).mean()
+        Primitives = Primitives or PrimitiveCache(Data)
+        Data[f"SMA_{Window}"] = Primitives.Get("RollingMean", Window=Window, ColumnName=ColumnName)
         return Data
     
     def _CalculateExponentialMovingAverage(self, Data: pd.DataFrame, Window: int = 20, 
-                                         ColumnName: str = "Close") -> pd.DataFrame:
+                                         ColumnName: str = "Close",
+                                         Primitives: Optional[PrimitiveCache] = None) -> pd.DataFrame:
         """Calculate Exponential Moving Average."""
-        Data[f"EMA_{Window}"] = Data[ColumnName].ewm(span=Window).mean()
+        Primitives = Primitives or PrimitiveCache(Data)
+        Data[f"EMA_{Window}"] = Primitives.Get("ExponentialMean", Span=Window, ColumnName=ColumnName)
         return Data
     
     def _CalculateRelativeStrengthIndex(self, Data: pd.DataFrame, Window: int = 14, 
-                                      ColumnName: str = "Close") -> pd.DataFrame:
+                                      ColumnName: str = "Close",
+                                      Primitives: Optional[PrimitiveCache] = None) -> pd.DataFrame:
         """Calculate Relative Strength Index."""
-        Delta = Data[ColumnName].diff()
+        Primitives = Primitives or PrimitiveCache(Data)
+        Delta = Primitives.Get("Difference", ColumnName=ColumnName)
         Gain = (Delta.where(Delta > 0, 0)).rolling(window=Window).mean()
         Loss = (-Delta.where(Delta < 0, 0)).rolling(window=Window).mean()
         RS = Gain / Loss
@@ -88,72 +392,423 @@ class FeatureEngineering:
     
     def _CalculateMovingAverageConvergenceDivergence(self, Data: pd.DataFrame, 
                                                    FastPeriod: int = 12, SlowPeriod: int = 26, 
-                                                   SignalPeriod: int = 9, ColumnName: str = "Close") -> pd.DataFrame:
+                                                   SignalPeriod: int = 9, ColumnName: str = "Close",
+                                                   Primitives: Optional[PrimitiveCache] = None) -> pd.DataFrame:
         """Calculate MACD (Moving Average Convergence Divergence)."""
-        EmaFast = Data[ColumnName].ewm(span=FastPeriod).mean()
-        EmaSlow = Data[ColumnName].ewm(span=SlowPeriod).mean()
+        Primitives = Primitives or PrimitiveCache(Data)
+        EmaFast = Primitives.Get("ExponentialMean", Span=FastPeriod, ColumnName=ColumnName)
+        EmaSlow = Primitives.Get("ExponentialMean", Span=SlowPeriod, ColumnName=ColumnName)
         Data["MACD"] = EmaFast - EmaSlow
         Data["MACD_Signal"] = Data["MACD"].ewm(span=SignalPeriod).mean()
         Data["MACD_Histogram"] = Data["MACD"] - Data["MACD_Signal"]
         return Data
     
     def _CalculateBollingerBands(self, Data: pd.DataFrame, Window: int = 20, 
-                               StandardDeviations: float = 2.0, ColumnName: str = "Close") -> pd.DataFrame:
+                               StandardDeviations: float = 2.0, ColumnName: str = "Close",
+                               Primitives: Optional[PrimitiveCache] = None) -> pd.DataFrame:
         """Calculate Bollinger Bands."""
-        SMA = Data[ColumnName].rolling(window=Window).mean()
-        STD = Data[ColumnName].rolling(window=Window).std()
+        Primitives = Primitives or PrimitiveCache(Data)
+        SMA = Primitives.Get("RollingMean", Window=Window, ColumnName=ColumnName)
+        STD = Primitives.Get("RollingStd", Window=Window, ColumnName=ColumnName)
         Data[f"BB_Upper_{Window}"] = SMA + (STD * StandardDeviations)
         Data[f"BB_Lower_{Window}"] = SMA - (STD * StandardDeviations)
         Data[f"BB_Middle_{Window}"] = SMA
         return Data
     
-    def _CalculateAverageTrueRange(self, Data: pd.DataFrame, Window: int = 14) -> pd.DataFrame:
+    def _CalculateAverageTrueRange(self, Data: pd.DataFrame, Window: int = 14,
+                                   Primitives: Optional[PrimitiveCache] = None) -> pd.DataFrame:
         """Calculate Average True Range."""
-        High = Data["High"]
-        Low = Data["Low"]
-        Close = Data["Close"]
-        
-        TR1 = High - Low
-        TR2 = np.abs(High - Close.shift())
-        TR3 = np.abs(Low - Close.shift())
-        
-        TrueRange = np.maximum(TR1, np.maximum(TR2, TR3))
+        Primitives = Primitives or PrimitiveCache(Data)
+        TrueRange = Primitives.Get("TrueRange")
         Data[f"ATR_{Window}"] = TrueRange.rolling(window=Window).mean()
         return Data
     
     def _CalculateStochasticOscillator(self, Data: pd.DataFrame, KPeriod: int = 14, 
-                                     DPeriod: int = 3) -> pd.DataFrame:
+                                     DPeriod: int = 3, Primitives: Optional[PrimitiveCache] = None) -> pd.DataFrame:
         """Calculate Stochastic Oscillator."""
-        LowestLow = Data["Low"].rolling(window=KPeriod).min()
-        HighestHigh = Data["High"].rolling(window=KPeriod).max()
+        Primitives = Primitives or PrimitiveCache(Data)
+        LowestLow = Primitives.Get("RollingMin", Window=KPeriod, ColumnName="Low")
+        HighestHigh = Primitives.Get("RollingMax", Window=KPeriod, ColumnName="High")
         
         Data[f"Stoch_K_{KPeriod}"] = 100 * ((Data["Close"] - LowestLow) / (HighestHigh - LowestLow))
         Data[f"Stoch_D_{DPeriod}"] = Data[f"Stoch_K_{KPeriod}"].rolling(window=DPeriod).mean()
         return Data
 
-    def _CalculateOnBalanceVolume(self, Data: pd.DataFrame) -> pd.DataFrame:
+    def _CalculateOnBalanceVolume(self, Data: pd.DataFrame,
+                                  Primitives: Optional[PrimitiveCache] = None) -> pd.DataFrame:
         """Calculate On-Balance Volume."""
-        CloseDelta = Data["Close"].diff()
+        Primitives = Primitives or PrimitiveCache(Data)
+        CloseDelta = Primitives.Get("Difference", ColumnName="Close")
         Direction = np.sign(CloseDelta).fillna(0)
         VolumeAdj = Direction * Data["Volume"]
         Data["OnBalanceVolume"] = VolumeAdj.cumsum().fillna(method="ffill")
         return Data
 
-    def _CalculateWilliamsPercentR(self, Data: pd.DataFrame, Window: int = 14) -> pd.DataFrame:
+    def _CalculateWilliamsPercentR(self, Data: pd.DataFrame, Window: int = 14,
+                                   Primitives: Optional[PrimitiveCache] = None) -> pd.DataFrame:
         """Calculate Williams %R."""
-        HighestHigh = Data["High"].rolling(window=Window).max()
-        LowestLow = Data["Low"].rolling(window=Window).min()
+        Primitives = Primitives or PrimitiveCache(Data)
+        HighestHigh = Primitives.Get("RollingMax", Window=Window, ColumnName="High")
+        LowestLow = Primitives.Get("RollingMin", Window=Window, ColumnName="Low")
         Data[f"WilliamsR_{Window}"] = -100 * (
             (HighestHigh - Data["Close"]) / (HighestHigh - LowestLow)
         )
         return Data
 
-    def _CalculateCommodityChannelIndex(self, Data: pd.DataFrame, Window: int = 20) -> pd.DataFrame:
+    def _CalculateCommodityChannelIndex(self, Data: pd.DataFrame, Window: int = 20,
+                                        Primitives: Optional[PrimitiveCache] = None) -> pd.DataFrame:
         """Calculate Commodity Channel Index."""
-        TypicalPrice = (Data["High"] + Data["Low"] + Data["Close"]) / 3
+        Primitives = Primitives or PrimitiveCache(Data)
+        TypicalPrice = Primitives.Get("TypicalPrice")
         MovingAverage = TypicalPrice.rolling(window=Window).mean()
-        MeanDeviation = TypicalPrice.rolling(window=Window).apply(
-            lambda x: np.mean(np.abs(x - x.mean())), raw=True
+        MeanDeviation = pd.Series(
+            RollingMeanAbsoluteDeviation(TypicalPrice.to_numpy(), Window), index=TypicalPrice.index
         )
         Data[f"CCI_{Window}"] = (TypicalPrice - MovingAverage) / (0.015 * MeanDeviation)
-        return Data
\ No newline at end of file
+        return Data
+
+class _RollingWindowState:
+    """Fixed-length window of recent values with an O(1) NaN count."""
+
+    def __init__(self, Window: int):
+        self.Window = Window
+        self.Values: Deque[float] = deque()
+        self.NanCount = 0
+
+    def _Append(self, Value: float) -> Optional[float]:
+        """Append Value and return the value that dropped out of the window, if any."""
+        self.Values.append(Value)
+        if Value != Value:
+            self.NanCount += 1
+        if len(self.Values) <= self.Window:
+            return None
+        Removed = self.Values.popleft()
+        if Removed != Removed:
+            self.NanCount -= 1
+        return Removed
+
+    def _IsComplete(self) -> bool:
+        return len(self.Values) == self.Window and not self.NanCount
+
+
+class _RollingMeanState(_RollingWindowState):
+    """Rolling mean kept as a running sum, resummed once per window to avoid drift."""
+
+    def __init__(self, Window: int):
+        super().__init__(Window)
+        self.Total = 0.0
+        self.PushCount = 0
+
+    def Push(self, Value: float) -> float:
+        Removed = self._Append(Value)
+        if Value == Value:
+            self.Total += Value
+        if Removed is not None and Removed == Removed:
+            self.Total -= Removed
+        self.PushCount += 1
+        if self.PushCount % self.Window == 0:
+            self.Total = math.fsum(Item for Item in self.Values if Item == Item)
+        return self.Total / self.Window if self._IsComplete() else np.nan
+
+
+class _RollingVarianceState(_RollingWindowState):
+    """Rolling sample variance from shifted running sums, re-centred once per window."""
+
+    def __init__(self, Window: int):
+        super().__init__(Window)
+        self.Shift = 0.0
+        self.Total = 0.0
+        self.SquaredTotal = 0.0
+        self.PushCount = 0
+
+    def Push(self, Value: float) -> float:
+        Removed = self._Append(Value)
+        if Value == Value:
+            Delta = Value - self.Shift
+            self.Total += Delta
+            self.SquaredTotal += Delta * Delta
+        if Removed is not None and Removed == Removed:
+            Delta = Removed - self.Shift
+            self.Total -= Delta
+            self.SquaredTotal -= Delta * Delta
+        self.PushCount += 1
+        if self.PushCount % self.Window == 0:
+            Observed = [Item for Item in self.Values if Item == Item]
+            self.Shift = math.fsum(Observed) / len(Observed) if Observed else 0.0
+            self.Total = math.fsum(Item - self.Shift for Item in Observed)
+            self.SquaredTotal = math.fsum((Item - self.Shift) ** 2 for Item in Observed)
+        if not self._IsComplete() or self.Window < 2:
+            return np.nan
+        Variance = (self.SquaredTotal - self.Total * self.Total / self.Window) / (self.Window - 1)
+        return max(Variance, 0.0)
+
+
+class _RollingExtremeState(_RollingWindowState):
+    """Rolling maximum or minimum using a monotonic deque of (position, value) pairs."""
+
+    def __init__(self, Window: int, Maximum: bool):
+        super().__init__(Window)
+        self.Maximum = Maximum
+        self.Candidates: Deque[Tuple[int, float]] = deque()
+        self.Position = 0
+
+    def Push(self, Value: float) -> float:
+        self._Append(Value)
+        if Value == Value:
+            if self.Maximum:
+                while self.Candidates and self.Candidates[-1][1] <= Value:
+                    self.Candidates.pop()
+            else:
+                while self.Candidates and self.Candidates[-1][1] >= Value:
+                    self.Candidates.pop()
+            self.Candidates.append((self.Position, Value))
+        while self.Candidates and self.Candidates[0][0] <= self.Position - self.Window:
+            self.Candidates.popleft()
+        self.Position += 1
+        return self.Candidates[0][1] if self._IsComplete() else np.nan
+
+
+class _ExponentialMeanState:
+    """Adjusted exponentially weighted mean, matching pandas ewm(span=...).mean()."""
+
+    def __init__(self, Span: int):
+        self.Decay = 1 - 2 / (Span + 1)
+        self.Weighted = np.nan
+        self.OldWeight = 1.0
+
+    def Push(self, Value: float) -> float:
+        if self.Weighted == self.Weighted:
+            self.OldWeight *= self.Decay
+            if Value == Value:
+                if self.Weighted != Value:
+                    self.Weighted = (self.OldWeight * self.Weighted + Value) / (self.OldWeight + 1.0)
+                self.OldWeight += 1.0
+        elif Value == Value:
+            self.Weighted = Value
+        return self.Weighted
+
+
+class _PreviousValueState:
+    """Remember the last value of a column across updates to emulate shift(1)."""
+
+    def __init__(self):
+        self.Last = np.nan
+
+    def Shift(self, Values: np.ndarray) -> np.ndarray:
+        Shifted = np.empty_like(Values)
+        if len(Values):
+            Shifted[0] = self.Last
+            Shifted[1:] = Values[:-1]
+            self.Last = Values[-1]
+        return Shifted
+
+
+def _PushAll(State, Values: np.ndarray) -> np.ndarray:
+    return np.fromiter((State.Push(Value) for Value in Values.tolist()), dtype=float, count=len(Values))
+
+
+class _StreamingSimpleMovingAverage:
+    def __init__(self, Window: int = 20, ColumnName: str = "Close"):
+        self.Window = Window
+        self.ColumnName = ColumnName
+        self.Mean = _RollingMeanState(Window)
+
+    def Update(self, Bars: pd.DataFrame) -> Dict[str, np.ndarray]:
+        Values = Bars[self.ColumnName].to_numpy(dtype=float)
+        return {f"SMA_{self.Window}": _PushAll(self.Mean, Values)}
+
+
+class _StreamingExponentialMovingAverage:
+    def __init__(self, Window: int = 20, ColumnName: str = "Close"):
+        self.Window = Window
+        self.ColumnName = ColumnName
+        self.Mean = _ExponentialMeanState(Window)
+
+    def Update(self, Bars: pd.DataFrame) -> Dict[str, np.ndarray]:
+        Values = Bars[self.ColumnName].to_numpy(dtype=float)
+        return {f"EMA_{self.Window}": _PushAll(self.Mean, Values)}
+
+
+class _StreamingRelativeStrengthIndex:
+    def __init__(self, Window: int = 14, ColumnName: str = "Close"):
+        self.Window = Window
+        self.ColumnName = ColumnName
+        self.Previous = _PreviousValueState()
+        self.Gain = _RollingMeanState(Window)
+        self.Loss = _RollingMeanState(Window)
+
+    def Update(self, Bars: pd.DataFrame) -> Dict[str, np.ndarray]:
+        Values = Bars[self.ColumnName].to_numpy(dtype=float)
+        Delta = Values - self.Previous.Shift(Values)
+        Gain = _PushAll(self.Gain, np.where(Delta > 0, Delta, 0.0))
+        Loss = _PushAll(self.Loss, np.where(Delta < 0, -Delta, 0.0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            RS = Gain / Loss
+        return {f"RSI_{self.Window}": 100 - (100 / (1 + RS))}
+
+
+class _StreamingMovingAverageConvergenceDivergence:
+    def __init__(self, FastPeriod: int = 12, SlowPeriod: int = 26, SignalPeriod: int = 9,
+                 ColumnName: str = "Close"):
+        self.ColumnName = ColumnName
+        self.Fast = _ExponentialMeanState(FastPeriod)
+        self.Slow = _ExponentialMeanState(SlowPeriod)
+        self.Signal = _ExponentialMeanState(SignalPeriod)
+
+    def Update(self, Bars: pd.DataFrame) -> Dict[str, np.ndarray]:
+        Values = Bars[self.ColumnName].to_numpy(dtype=float)
+        Macd = _PushAll(self.Fast, Values) - _PushAll(self.Slow, Values)
+        Signal = _PushAll(self.Signal, Macd)
+        return {"MACD": Macd, "MACD_Signal": Signal, "MACD_Histogram": Macd - Signal}
+
+
+class _StreamingBollingerBands:
+    def __init__(self, Window: int = 20, StandardDeviations: float = 2.0, ColumnName: str = "Close"):
+        self.Window = Window
+        self.StandardDeviations = StandardDeviations
+        self.ColumnName = ColumnName
+        self.Mean = _RollingMeanState(Window)
+        self.Variance = _RollingVarianceState(Window)
+
+    def Update(self, Bars: pd.DataFrame) -> Dict[str, np.ndarray]:
+        Values = Bars[self.ColumnName].to_numpy(dtype=float)
+        SMA = _PushAll(self.Mean, Values)
+        STD = np.sqrt(_PushAll(self.Variance, Values))
+        return {
+            f"BB_Upper_{self.Window}": SMA + (STD * self.StandardDeviations),
+            f"BB_Lower_{self.Window}": SMA - (STD * self.StandardDeviations),
+            f"BB_Middle_{self.Window}": SMA,
+        }
+
+
+class _StreamingAverageTrueRange:
+    def __init__(self, Window: int = 14):
+        self.Window = Window
+        self.PreviousClose = _PreviousValueState()
+        self.Mean = _RollingMeanState(Window)
+
+    def Update(self, Bars: pd.DataFrame) -> Dict[str, np.ndarray]:
+        High = Bars["High"].to_numpy(dtype=float)
+        Low = Bars["Low"].to_numpy(dtype=float)
+        PreviousClose = self.PreviousClose.Shift(Bars["Close"].to_numpy(dtype=float))
+        TrueRange = np.maximum(High - Low, np.maximum(np.abs(High - PreviousClose), np.abs(Low - PreviousClose)))
+        return {f"ATR_{self.Window}": _PushAll(self.Mean, TrueRange)}
+
+
+class _StreamingStochasticOscillator:
+    def __init__(self, KPeriod: int = 14, DPeriod: int = 3):
+        self.KPeriod = KPeriod
+        self.DPeriod = DPeriod
+        self.LowestLow = _RollingExtremeState(KPeriod, Maximum=False)
+        self.HighestHigh = _RollingExtremeState(KPeriod, Maximum=True)
+        self.Mean = _RollingMeanState(DPeriod)
+
+    def Update(self, Bars: pd.DataFrame) -> Dict[str, np.ndarray]:
+        LowestLow = _PushAll(self.LowestLow, Bars["Low"].to_numpy(dtype=float))
+        HighestHigh = _PushAll(self.HighestHigh, Bars["High"].to_numpy(dtype=float))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            StochK = 100 * ((Bars["Close"].to_numpy(dtype=float) - LowestLow) / (HighestHigh - LowestLow))
+        return {f"Stoch_K_{self.KPeriod}": StochK, f"Stoch_D_{self.DPeriod}": _PushAll(self.Mean, StochK)}
+
+
+class _StreamingOnBalanceVolume:
+    def __init__(self):
+        self.PreviousClose = _PreviousValueState()
+        self.Total = np.nan
+
+    def Update(self, Bars: pd.DataFrame) -> Dict[str, np.ndarray]:
+        Close = Bars["Close"].to_numpy(dtype=float)
+        Direction = np.nan_to_num(np.sign(Close - self.PreviousClose.Shift(Close)), nan=0.0)
+        VolumeAdj = Direction * Bars["Volume"].to_numpy(dtype=float)
+        Result = np.empty_like(VolumeAdj)
+        for Position, Value in enumerate(VolumeAdj.tolist()):
+            if Value == Value:
+                self.Total = Value if self.Total != self.Total else self.Total + Value
+            Result[Position] = self.Total
+        return {"OnBalanceVolume": Result}
+
+
+class _StreamingWilliamsPercentR:
+    def __init__(self, Window: int = 14):
+        self.Window = Window
+        self.HighestHigh = _RollingExtremeState(Window, Maximum=True)
+        self.LowestLow = _RollingExtremeState(Window, Maximum=False)
+
+    def Update(self, Bars: pd.DataFrame) -> Dict[str, np.ndarray]:
+        HighestHigh = _PushAll(self.HighestHigh, Bars["High"].to_numpy(dtype=float))
+        LowestLow = _PushAll(self.LowestLow, Bars["Low"].to_numpy(dtype=float))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            WilliamsR = -100 * ((HighestHigh - Bars["Close"].to_numpy(dtype=float)) / (HighestHigh - LowestLow))
+        return {f"WilliamsR_{self.Window}": WilliamsR}
+
+
+class _StreamingCommodityChannelIndex:
+    """Mean absolute deviation needs the whole window, so each bar costs O(Window)."""
+
+    def __init__(self, Window: int = 20):
+        self.Window = Window
+        self.Mean = _RollingMeanState(Window)
+        self.Recent: Deque[float] = deque(maxlen=Window)
+
+    def Update(self, Bars: pd.DataFrame) -> Dict[str, np.ndarray]:
+        TypicalPrice = (
+            Bars["High"].to_numpy(dtype=float) + Bars["Low"].to_numpy(dtype=float) + Bars["Close"].to_numpy(dtype=float)
+        ) / 3
+        MovingAverage = _PushAll(self.Mean, TypicalPrice)
+        MeanDeviation = np.full(len(TypicalPrice), np.nan)
+        for Position, Value in enumerate(TypicalPrice.tolist()):
+            self.Recent.append(Value)
+            if len(self.Recent) == self.Window:
+                Window = np.fromiter(self.Recent, dtype=float, count=self.Window)
+                if not np.isnan(Window).any():
+                    MeanDeviation[Position] = np.mean(np.abs(Window - Window.mean()))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            CCI = (TypicalPrice - MovingAverage) / (0.015 * MeanDeviation)
+        return {f"CCI_{self.Window}": CCI}
+
+
+class StreamingFeatureEngineering:
+    """
+    Stateful counterpart of FeatureEngineering.ApplyTechnicalAnalysis.
+    Keeps rolling state per indicator so appending bars only computes the new rows.
+    """
+
+    def __init__(self, IndicatorsToApply: List[str], IndicatorParameters: Optional[Dict[str, Dict]] = None):
+        self.StreamingIndicators: Dict[str, Callable] = {
+            "SMA": _StreamingSimpleMovingAverage,
+            "EMA": _StreamingExponentialMovingAverage,
+            "RSI": _StreamingRelativeStrengthIndex,
+            "MACD": _StreamingMovingAverageConvergenceDivergence,
+            "BollingerBands": _StreamingBollingerBands,
+            "ATR": _StreamingAverageTrueRange,
+            "Stochastic": _StreamingStochasticOscillator,
+            "OnBalanceVolume": _StreamingOnBalanceVolume,
+            "WilliamsPercentR": _StreamingWilliamsPercentR,
+            "CommodityChannelIndex": _StreamingCommodityChannelIndex,
+        }
+        if IndicatorParameters is None:
+            IndicatorParameters = {}
+
+        self.IndicatorStates = []
+        for Indicator in IndicatorsToApply:
+            if Indicator in self.StreamingIndicators:
+                Parameters = IndicatorParameters.get(Indicator, {})
+                self.IndicatorStates.append(self.StreamingIndicators[Indicator](**Parameters))
+            else:
+                print(f"Warning: Indicator '{Indicator}' has no streaming implementation")
+
+    def Update(self, NewBars: pd.DataFrame) -> pd.DataFrame:
+        """
+        Advance every indicator over the appended bars.
+
+        Args:
+            NewBars: DataFrame with OHLCV rows that follow the previously seen bars
+
+        Returns:
+            NewBars with the technical indicator columns for those rows only
+        """
+        ResultData = NewBars.copy()
+        for State in self.IndicatorStates:
+            for Column, Values in State.Update(NewBars).items():
+                ResultData[Column] = Values
+        return ResultData
@@ -1,21 +1,104 @@
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
 from hmmlearn.hmm import GaussianHMM
+from scipy import linalg
+from sklearn.decomposition import PCA
 from sklearn.preprocessing import StandardScaler
-from typing import List
+from typing import Dict, List, Optional, Tuple
+
+ModelFormatVersion = 2
+# hmmlearn's spherical covars_ expands to one matrix per state and feature, so it is not offered
+CovarianceTypes = ("full", "diag", "tied")
+_RestartMatrix: Optional[np.ndarray] = None
+
+
+def _ShareRestartMatrix(ScaledMatrix: np.ndarray) -> None:
+    """Process pool initializer so the training matrix is sent once per worker."""
+    global _RestartMatrix
+    _RestartMatrix = ScaledMatrix
+
+
+def _FitSeededModel(Task: Tuple[int, int, str, int]) -> Tuple[Optional[GaussianHMM], Dict[str, float]]:
+    """Fit one GaussianHMM from a seeded random initialization and score it on the training matrix."""
+    NumberOfStates, Iterations, CovarianceType, Seed = Task
+    Model = GaussianHMM(
+        n_components=NumberOfStates, covariance_type=CovarianceType, n_iter=Iterations, random_state=Seed
+    )
+    StartTime = time.perf_counter()
+    try:
+        Model.fit(_RestartMatrix)
+        LogLikelihood = Model.score(_RestartMatrix)
+    except ValueError:
+        # Degenerate covariances on this initialization
+        Model, LogLikelihood = None, -np.inf
+    Report = {
+        "Seed": Seed,
+        "LogLikelihood": LogLikelihood,
+        "Iterations": Model.monitor_.iter if Model is not None else 0,
+        "Converged": Model.monitor_.converged if Model is not None else False,
+        "Seconds": time.perf_counter() - StartTime,
+    }
+    return Model, Report
 
 
 class HiddenMarkovModel:
     """Simple wrapper around GaussianHMM for market regime detection."""
 
-    def __init__(self, NumberOfStates: int = 3, Iterations: int = 100) -> None:
+    def __init__(self, NumberOfStates: int = 3, Iterations: int = 100, Restarts: int = 1, Workers: int = 1,
+                 RandomState: Optional[int] = None, CovarianceType: str = "full",
+                 VarianceRatio: Optional[float] = None, Whiten: bool = False) -> None:
+        """
+        Restarts > 1 fits that many seeded initializations on each cold fit, spread over
+        Workers processes, and keeps the one with the highest training log-likelihood.
+
+        CovarianceType is "full", "diag" or "tied"; "diag" makes an EM iteration linear
+        instead of cubic in the number of features and "tied" shares one covariance
+        between the states. VarianceRatio in (0, 1) projects the standardized features
+        onto the principal components explaining that share of the variance, which
+        removes the collinear indicator directions before the fit, and Whiten rescales
+        the kept components to unit variance. Whiten requires VarianceRatio, because
+        whitening the zero-variance directions of collinear features would scale
+        rounding noise up to unit variance.
+        """
+        if CovarianceType not in CovarianceTypes:
+            raise ValueError(f"Unknown covariance type '{CovarianceType}'. Choose from {list(CovarianceTypes)}.")
+        if VarianceRatio is not None and not 0 < VarianceRatio < 1:
+            raise ValueError("VarianceRatio must be between 0 and 1")
+        if Whiten and VarianceRatio is None:
+            raise ValueError("Whiten requires a VarianceRatio to drop the zero-variance components")
         self.NumberOfStates = NumberOfStates
         self.Iterations = Iterations
-        self.Model = GaussianHMM(n_components=NumberOfStates, covariance_type="full", n_iter=Iterations)
+        self.Restarts = Restarts
+        self.Workers = Workers
+        self.RandomState = RandomState
+        self.CovarianceType = CovarianceType
+        self.VarianceRatio = VarianceRatio
+        self.Whiten = Whiten
+        self.Model = GaussianHMM(
+            n_components=NumberOfStates, covariance_type=CovarianceType, n_iter=Iterations, random_state=RandomState
+        )
         self.Scaler = StandardScaler()
+        self.Projection = (
+            PCA(n_components=VarianceRatio, whiten=Whiten, svd_solver="full") if VarianceRatio is not None else None
+        )
         self.StateMapping = {}
+        self.FitReport: Dict[str, float] = {}
+        self.RestartReport: List[Dict[str, float]] = []
+        self.TrainingStates = None
+        self.FeatureColumns: List[str] = []
 
-    def Fit(self, Data: pd.DataFrame, FeatureColumns: List[str]) -> None:
+    def Fit(self, Data: pd.DataFrame, FeatureColumns: List[str], WarmStart: bool = False) -> None:
+        """
+        Fit the HMM on the rows with complete features.
+
+        With WarmStart=True and an already fitted model, Baum-Welch starts from the
+        previous start, transition, mean and covariance parameters, the fitted
+        scaler is reused as is and the StateMapping is kept, so a refit on a
+        slightly extended history converges in a few iterations with stable labels.
+        """
         if "LogReturn" not in Data.columns:
             raise ValueError("LogReturn column is required for fitting the HMM")
         CleanData = Data.dropna(subset=FeatureColumns + ["LogReturn"])
@@ -25,40 +108,513 @@ class HiddenMarkovModel:
                 "Please ensure your dataset has sufficient rows without missing values for all features."
             )
         TrainingMatrix = CleanData[FeatureColumns].values
-        ScaledMatrix = self.Scaler.fit_transform(TrainingMatrix)
-        self.Model.fit(ScaledMatrix)
+        IsWarmStart = WarmStart and hasattr(self.Model, "transmat_")
+        if IsWarmStart:
+            if TrainingMatrix.shape[1] != self.Scaler.n_features_in_:
+                raise ValueError("Warm start requires the same feature columns as the previous fit")
+            ScaledMatrix = self.TransformFeatures(TrainingMatrix)
+        else:
+            ScaledMatrix = self.FitTransformFeatures(TrainingMatrix)
+        self.FitMatrix(ScaledMatrix, CleanData["LogReturn"].to_numpy(), WarmStart=IsWarmStart)
         self.TrainingIndex = CleanData.index
+        self.FeatureColumns = list(FeatureColumns)
+
+    def FitFeatureMatrix(self, FeatureMatrix: np.ndarray, FeatureColumns: List[str]) -> np.ndarray:
+        """
+        Cold fit on a raw matrix from FeatureEngineering.ComputeFeatureMatrix.
+
+        FeatureMatrix must contain a LogReturn column. Rows with missing features are
+        dropped, which is a view when they are only the indicator warm-up rows at the
+        start, and the remaining rows are standardized in place, keeping the dtype,
+        so FeatureMatrix is overwritten and no further copy of the features is made
+        unless a projection is configured.
+        Returns the positions of the training rows, aligned with TrainingStates.
+        """
+        if "LogReturn" not in FeatureColumns:
+            raise ValueError("LogReturn column is required for fitting the HMM")
+        Complete = ~np.isnan(FeatureMatrix).any(axis=1)
+        Positions = np.flatnonzero(Complete)
+        if Positions.size == 0:
+            raise ValueError(
+                "No data available to train the HMM. "
+                "Please ensure your dataset has sufficient rows without missing values for all features."
+            )
+        if Positions[-1] - Positions[0] + 1 == Positions.size:
+            TrainingMatrix = FeatureMatrix[Positions[0]:Positions[-1] + 1]
+        else:
+            TrainingMatrix = FeatureMatrix[Complete]
+        LogReturns = TrainingMatrix[:, FeatureColumns.index("LogReturn")].astype(np.float64)
+        self.Scaler.fit(TrainingMatrix)
+        ScaledMatrix = self.Scaler.transform(TrainingMatrix, copy=False)
+        if self.Projection is not None:
+            ScaledMatrix = self.Projection.fit_transform(ScaledMatrix)
+        self.FitMatrix(ScaledMatrix, LogReturns)
+        self.FeatureColumns = list(FeatureColumns)
+        return Positions
+
+    def FitTransformFeatures(self, FeatureMatrix: np.ndarray) -> np.ndarray:
+        """Fit the scaler, and the projection when configured, on raw features and return them transformed."""
+        ScaledMatrix = self.Scaler.fit_transform(FeatureMatrix)
+        return ScaledMatrix if self.Projection is None else self.Projection.fit_transform(ScaledMatrix)
+
+    def TransformFeatures(self, FeatureMatrix: np.ndarray) -> np.ndarray:
+        """Transform raw features into the space the HMM is fitted in."""
+        ScaledMatrix = self.Scaler.transform(FeatureMatrix)
+        return ScaledMatrix if self.Projection is None else self.Projection.transform(ScaledMatrix)
+
+    def AffineTransform(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return Offset and Linear such that TransformFeatures(X) equals (X - Offset) @ Linear.T,
+        so the scaler and projection can be folded into other linear maps.
+        """
+        Offset = self.Scaler.mean_
+        Linear = np.diag(1 / self.Scaler.scale_)
+        if self.Projection is not None:
+            Offset = Offset + self.Scaler.scale_ * self.Projection.mean_
+            Linear = self.Projection.components_ @ Linear
+            if self.Projection.whiten:
+                Linear = Linear / np.sqrt(self.Projection.explained_variance_)[:, None]
+        return Offset, Linear
+
+    def FitMatrix(self, ScaledMatrix: np.ndarray, LogReturns: np.ndarray, WarmStart: bool = False) -> None:
+        """
+        Fit the HMM on a feature matrix already transformed by TransformFeatures.
+
+        Lets callers that evaluate many windows scale the features once and pass
+        row slices. A warm start that fails because the previous covariances cannot
+        be evaluated on the new rows falls back to a cold fit. FitReport records
+        the iterations, convergence and final log-likelihood from the monitor and
+        the wall time, and RestartReport the restarts of this fit, if any.
+        """
+        IsWarmStart = WarmStart and hasattr(self.Model, "transmat_")
+        self.TrainingStates = None
+        # Only a cold fit with restarts fills it, so a previous fit's restarts never show up here
+        self.RestartReport = []
+        StartTime = time.perf_counter()
+        if IsWarmStart:
+            self.Model.init_params = ""
+            try:
+                self.Model.fit(ScaledMatrix)
+            except ValueError:
+                IsWarmStart = False
+        if not IsWarmStart and self.Restarts > 1:
+            self._FitRestarts(ScaledMatrix)
+        elif not IsWarmStart:
+            self.Model.init_params = "stmc"
+            self.Model.fit(ScaledMatrix)
+        self.FitReport = {
+            "WarmStart": IsWarmStart,
+            "Iterations": self.Model.monitor_.iter,
+            "Converged": self.Model.monitor_.converged,
+            "LogLikelihood": self.Model.monitor_.history[-1] if self.Model.monitor_.history else np.nan,
+            "Seconds": time.perf_counter() - StartTime,
+        }
+        if not IsWarmStart:
+            self._MapStates(ScaledMatrix, LogReturns)
+
+    def _FitRestarts(self, ScaledMatrix: np.ndarray) -> None:
+        """Fit Restarts seeded models, keep the best by log-likelihood and record every run in RestartReport."""
+        Seeds = np.random.RandomState(self.RandomState).randint(0, 2**31 - 1, size=self.Restarts)
+        Tasks = [(self.NumberOfStates, self.Iterations, self.CovarianceType, int(Seed)) for Seed in Seeds]
+        if self.Workers > 1:
+            with ProcessPoolExecutor(
+                max_workers=min(self.Workers, self.Restarts),
+                initializer=_ShareRestartMatrix,
+                initargs=(ScaledMatrix,),
+            ) as Executor:
+                Results = list(Executor.map(_FitSeededModel, Tasks))
+        else:
+            _ShareRestartMatrix(ScaledMatrix)
+            try:
+                Results = [_FitSeededModel(Task) for Task in Tasks]
+            finally:
+                _ShareRestartMatrix(None)
+
+        self.RestartReport = [Report for _, Report in Results]
+        Fitted = [(Report["LogLikelihood"], Model) for Model, Report in Results if Model is not None]
+        if not Fitted:
+            raise ValueError("Every HMM restart failed to produce positive-definite covariances")
+        self.Model = max(Fitted, key=lambda Item: Item[0])[1]
+
+    def _MapStates(self, ScaledMatrix: np.ndarray, LogReturns: np.ndarray) -> None:
+        """Label the states with the highest and lowest mean LogReturn as Uptrend and Downtrend."""
         PredictedStates = self.Model.predict(ScaledMatrix)
+        self.TrainingStates = PredictedStates
         LogReturnMeans = {}
         for State in range(self.NumberOfStates):
-            StateReturns = CleanData.loc[PredictedStates == State, "LogReturn"]
-            LogReturnMeans[State] = StateReturns.mean() if not StateReturns.empty else np.nan
+            StateReturns = LogReturns[PredictedStates == State]
+            LogReturnMeans[State] = StateReturns.mean() if StateReturns.size else np.nan
         SortedStates = sorted(LogReturnMeans.items(), key=lambda x: x[1])
         self.StateMapping = {SortedStates[-1][0]: "Uptrend", SortedStates[0][0]: "Downtrend"}
         for State in range(self.NumberOfStates):
             if State not in self.StateMapping:
                 self.StateMapping[State] = "Sideway"
 
+    def Save(self, Path: str) -> None:
+        """
+        Save the fitted HMM parameters, scaler and projection state and StateMapping to a
+        compressed .npz file. A JSON metadata header with the format version is stored
+        alongside the arrays.
+        """
+        Metadata = {
+            "FormatVersion": ModelFormatVersion,
+            "NumberOfStates": self.NumberOfStates,
+            "Iterations": self.Iterations,
+            "CovarianceType": self.CovarianceType,
+            "VarianceRatio": self.VarianceRatio,
+            "Whiten": self.Whiten,
+            "StateMapping": {str(State): Label for State, Label in self.StateMapping.items()},
+            "FeatureColumns": self.FeatureColumns,
+        }
+        Projection = {}
+        if self.Projection is not None:
+            Projection = {
+                "ProjectionMean": self.Projection.mean_,
+                "ProjectionComponents": self.Projection.components_,
+                "ProjectionVariance": self.Projection.explained_variance_,
+            }
+        np.savez_compressed(
+            Path,
+            Metadata=np.array(json.dumps(Metadata)),
+            StartProbabilities=self.Model.startprob_,
+            TransitionMatrix=self.Model.transmat_,
+            Means=self.Model.means_,
+            Covariances=self.Model._covars_,
+            ScalerMean=self.Scaler.mean_,
+            ScalerScale=self.Scaler.scale_,
+            ScalerVariance=self.Scaler.var_,
+            ScalerSamples=np.asarray(self.Scaler.n_samples_seen_),
+            **Projection,
+        )
+
+    @classmethod
+    def Load(cls, Path: str) -> "HiddenMarkovModel":
+        """Load a model written by Save, ready for PredictRegime without refitting."""
+        with np.load(Path, allow_pickle=False) as Archive:
+            Metadata = json.loads(str(Archive["Metadata"]))
+            if Metadata["FormatVersion"] > ModelFormatVersion:
+                raise ValueError(f"Unsupported model format version: {Metadata['FormatVersion']}")
+            # Version 1 archives predate the covariance and projection options
+            Loaded = cls(
+                Metadata["NumberOfStates"],
+                Metadata["Iterations"],
+                CovarianceType=Metadata.get("CovarianceType", "full"),
+                VarianceRatio=Metadata.get("VarianceRatio"),
+                Whiten=Metadata.get("Whiten", False),
+            )
+            Means = Archive["Means"]
+            Loaded.Model.n_features = Means.shape[1]
+            Loaded.Model.startprob_ = Archive["StartProbabilities"]
+            Loaded.Model.transmat_ = Archive["TransitionMatrix"]
+            Loaded.Model.means_ = Means
+            # The public setter re-validates positive definiteness, which near-singular fits can fail
+            Loaded.Model._covars_ = Archive["Covariances"]
+            Loaded.Scaler.mean_ = Archive["ScalerMean"]
+            Loaded.Scaler.scale_ = Archive["ScalerScale"]
+            Loaded.Scaler.var_ = Archive["ScalerVariance"]
+            Loaded.Scaler.n_samples_seen_ = Archive["ScalerSamples"][()]
+            Loaded.Scaler.n_features_in_ = len(Loaded.Scaler.mean_)
+            if Loaded.Projection is not None:
+                Loaded.Projection.mean_ = Archive["ProjectionMean"]
+                Loaded.Projection.components_ = Archive["ProjectionComponents"]
+                Loaded.Projection.explained_variance_ = Archive["ProjectionVariance"]
+                Loaded.Projection.n_components_ = len(Loaded.Projection.components_)
+                Loaded.Projection.n_features_in_ = len(Loaded.Scaler.mean_)
+        Loaded.StateMapping = {int(State): Label for State, Label in Metadata["StateMapping"].items()}
+        Loaded.FeatureColumns = Metadata["FeatureColumns"]
+        return Loaded
+
     def GetTransitionProbabilities(self) -> pd.DataFrame:
         """Return transition probability matrix as a DataFrame."""
         Matrix = self.Model.transmat_
         Labels = [self.StateMapping.get(i, f"State{i}") for i in range(self.NumberOfStates)]
         return pd.DataFrame(Matrix, index=Labels, columns=Labels)
 
+    def GetStateLabels(self) -> np.ndarray:
+        """Return the regime label of every state as an array indexed by state number."""
+        return np.array([self.StateMapping.get(i, f"State{i}") for i in range(self.NumberOfStates)], dtype=object)
+
     def PredictRegime(self, Data: pd.DataFrame, FeatureColumns: List[str]) -> pd.DataFrame:
         ResultData = Data.copy()
         CleanData = ResultData.dropna(subset=FeatureColumns)
         ObservationMatrix = CleanData[FeatureColumns].values
-        ScaledMatrix = self.Scaler.transform(ObservationMatrix)
-        Predictions = self.Model.predict(ScaledMatrix)
+        ScaledMatrix = self.TransformFeatures(ObservationMatrix)
+        return self.AssignRegimes(ResultData, CleanData.index, ScaledMatrix)
+
+    def AssignRegimes(self, ResultData: pd.DataFrame, Index: pd.Index, ScaledMatrix: np.ndarray,
+                      Predictions: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """
+        Decode ScaledMatrix and write Regime, MostLikelyState and StateProbability for the rows in Index.
+        Predictions may pass a Viterbi path already computed for the same matrix, e.g. TrainingStates.
+        """
+        if Predictions is None:
+            Predictions = self.Model.predict(ScaledMatrix)
         Probabilities = self.Model.predict_proba(ScaledMatrix)
-        Mapping = self.StateMapping
-        RegimeSeries = pd.Series(index=CleanData.index, data=[Mapping[p] for p in Predictions])
-        ResultData["Regime"] = RegimeSeries
+        Labels = self.GetStateLabels()
+        ResultData["Regime"] = pd.Series(index=Index, data=Labels[Predictions])
         MostLikelyStates = Probabilities.argmax(axis=1)
         MaxProbabilities = Probabilities.max(axis=1)
-        StateSeries = pd.Series(index=CleanData.index, data=[Mapping[p] for p in MostLikelyStates])
-        ProbabilitySeries = pd.Series(index=CleanData.index, data=MaxProbabilities)
-        ResultData["MostLikelyState"] = StateSeries
-        ResultData["StateProbability"] = ProbabilitySeries
+        ResultData["MostLikelyState"] = pd.Series(index=Index, data=Labels[MostLikelyStates])
+        ResultData["StateProbability"] = pd.Series(index=Index, data=MaxProbabilities)
         return ResultData
+
+
+_ScoringMinimumCovariance = 1e-7
+
+
+def _CovarianceCholesky(Model: GaussianHMM) -> np.ndarray:
+    """
+    Lower Cholesky factor of every state covariance, regularized like hmmlearn when one is not positive definite.
+    covars_ expands every covariance type to full matrices, so diag and tied models need no special case.
+    """
+    Cholesky = np.empty_like(Model.covars_)
+    for State, Covariance in enumerate(Model.covars_):
+        try:
+            Cholesky[State] = linalg.cholesky(Covariance, lower=True)
+        except linalg.LinAlgError:
+            # hmmlearn scores near-singular covariances with its default min_covar, not the model's
+            Regularized = Covariance + _ScoringMinimumCovariance * np.eye(len(Covariance))
+            Cholesky[State] = linalg.cholesky(Regularized, lower=True)
+    return Cholesky
+
+
+class OnlineRegimeFilter:
+    """
+    Forward filter over a fitted HiddenMarkovModel for live bars.
+
+    Keeps the normalized forward vector and advances it one observation at a time,
+    so the regime of the newest bar costs O(K^2 + K*D^2) instead of re-decoding the
+    whole history. Probabilities are filtered, i.e. they only use bars up to the
+    current one, unlike the smoothed predict_proba output.
+    """
+
+    def __init__(self, MarketModel: HiddenMarkovModel, FeatureColumns: List[str]) -> None:
+        Model = MarketModel.Model
+        self.FeatureColumns = FeatureColumns
+        self.Labels = list(MarketModel.GetStateLabels())
+        self.StartProbabilities = Model.startprob_.copy()
+        self.TransitionMatrix = Model.transmat_.copy()
+        self.Means = Model.means_.copy()
+        # Whitening factors turn each Gaussian log-density into a squared norm
+        Cholesky = _CovarianceCholesky(Model)
+        Identity = np.eye(Cholesky.shape[1])
+        InverseCholesky = np.stack([linalg.solve_triangular(Factor, Identity, lower=True) for Factor in Cholesky])
+        # Stack all states and fold in the scaler and projection so one mat-vec whitens a raw observation
+        Offset, Linear = MarketModel.AffineTransform()
+        Whitening = InverseCholesky.reshape(-1, Cholesky.shape[1]) @ Linear
+        self.Whitening = np.ascontiguousarray(Whitening)
+        self.WhitenedOffsets = Whitening @ Offset + np.einsum("kij,kj->ki", InverseCholesky, self.Means).ravel()
+        LogDeterminants = 2 * np.log(np.diagonal(Cholesky, axis1=1, axis2=2)).sum(axis=1)
+        self.LogNormalizer = -0.5 * (self.Means.shape[1] * np.log(2 * np.pi) + LogDeterminants)
+        self.Reset()
+
+    def Reset(self) -> None:
+        """Forget all observations; the next update starts from the start probabilities."""
+        self.ForwardProbabilities = None
+
+    def Update(self, Observation: np.ndarray) -> Tuple[str, float]:
+        """
+        Advance the filter by one unscaled feature vector.
+
+        Returns:
+            Tuple of the most likely state label and its filtered probability
+        """
+        Whitened = (self.Whitening @ Observation - self.WhitenedOffsets).reshape(len(self.Means), -1)
+        LogEmission = self.LogNormalizer - 0.5 * (Whitened * Whitened).sum(axis=1)
+        Emission = np.exp(LogEmission - LogEmission.max())
+        if self.ForwardProbabilities is None:
+            Predicted = self.StartProbabilities
+        else:
+            Predicted = self.ForwardProbabilities @ self.TransitionMatrix
+        Forward = Predicted * Emission
+        Total = Forward.sum()
+        self.ForwardProbabilities = Forward / Total if Total > 0 else Emission / Emission.sum()
+        State = int(self.ForwardProbabilities.argmax())
+        return self.Labels[State], float(self.ForwardProbabilities[State])
+
+    def UpdateFrame(self, NewData: pd.DataFrame) -> pd.DataFrame:
+        """
+        Filter the rows of NewData in order and add MostLikelyState and StateProbability.
+        Rows with missing features are left empty and do not advance the filter.
+        """
+        ResultData = NewData.copy()
+        States = pd.Series(index=NewData.index, dtype=object)
+        Probabilities = pd.Series(index=NewData.index, dtype=float)
+        Observations = NewData[self.FeatureColumns].to_numpy(dtype=float)
+        for Position, Observation in enumerate(Observations):
+            if np.isnan(Observation).any():
+                continue
+            States.iloc[Position], Probabilities.iloc[Position] = self.Update(Observation)
+        ResultData["MostLikelyState"] = States
+        ResultData["StateProbability"] = Probabilities
+        return ResultData
+
+
+def StackFeatureFrames(Frames: Dict[str, pd.DataFrame],
+                       FeatureColumns: List[str]) -> Tuple[np.ndarray, List[str], pd.Index]:
+    """
+    Stack per-ticker feature frames into a (tickers, time, features) array on the union of their indexes.
+
+    Returns:
+        Tuple of the array, with NaN where a ticker has no row, the ticker symbols and the shared index
+    """
+    TickerSymbols = list(Frames)
+    Index = Frames[TickerSymbols[0]].index
+    for TickerSymbol in TickerSymbols[1:]:
+        Index = Index.union(Frames[TickerSymbol].index)
+    Observations = np.full((len(TickerSymbols), len(Index), len(FeatureColumns)), np.nan)
+    for Position, TickerSymbol in enumerate(TickerSymbols):
+        Frame = Frames[TickerSymbol]
+        Observations[Position, Index.get_indexer(Frame.index)] = Frame[FeatureColumns].to_numpy(dtype=float)
+    return Observations, TickerSymbols, Index
+
+
+class BatchRegimeDecoder:
+    """
+    Decodes many series with one fitted HiddenMarkovModel at once.
+
+    Forward-backward and Viterbi run in log space with every recursion step
+    vectorized over the tickers, so a universe costs one pass over time instead
+    of one hmmlearn call per ticker. Rows with a missing feature are skipped the
+    way PredictRegime drops them, and the results match predict and predict_proba
+    on each ticker's complete rows.
+    """
+
+    def __init__(self, MarketModel: HiddenMarkovModel, BatchSize: int = 256) -> None:
+        Model = MarketModel.Model
+        self.BatchSize = BatchSize
+        with np.errstate(divide="ignore"):
+            self.LogStartProbabilities = np.log(Model.startprob_)
+            self.LogTransitionMatrix = np.log(Model.transmat_)
+        self.TransitionMatrix = Model.transmat_.copy()
+        self.NumberOfStates = Model.n_components
+        self.Offset, self.Linear = MarketModel.AffineTransform()
+        self.Means = Model.means_.copy()
+        self.Cholesky = _CovarianceCholesky(Model)
+        LogDeterminants = 2 * np.log(np.diagonal(self.Cholesky, axis1=1, axis2=2)).sum(axis=1)
+        self.LogNormalizer = -0.5 * (self.Means.shape[1] * np.log(2 * np.pi) + LogDeterminants)
+        # Regime labels as categorical codes so decoding never maps labels element by element
+        Labels = MarketModel.GetStateLabels()
+        self.Categories, self.LabelCodes = np.unique(Labels.astype(str), return_inverse=True)
+
+    def _LogEmissions(self, Observations: np.ndarray) -> np.ndarray:
+        """Log-density of (rows, features) unscaled observations under every state, as (rows, states)."""
+        LogEmissions = np.empty((len(Observations), self.NumberOfStates))
+        ChunkRows = max(1, 2**22 // Observations.shape[1])
+        for Start in range(0, len(Observations), ChunkRows):
+            ScaledMatrix = (Observations[Start:Start + ChunkRows] - self.Offset) @ self.Linear.T
+            for State in range(self.NumberOfStates):
+                # Triangular solves rather than an explicit inverse, as hmmlearn, for near-singular fits
+                Whitened = linalg.solve_triangular(
+                    self.Cholesky[State], (ScaledMatrix - self.Means[State]).T, lower=True, check_finite=False
+                )
+                LogEmissions[Start:Start + ChunkRows, State] = (
+                    self.LogNormalizer[State] - 0.5 * np.einsum("ij,ij->j", Whitened, Whitened)
+                )
+        return LogEmissions
+
+    def _DecodeBatch(self, Packed: np.ndarray, Lengths: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Forward-backward and Viterbi over series whose first Lengths rows are valid.
+        Padded steps carry the recursions unchanged, so they never affect the valid rows.
+        The recursions run on time-major arrays so each step reads contiguous memory.
+        """
+        Series, Steps, Features = Packed.shape
+        Mask = (np.arange(Steps)[:, None] < Lengths)[:, :, None]
+        TimeMajor = np.ascontiguousarray(Packed.transpose(1, 0, 2)).reshape(Steps * Series, Features)
+        LogEmissions = self._LogEmissions(TimeMajor).reshape(Steps, Series, -1)
+        LogEmissions[~Mask[:, :, 0]] = 0.0
+
+        # Forward pass; the max shift keeps exp(alpha) @ A in range
+        LogAlpha = np.empty_like(LogEmissions)
+        LogAlpha[0] = self.LogStartProbabilities + LogEmissions[0]
+        # Viterbi scores and back pointers
+        LogDelta = LogAlpha[0].copy()
+        BackPointers = np.zeros((Steps, Series, self.NumberOfStates), dtype=np.int8)
+        with np.errstate(divide="ignore"):
+            for Step in range(1, Steps):
+                Previous = LogAlpha[Step - 1]
+                Shift = Previous.max(axis=1, keepdims=True)
+                Forward = np.log(np.exp(Previous - Shift) @ self.TransitionMatrix) + Shift + LogEmissions[Step]
+                LogAlpha[Step] = np.where(Mask[Step], Forward, Previous)
+
+                Scores = LogDelta[:, :, None] + self.LogTransitionMatrix
+                BackPointers[Step] = Scores.argmax(axis=1)
+                LogDelta = np.where(Mask[Step], Scores.max(axis=1) + LogEmissions[Step], LogDelta)
+
+            LogBeta = np.zeros_like(LogEmissions)
+            for Step in range(Steps - 2, -1, -1):
+                Next = LogEmissions[Step + 1] + LogBeta[Step + 1]
+                Shift = Next.max(axis=1, keepdims=True)
+                Backward = np.log(np.exp(Next - Shift) @ self.TransitionMatrix.T) + Shift
+                LogBeta[Step] = np.where(Mask[Step + 1], Backward, 0.0)
+
+        Final = LogAlpha[-1]
+        FinalShift = Final.max(axis=1, keepdims=True)
+        LogLikelihood = np.log(np.exp(Final - FinalShift).sum(axis=1, keepdims=True)) + FinalShift
+        LogAlpha += LogBeta
+        LogAlpha -= LogLikelihood
+        Posteriors = np.exp(LogAlpha, out=LogAlpha).transpose(1, 0, 2)
+
+        States = np.empty((Steps, Series), dtype=np.int64)
+        Current = LogDelta.argmax(axis=1)
+        Rows = np.arange(Series)
+        for Step in range(Steps - 1, 0, -1):
+            States[Step] = Current
+            Current = np.where(Mask[Step, :, 0], BackPointers[Step, Rows, Current], Current)
+        States[0] = Current
+        return States.T, Posteriors, LogLikelihood[:, 0]
+
+    def Decode(self, Observations: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Decode a (tickers, time, features) array of unscaled features.
+
+        Returns:
+            Tuple of the Viterbi states (tickers, time), smoothed state probabilities
+            (tickers, time, states), per-ticker log-likelihoods and the mask of decoded
+            rows; states and probabilities are only meaningful where the mask is set
+        """
+        Valid = ~np.isnan(Observations).any(axis=2)
+        # Move every ticker's complete rows to the front, keeping their order
+        Order = np.argsort(~Valid, axis=1, kind="stable")
+        Packed = np.take_along_axis(Observations, Order[:, :, None], axis=1)
+        Packed = np.nan_to_num(Packed, copy=False)
+        Lengths = Valid.sum(axis=1)
+
+        States = np.zeros(Valid.shape, dtype=np.int64)
+        Posteriors = np.zeros(Valid.shape + (self.NumberOfStates,))
+        LogLikelihoods = np.full(len(Observations), np.nan)
+        for Start in range(0, len(Observations), self.BatchSize):
+            Batch = slice(Start, Start + self.BatchSize)
+            Used = max(int(Lengths[Batch].max(initial=0)), 1)
+            BatchStates, BatchPosteriors, BatchLogLikelihoods = self._DecodeBatch(Packed[Batch, :Used], Lengths[Batch])
+            # Scatter the packed rows back to their time positions
+            BatchOrder = Order[Batch, :Used]
+            np.put_along_axis(States[Batch], BatchOrder, BatchStates, axis=1)
+            np.put_along_axis(Posteriors[Batch], BatchOrder[:, :, None], BatchPosteriors, axis=1)
+            LogLikelihoods[Batch] = np.where(Lengths[Batch] > 0, BatchLogLikelihoods, np.nan)
+        return States, Posteriors, LogLikelihoods, Valid
+
+    def DecodeFrame(self, Observations: np.ndarray, TickerSymbols: List[str], Index: pd.Index) -> pd.DataFrame:
+        """
+        Decode a universe and return one row per ticker and decoded bar.
+
+        Returns:
+            Long DataFrame with Ticker, Timestamp, Regime, MostLikelyState and
+            StateProbability columns; the label columns are categorical
+        """
+        States, Posteriors, _, Valid = self.Decode(Observations)
+        SeriesPositions, TimePositions = np.nonzero(Valid)
+        DecodedPosteriors = Posteriors[SeriesPositions, TimePositions]
+        MostLikelyStates = DecodedPosteriors.argmax(axis=1)
+        return pd.DataFrame(
+            {
+                "Ticker": pd.Categorical.from_codes(SeriesPositions, categories=list(TickerSymbols)),
+                "Timestamp": Index[TimePositions],
+                "Regime": pd.Categorical.from_codes(
+                    self.LabelCodes[States[SeriesPositions, TimePositions]], categories=self.Categories
+                ),
+                "MostLikelyState": pd.Categorical.from_codes(self.LabelCodes[MostLikelyStates], categories=self.Categories),
+                "StateProbability": DecodedPosteriors[np.arange(len(MostLikelyStates)), MostLikelyStates],
+            }
+        )
@@ -1,27 +1,39 @@
+import copy
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 from sklearn.metrics import accuracy_score, f1_score
 
 from HiddenMarkovModel import HiddenMarkovModel
+from PipelineProfiler import AddFitReport, PipelineProfiler, ProfileSection
 
 
-def EvaluateRegimePrediction(Data: pd.DataFrame, FeatureColumns: List[str], TrainFraction: float = 0.8) -> Dict[str, float]:
-    """Train on a portion of the data and evaluate predictions on the remainder."""
+def EvaluateRegimePrediction(Data: pd.DataFrame, FeatureColumns: List[str], TrainFraction: float = 0.8,
+                             Profiler: Optional[PipelineProfiler] = None,
+                             ModelOptions: Optional[Dict] = None) -> Dict[str, float]:
+    """
+    Train on a portion of the data and evaluate predictions on the remainder.
+    With a Profiler the holdout fit is recorded with its iterations and convergence.
+    ModelOptions are passed to HiddenMarkovModel, e.g. NumberOfStates or CovarianceType.
+    """
     if "LogReturn" not in Data.columns:
         raise ValueError("Data must contain LogReturn column")
 
     SplitIndex = int(len(Data) * TrainFraction)
-    TrainData = Data.iloc[:SplitIndex].copy()
-    ValidationData = Data.iloc[SplitIndex:].copy()
+    TrainData = Data.iloc[:SplitIndex]
+    ValidationData = Data.iloc[SplitIndex:]
 
-    Model = HiddenMarkovModel()
-    Model.Fit(TrainData, FeatureColumns)
+    Model = HiddenMarkovModel(**(ModelOptions or {}))
+    with ProfileSection(Profiler, "HoldoutFit", "Model") as Record:
+        Model.Fit(TrainData, FeatureColumns)
+        AddFitReport(Record, Model.FitReport)
 
     ValidationData = Model.PredictRegime(ValidationData, FeatureColumns)
     ValidationData = ValidationData.dropna(subset=["LogReturn", "MostLikelyState"])
 
     CleanValidation = ValidationData.dropna(subset=FeatureColumns)
-    ValMatrix = Model.Scaler.transform(CleanValidation[FeatureColumns].values)
+    ValMatrix = Model.TransformFeatures(CleanValidation[FeatureColumns].values)
     LogLikelihood = Model.Model.score(ValMatrix)
 
     def DetermineActualRegime(Return):
@@ -37,3 +49,132 @@ def EvaluateRegimePrediction(Data: pd.DataFrame, FeatureColumns: List[str], Trai
     F1 = f1_score(ValidationData["ActualRegime"], ValidationData["MostLikelyState"], average="macro")
 
     return {"LogLikelihood": LogLikelihood, "Accuracy": Accuracy, "F1Score": F1}
+
+
+def _ActualRegimes(LogReturns: np.ndarray) -> np.ndarray:
+    """Label each return as Uptrend, Downtrend or Sideway by its sign."""
+    return np.where(LogReturns > 0, "Uptrend", np.where(LogReturns < 0, "Downtrend", "Sideway"))
+
+
+def _EvaluateFold(Model: HiddenMarkovModel, ScaledMatrix: np.ndarray, LogReturns: np.ndarray,
+                  FoldSpec: Tuple[int, int, int, int, int], WarmStart: bool) -> Dict[str, float]:
+    """
+    Fit Model on the fold's training rows of the scaled matrix and score its validation rows.
+    The states are labelled from the fold's own training rows, also after a warm start,
+    which would otherwise keep the labels of the model it started from.
+    """
+    Fold, TrainStart, TrainEnd, ValidationStart, ValidationEnd = FoldSpec
+    TrainMatrix, TrainReturns = ScaledMatrix[TrainStart:TrainEnd], LogReturns[TrainStart:TrainEnd]
+    Model.FitMatrix(TrainMatrix, TrainReturns, WarmStart=WarmStart)
+    if Model.FitReport["WarmStart"]:
+        Model._MapStates(TrainMatrix, TrainReturns)
+    ValidationMatrix = ScaledMatrix[ValidationStart:ValidationEnd]
+    Probabilities = Model.Model.predict_proba(ValidationMatrix)
+    Labels = Model.GetStateLabels()
+    MostLikelyStates = Labels[Probabilities.argmax(axis=1)]
+    ActualRegimes = _ActualRegimes(LogReturns[ValidationStart:ValidationEnd])
+    return {
+        "Fold": Fold,
+        "TrainRows": TrainEnd - TrainStart,
+        "ValidationRows": ValidationEnd - ValidationStart,
+        "LogLikelihood": Model.Model.score(ValidationMatrix),
+        "Accuracy": accuracy_score(ActualRegimes, MostLikelyStates),
+        "F1Score": f1_score(ActualRegimes, MostLikelyStates, average="macro"),
+        "FitSeconds": Model.FitReport["Seconds"],
+        "Iterations": Model.FitReport["Iterations"],
+        "WarmStart": Model.FitReport["WarmStart"],
+    }
+
+
+def _EvaluateFoldChain(
+    BaseModel: HiddenMarkovModel,
+    ScaledMatrix: np.ndarray,
+    LogReturns: np.ndarray,
+    FoldSpecs: List[Tuple[int, int, int, int, int]],
+) -> List[Dict[str, float]]:
+    """
+    Evaluate folds that each warm-start from their own copy of BaseModel, so a fold's
+    result never depends on which other folds ran in the same process.
+    """
+    return [
+        _EvaluateFold(copy.deepcopy(BaseModel), ScaledMatrix, LogReturns, FoldSpec, WarmStart=True)
+        for FoldSpec in FoldSpecs
+    ]
+
+
+def WalkForwardEvaluate(
+    Data: pd.DataFrame,
+    FeatureColumns: List[str],
+    Folds: int = 5,
+    Workers: int = 1,
+    Window: str = "expanding",
+    RandomState: Optional[int] = 0,
+    ModelOptions: Optional[Dict] = None,
+) -> pd.DataFrame:
+    """
+    Walk-forward evaluation over consecutive validation blocks.
+
+    Rows with complete features are split into Folds + 1 contiguous blocks; fold i
+    validates on block i + 1 and trains on blocks 0..i ("expanding") or on block i
+    alone ("rolling"). Fold 0 is a cold fit seeded with RandomState and every later
+    fold warm-starts from it, so the later folds are independent fits that are
+    spread over Workers processes, and the results do not depend on Workers. Each
+    fold labels its states from its own training rows.
+
+    The scaler, and the projection when ModelOptions set one, is fitted on fold 0's
+    training rows only and the feature matrix is scaled once. This keeps the warm
+    start parameters and the validation log-likelihoods of all folds in one feature
+    space; later folds, rolling ones in particular, are therefore scaled with
+    statistics from older data than their own training rows.
+
+    ModelOptions are passed to HiddenMarkovModel, e.g. NumberOfStates or CovarianceType.
+
+    Returns:
+        DataFrame with one row per fold holding the date ranges, LogLikelihood,
+        Accuracy, F1Score and fit timings
+    """
+    if "LogReturn" not in Data.columns:
+        raise ValueError("Data must contain LogReturn column")
+    if Window not in ("expanding", "rolling"):
+        raise ValueError(f"Unknown walk-forward window: {Window}")
+    if Folds < 1 or Workers < 1:
+        raise ValueError("Folds and Workers must be at least 1")
+
+    CleanData = Data.dropna(subset=FeatureColumns + ["LogReturn"])
+    if len(CleanData) < Folds + 1:
+        raise ValueError("Not enough rows with complete features for the requested number of folds")
+    FeatureMatrix = CleanData[FeatureColumns].to_numpy(dtype=float)
+    LogReturns = CleanData["LogReturn"].to_numpy(dtype=float)
+
+    Boundaries = np.linspace(0, len(CleanData), Folds + 2).astype(int)
+    FoldSpecs = []
+    for Fold in range(Folds):
+        TrainStart = 0 if Window == "expanding" else Boundaries[Fold]
+        FoldSpecs.append((Fold, TrainStart, Boundaries[Fold + 1], Boundaries[Fold + 1], Boundaries[Fold + 2]))
+    BaseModel = HiddenMarkovModel(**{"RandomState": RandomState, **(ModelOptions or {})})
+    _, TrainStart, TrainEnd, _, _ = FoldSpecs[0]
+    BaseModel.FitTransformFeatures(FeatureMatrix[TrainStart:TrainEnd])
+    ScaledMatrix = BaseModel.TransformFeatures(FeatureMatrix)
+    Rows = [_EvaluateFold(BaseModel, ScaledMatrix, LogReturns, FoldSpecs[0], WarmStart=False)]
+
+    # Contiguous chains so each worker receives the scaled matrix once
+    Chains = [list(Chain) for Chain in np.array_split(np.arange(1, Folds), max(1, min(Workers, Folds - 1)))]
+    ChainSpecs = [[FoldSpecs[Fold] for Fold in Chain] for Chain in Chains if len(Chain)]
+    if Workers == 1:
+        for Specs in ChainSpecs:
+            Rows += _EvaluateFoldChain(BaseModel, ScaledMatrix, LogReturns, Specs)
+    elif ChainSpecs:
+        with ProcessPoolExecutor(max_workers=len(ChainSpecs)) as Executor:
+            Futures = [
+                Executor.submit(_EvaluateFoldChain, BaseModel, ScaledMatrix, LogReturns, Specs)
+                for Specs in ChainSpecs
+            ]
+            Rows += [Row for Future in Futures for Row in Future.result()]
+
+    Results = pd.DataFrame(Rows)
+    Index = CleanData.index
+    Results.insert(1, "TrainStart", [Index[Spec[1]] for Spec in FoldSpecs])
+    Results.insert(2, "TrainEnd", [Index[Spec[2] - 1] for Spec in FoldSpecs])
+    Results.insert(3, "ValidationStart", [Index[Spec[3]] for Spec in FoldSpecs])
+    Results.insert(4, "ValidationEnd", [Index[Spec[4] - 1] for Spec in FoldSpecs])
+    return Results
@@ -0,0 +1,64 @@
+import hashlib
+import os
+import re
+import uuid
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from HiddenMarkovModel import HiddenMarkovModel
+
+
+class ModelRegistry:
+    """
+    Directory of saved HiddenMarkovModel files keyed by ticker, interval, feature set, training window
+    and a content hash of the training data.
+    Lets the dashboard and batch jobs load a fitted model instead of retraining it.
+    """
+
+    def __init__(self, RegistryDirectory: str = ".model_registry"):
+        self.RegistryDirectory = RegistryDirectory
+        os.makedirs(RegistryDirectory, exist_ok=True)
+
+    def GetPath(self, TickerSymbol: str, Interval: str, FeatureColumns: List[str],
+                TrainStart: pd.Timestamp, TrainEnd: pd.Timestamp,
+                IndicatorParameters: Optional[Dict[str, Dict]] = None, ModelParameters: Optional[Dict] = None,
+                DataKey: Optional[str] = None) -> str:
+        """
+        Return the file path for a model. Indicator and model parameters are part of the key
+        because they change the features or the fit without changing the column names, and
+        DataKey, a hash of the training data, because re-downloaded bars can change values
+        without changing the training window.
+        """
+        Key = repr(
+            (list(FeatureColumns), IndicatorParameters or {}, ModelParameters or {},
+             pd.Timestamp(TrainStart).isoformat(), pd.Timestamp(TrainEnd).isoformat(), DataKey)
+        )
+        Digest = hashlib.sha1(Key.encode()).hexdigest()[:16]
+        Prefix = re.sub(r"[^A-Za-z0-9_.-]", "_", f"{TickerSymbol}_{Interval}")
+        return os.path.join(self.RegistryDirectory, f"{Prefix}_{Digest}.npz")
+
+    def Load(self, TickerSymbol: str, Interval: str, FeatureColumns: List[str],
+             TrainStart: pd.Timestamp, TrainEnd: pd.Timestamp,
+             IndicatorParameters: Optional[Dict[str, Dict]] = None,
+             ModelParameters: Optional[Dict] = None, DataKey: Optional[str] = None) -> Optional[HiddenMarkovModel]:
+        """Return the registered model, or None when no model was saved under this key."""
+        Path = self.GetPath(TickerSymbol, Interval, FeatureColumns, TrainStart, TrainEnd,
+                            IndicatorParameters, ModelParameters, DataKey)
+        if not os.path.exists(Path):
+            return None
+        return HiddenMarkovModel.Load(Path)
+
+    def Save(self, Model: HiddenMarkovModel, TickerSymbol: str, Interval: str, FeatureColumns: List[str],
+             TrainStart: pd.Timestamp, TrainEnd: pd.Timestamp,
+             IndicatorParameters: Optional[Dict[str, Dict]] = None, ModelParameters: Optional[Dict] = None,
+             DataKey: Optional[str] = None) -> str:
+        """Save Model under its key and return the file path."""
+        Path = self.GetPath(TickerSymbol, Interval, FeatureColumns, TrainStart, TrainEnd,
+                            IndicatorParameters, ModelParameters, DataKey)
+        # Unique, so a dashboard and a batch job saving the same key never write to one temporary file;
+        # it keeps the .npz suffix because numpy appends one otherwise
+        TemporaryPath = f"{Path[:-4]}.{uuid.uuid4().hex}.tmp.npz"
+        Model.Save(TemporaryPath)
+        os.replace(TemporaryPath, Path)
+        return Path
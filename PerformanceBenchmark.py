@@ -0,0 +1,458 @@
+import argparse
+import itertools
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+from typing import Callable, Dict, List, Optional, Sequence
+
+import FeatureEngineering as FeatureEngineeringModule
+from BacktestingModule import RunBacktest
+
+from FeatureEngineering import (
+    DefaultIndicatorParameters,
+    DefaultIndicators,
+    FeatureEngineering,
+    RollingMeanAbsoluteDeviation,
+    _RollingMeanAbsoluteDeviationNumpy,
+)
+from HiddenMarkovModel import HiddenMarkovModel
+from ModelEvaluation import EvaluateRegimePrediction
+from PipelineProfiler import PipelineProfiler
+
+OhlcvColumns = ["Open", "High", "Low", "Close", "Volume"]
+RegimeLabels = ["Uptrend", "Downtrend", "Sideway"]
+SuiteSizes = (10_000, 100_000, 1_000_000)
+
+
+def GenerateSyntheticOhlcv(Bars: int, Seed: int = 0, Interval: str = "15min",
+                           StayProbability: float = 0.995) -> pd.DataFrame:
+    """
+    Generate deterministic OHLCV bars from a regime-switching geometric Brownian motion.
+
+    A sticky Markov chain switches between Uptrend, Downtrend and Sideway regimes,
+    each with its own drift and volatility. The planted regime of every bar is
+    returned in the PlantedRegime column so it can be used as ground truth.
+
+    Args:
+        Bars: Number of bars to generate
+        Seed: Seed of the random generator
+        Interval: Pandas frequency of the DatetimeIndex
+        StayProbability: Probability of staying in the current regime at each bar
+
+    Returns:
+        DataFrame with Open, High, Low, Close, Volume and PlantedRegime columns
+    """
+    Generator = np.random.default_rng(Seed)
+    Drifts = np.array([0.0006, -0.0006, 0.0])
+    Volatilities = np.array([0.002, 0.003, 0.0015])
+
+    # Regime durations are geometric, so the chain is sampled segment by segment
+    States = np.empty(Bars, dtype=np.int64)
+    Position = 0
+    State = int(Generator.integers(len(RegimeLabels)))
+    while Position < Bars:
+        Duration = int(Generator.geometric(1 - StayProbability))
+        States[Position:Position + Duration] = State
+        Position += Duration
+        State = int((State + Generator.integers(1, len(RegimeLabels))) % len(RegimeLabels))
+
+    LogReturns = Generator.normal(Drifts[States], Volatilities[States])
+    Close = 100 * np.exp(np.cumsum(LogReturns))
+    Open = np.concatenate(([100.0], Close[:-1])) * np.exp(Generator.normal(0, 0.0005, Bars))
+    Spread = np.abs(Generator.normal(0, Volatilities[States] / 2))
+    High = np.maximum(Open, Close) * np.exp(Spread)
+    Low = np.minimum(Open, Close) * np.exp(-np.abs(Generator.normal(0, Volatilities[States] / 2)))
+    Volume = Generator.lognormal(10, 0.5, Bars) * (1 + 10 * np.abs(LogReturns))
+    Index = pd.date_range("2020-01-01", periods=Bars, freq=Interval)
+    return pd.DataFrame(
+        {
+            "Open": Open,
+            "High": High,
+            "Low": Low,
+            "Close": Close,
+            "Volume": Volume,
+            "PlantedRegime": np.array(RegimeLabels)[States],
+        },
+        index=Index,
+    )
+
+
+def BuildFeatureFrame(Data: pd.DataFrame) -> tuple[pd.DataFrame, list[str]]:
+    """Apply the dashboard indicators and LogReturn, returning the frame and its feature columns."""
+    Features = FeatureEngineering().ApplyTechnicalAnalysis(
+        Data[OhlcvColumns], DefaultIndicators, DefaultIndicatorParameters
+    )
+    Features["LogReturn"] = np.log(Features["Close"]).diff()
+    FeatureColumns = [Column for Column in Features.columns if Column not in OhlcvColumns]
+    return Features, FeatureColumns
+
+
+def _BestTime(Function: Callable[[], object], Repeats: int) -> float:
+    """Return the fastest wall time in seconds over several runs."""
+    Timings = []
+    for _ in range(Repeats):
+        Start = time.perf_counter()
+        Function()
+        Timings.append(time.perf_counter() - Start)
+    return min(Timings)
+
+
+def BenchmarkMeanDeviation(Sizes: Sequence[int] = (100_000, 1_000_000), Window: int = 20,
+                           Repeats: int = 3, Seed: int = 0) -> pd.DataFrame:
+    """
+    Compare the CCI mean absolute deviation kernels with the original rolling.apply lambda.
+
+    Args:
+        Sizes: Number of bars to benchmark
+        Window: Rolling window length
+        Repeats: Runs per kernel; the fastest run is reported
+        Seed: Seed for the synthetic random-walk prices
+
+    Returns:
+        DataFrame with one row per size holding timings in seconds and speedups
+    """
+    Generator = np.random.default_rng(Seed)
+    Rows = []
+    for Size in Sizes:
+        Prices = 100 * np.exp(np.cumsum(Generator.normal(0, 0.001, Size)))
+        Series = pd.Series(Prices)
+        Start = time.perf_counter()
+        Reference = Series.rolling(window=Window).apply(lambda x: np.mean(np.abs(x - x.mean())), raw=True)
+        RollingApplySeconds = time.perf_counter() - Start
+        RollingMeanAbsoluteDeviation(Prices[: Window * 2], Window)  # Compile the numba kernel outside the timing
+        NumpySeconds = _BestTime(lambda: _RollingMeanAbsoluteDeviationNumpy(Prices, Window), Repeats)
+        KernelSeconds = _BestTime(lambda: RollingMeanAbsoluteDeviation(Prices, Window), Repeats)
+        MaxDifference = np.nanmax(np.abs(RollingMeanAbsoluteDeviation(Prices, Window) - Reference.to_numpy()))
+        Rows.append(
+            {
+                "Bars": Size,
+                "RollingApplySeconds": RollingApplySeconds,
+                "NumpyKernelSeconds": NumpySeconds,
+                "DefaultKernelSeconds": KernelSeconds,
+                "NumpySpeedup": RollingApplySeconds / NumpySeconds,
+                "DefaultSpeedup": RollingApplySeconds / KernelSeconds,
+                "MaxAbsDifference": MaxDifference,
+            }
+        )
+    return pd.DataFrame(Rows)
+
+
+def BenchmarkWarmRefit(Bars: int = 20000, AppendedBars: int = 100, Seed: int = 0) -> pd.DataFrame:
+    """
+    Compare a cold HMM fit with a warm-started refit after appending bars.
+
+    Args:
+        Bars: Total number of synthetic bars
+        AppendedBars: Bars appended after the initial fit
+        Seed: Seed for the synthetic data
+
+    Returns:
+        DataFrame with iterations, convergence, wall time and log-likelihood per mode
+    """
+    Features, FeatureColumns = BuildFeatureFrame(GenerateSyntheticOhlcv(Bars, Seed))
+    Model = HiddenMarkovModel()
+    Model.Fit(Features.iloc[:-AppendedBars], FeatureColumns)
+    ColdModel = HiddenMarkovModel()
+    ColdModel.Fit(Features, FeatureColumns)
+    Model.Fit(Features, FeatureColumns, WarmStart=True)
+
+    Rows = []
+    for Mode, Fitted in (("Cold", ColdModel), ("Warm", Model)):
+        Clean = Features.dropna(subset=FeatureColumns)
+        Score = Fitted.Model.score(Fitted.TransformFeatures(Clean[FeatureColumns].values))
+        Rows.append({"Mode": Mode, **Fitted.FitReport, "LogLikelihood": Score})
+    return pd.DataFrame(Rows)
+
+
+def _PeakAllocation(Function: Callable[[], object]) -> float:
+    """Return the peak traced allocation of Function in megabytes."""
+    tracemalloc.start()
+    try:
+        Function()
+        _, Peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return Peak / 2**20
+
+
+def BenchmarkFeatureMemory(Bars: int = 1_000_000, Seed: int = 0) -> pd.DataFrame:
+    """
+    Compare the peak memory of preparing the scaled HMM training matrix from a
+    DataFrame with that of the preallocated float64 and float32 feature matrices.
+
+    Args:
+        Bars: Number of synthetic bars
+        Seed: Seed for the synthetic data
+
+    Returns:
+        DataFrame with the peak traced allocation and wall time per mode
+    """
+    Data = GenerateSyntheticOhlcv(Bars, Seed)[OhlcvColumns]
+
+    def PrepareFrame() -> np.ndarray:
+        Features, FeatureColumns = BuildFeatureFrame(Data)
+        CleanData = Features.dropna(subset=FeatureColumns)
+        return StandardScaler().fit_transform(CleanData[FeatureColumns].values)
+
+    def PrepareMatrix(DType: type) -> np.ndarray:
+        FeatureMatrix, _ = FeatureEngineering().ComputeFeatureMatrix(
+            Data, DefaultIndicators, DefaultIndicatorParameters, DType=DType
+        )
+        # The default indicators only leave warm-up rows incomplete, so the training rows are a view
+        TrainingMatrix = FeatureMatrix[np.flatnonzero(~np.isnan(FeatureMatrix).any(axis=1))[0]:]
+        return StandardScaler().fit(TrainingMatrix).transform(TrainingMatrix, copy=False)
+
+    Rows = []
+    for Mode, Prepare in (
+        ("DataFrame", PrepareFrame),
+        ("Matrix float64", lambda: PrepareMatrix(np.float64)),
+        ("Matrix float32", lambda: PrepareMatrix(np.float32)),
+    ):
+        Start = time.perf_counter()
+        PeakMegabytes = _PeakAllocation(Prepare)
+        Rows.append({"Mode": Mode, "PeakMegabytes": PeakMegabytes, "Seconds": time.perf_counter() - Start})
+    return pd.DataFrame(Rows)
+
+
+def _Timed(Function: Callable[[], object]) -> tuple[object, float]:
+    """Run Function once and return its result and wall time in seconds."""
+    Start = time.perf_counter()
+    Result = Function()
+    return Result, time.perf_counter() - Start
+
+
+def _PlantedAccuracy(Regimes: np.ndarray, States: np.ndarray, Planted: np.ndarray) -> Dict[str, float]:
+    """
+    Score decoded regimes against the planted ones.
+
+    PlantedAccuracy uses the model's own Uptrend/Downtrend/Sideway labels, while
+    BestMappingAccuracy takes the best assignment of labels to states and so
+    measures how well the states separate the planted regimes at all.
+    """
+    BestMappingAccuracy = np.nan
+    if States.max(initial=0) < len(RegimeLabels):
+        Labels = np.array(RegimeLabels)
+        BestMappingAccuracy = max(
+            float((Labels[list(Assignment)][States] == Planted).mean())
+            for Assignment in itertools.permutations(range(len(RegimeLabels)))
+        )
+    return {"PlantedAccuracy": float((Regimes == Planted).mean()), "BestMappingAccuracy": BestMappingAccuracy}
+
+
+def BenchmarkCovarianceModes(Bars: int = 50_000, Seed: int = 0, TrainFraction: float = 0.8,
+                             VarianceRatio: float = 0.95) -> pd.DataFrame:
+    """
+    Compare HMM fits across covariance types and PCA projections on one synthetic history.
+
+    Every mode is fitted on the first TrainFraction of the complete rows and scored
+    on the rest. Log-likelihoods are per bar and only comparable between modes with
+    the same Dimensions, since a projection changes the space the density is over;
+    the planted-regime accuracies of the validation Viterbi path compare regime
+    quality across all modes.
+
+    Args:
+        Bars: Number of synthetic bars
+        Seed: Seed for the synthetic data and the HMM initialization
+        TrainFraction: Share of the complete rows used for fitting
+        VarianceRatio: Explained variance kept by the PCA modes
+
+    Returns:
+        DataFrame with dimensions, fit time per fit and per EM iteration, log-likelihoods
+        and accuracies per mode
+    """
+    Data = GenerateSyntheticOhlcv(Bars, Seed)
+    Features, FeatureColumns = BuildFeatureFrame(Data)
+    CleanData = Features.dropna(subset=FeatureColumns)
+    SplitIndex = int(len(CleanData) * TrainFraction)
+    TrainData, ValidationData = CleanData.iloc[:SplitIndex], CleanData.iloc[SplitIndex:]
+    Planted = Data.loc[ValidationData.index, "PlantedRegime"].to_numpy()
+    Modes = [
+        ("full", None, False),
+        ("diag", None, False),
+        ("tied", None, False),
+        ("full", VarianceRatio, False),
+        ("diag", VarianceRatio, False),
+        ("diag", VarianceRatio, True),
+    ]
+
+    Rows = []
+    for CovarianceType, Ratio, Whiten in Modes:
+        Model = HiddenMarkovModel(RandomState=Seed, CovarianceType=CovarianceType, VarianceRatio=Ratio, Whiten=Whiten)
+        Model.Fit(TrainData, FeatureColumns)
+        ValidationMatrix = Model.TransformFeatures(ValidationData[FeatureColumns].values)
+        States = Model.Model.predict(ValidationMatrix)
+        Rows.append({
+            "CovarianceType": CovarianceType,
+            "VarianceRatio": Ratio,
+            "Whiten": Whiten,
+            "Dimensions": Model.Model.n_features,
+            "Seconds": Model.FitReport["Seconds"],
+            "Iterations": Model.FitReport["Iterations"],
+            "SecondsPerIteration": Model.FitReport["Seconds"] / max(1, Model.FitReport["Iterations"]),
+            "Converged": Model.FitReport["Converged"],
+            "TrainLogLikelihood": Model.FitReport["LogLikelihood"] / len(TrainData),
+            "ValidationLogLikelihood": Model.Model.score(ValidationMatrix) / len(ValidationData),
+            **_PlantedAccuracy(Model.GetStateLabels()[States], States, Planted),
+        })
+    return pd.DataFrame(Rows)
+
+
+def BenchmarkSize(Bars: int, Seed: int = 0, Engines: Sequence[str] = ("event", "vectorized")) -> List[Dict]:
+    """
+    Time every pipeline stage on one synthetic history.
+
+    Covers each indicator of ApplyTechnicalAnalysis, HiddenMarkovModel.Fit and
+    PredictRegime on the dashboard features, EvaluateRegimePrediction and
+    RunBacktest with each engine. The Fit entry also scores the decoded regimes
+    against the planted ones.
+
+    Returns:
+        One result dict per benchmark with Benchmark, Bars and Seconds keys
+    """
+    Data = GenerateSyntheticOhlcv(Bars, Seed)
+    Results = []
+
+    Profiler = PipelineProfiler(TrackMemory=False)
+    AllIndicators = FeatureEngineering().GetAvailableIndicators()
+    # Keep one-off costs such as compiling the numba kernels out of the timings
+    FeatureEngineering().ApplyTechnicalAnalysis(Data[OhlcvColumns].iloc[:1000], AllIndicators)
+    _, Seconds = _Timed(
+        lambda: FeatureEngineering(Profiler).ApplyTechnicalAnalysis(Data[OhlcvColumns], AllIndicators)
+    )
+    Results.append({"Benchmark": "ApplyTechnicalAnalysis", "Seconds": Seconds})
+    Results.extend({"Benchmark": f"Indicator:{Record['Name']}", "Seconds": Record["Seconds"]} for Record in Profiler.Sections)
+
+    Features, FeatureColumns = BuildFeatureFrame(Data)
+    Model = HiddenMarkovModel(RandomState=Seed)
+    _, Seconds = _Timed(lambda: Model.Fit(Features, FeatureColumns))
+    RegimeData, PredictSeconds = _Timed(lambda: Model.PredictRegime(Features, FeatureColumns))
+    Decoded = RegimeData.dropna(subset=["Regime"])
+    Accuracy = _PlantedAccuracy(
+        Decoded["Regime"].to_numpy(), Model.TrainingStates, Data.loc[Decoded.index, "PlantedRegime"].to_numpy()
+    )
+    Results.append({
+        "Benchmark": "Fit",
+        "Seconds": Seconds,
+        "Iterations": int(Model.FitReport["Iterations"]),
+        "Converged": bool(Model.FitReport["Converged"]),
+        **Accuracy,
+    })
+    Results.append({"Benchmark": "PredictRegime", "Seconds": PredictSeconds})
+
+    Metrics, Seconds = _Timed(lambda: EvaluateRegimePrediction(Features, FeatureColumns))
+    Results.append({"Benchmark": "EvaluateRegimePrediction", "Seconds": Seconds, **Metrics})
+
+    # Same next-bar alignment of the signals as the dashboard pipeline
+    RegimeData["MostLikelyState"] = RegimeData["MostLikelyState"].shift(-1)
+    RegimeData["StateProbability"] = RegimeData["StateProbability"].shift(-1)
+    for Engine in Engines:
+        Stats, Seconds = _Timed(lambda: RunBacktest(RegimeData, Engine=Engine))
+        Results.append({"Benchmark": f"RunBacktest:{Engine}", "Seconds": Seconds, "Trades": int(Stats["# Trades"])})
+
+    for Result in Results:
+        Result["Bars"] = Bars
+    return Results
+
+
+def RunBenchmarkSuite(Sizes: Sequence[int] = SuiteSizes, Seed: int = 0,
+                      Engines: Sequence[str] = ("event", "vectorized")) -> Dict:
+    """
+    Run BenchmarkSize for every size and return a JSON-serializable report with the environment.
+    Everything runs on deterministic synthetic data, so no network access is needed.
+    """
+    Environment = {
+        "Python": platform.python_version(),
+        "Platform": platform.platform(),
+        "NumPy": np.__version__,
+        "Pandas": pd.__version__,
+        "Numba": FeatureEngineeringModule.njit is not None,
+    }
+    Results = []
+    for Bars in Sizes:
+        Results.extend(BenchmarkSize(Bars, Seed, Engines))
+    return {"Seed": Seed, "Sizes": list(Sizes), "Environment": Environment, "Results": Results}
+
+
+def AddRegressionThresholds(Report: Dict, TimeTolerance: float = 1.5, AccuracyTolerance: float = 0.05,
+                            SlackSeconds: float = 0.05) -> Dict:
+    """
+    Store in every result the limits a later run is checked against: MaxSeconds is
+    the time scaled by TimeTolerance, but at least SlackSeconds above it so that
+    millisecond timings do not flag noise, and the accuracy entries get Min* floors
+    lowered by AccuracyTolerance.
+    """
+    Report["Thresholds"] = {
+        "TimeTolerance": TimeTolerance,
+        "AccuracyTolerance": AccuracyTolerance,
+        "SlackSeconds": SlackSeconds,
+    }
+    for Result in Report["Results"]:
+        Result["MaxSeconds"] = max(Result["Seconds"] * TimeTolerance, Result["Seconds"] + SlackSeconds)
+        for Key in ("PlantedAccuracy", "BestMappingAccuracy"):
+            if Key in Result and not np.isnan(Result[Key]):
+                Result[f"Min{Key}"] = Result[Key] - AccuracyTolerance
+    return Report
+
+
+def CheckRegressions(Report: Dict, Baseline: Dict) -> List[str]:
+    """Compare a report with the thresholds of a baseline report and describe every regression found."""
+    BaselineResults = {(Result["Benchmark"], Result["Bars"]): Result for Result in Baseline["Results"]}
+    Regressions = []
+    for Result in Report["Results"]:
+        Reference = BaselineResults.get((Result["Benchmark"], Result["Bars"]))
+        if Reference is None:
+            continue
+        Name = f"{Result['Benchmark']} at {Result['Bars']} bars"
+        if "MaxSeconds" in Reference and Result["Seconds"] > Reference["MaxSeconds"]:
+            Regressions.append(f"{Name}: {Result['Seconds']:.3f} s exceeds {Reference['MaxSeconds']:.3f} s")
+        for Key in ("PlantedAccuracy", "BestMappingAccuracy"):
+            Floor = Reference.get(f"Min{Key}")
+            if Floor is None:
+                continue
+            # A NaN never compares below the floor, so a missing accuracy has to be reported explicitly
+            Value = Result.get(Key)
+            if Value is None or not np.isfinite(Value):
+                Regressions.append(f"{Name}: {Key} is missing but the baseline requires at least {Floor:.3f}")
+            elif Value < Floor:
+                Regressions.append(f"{Name}: {Key} {Value:.3f} below {Floor:.3f}")
+    return Regressions
+
+
+def _ParseArguments(Arguments: Optional[List[str]] = None) -> argparse.Namespace:
+    Parser = argparse.ArgumentParser(description="Offline benchmarks on synthetic OHLCV data.")
+    Parser.add_argument("--suite", action="store_true", help="run the stage benchmark suite instead of the kernel benchmarks")
+    Parser.add_argument("--sizes", type=int, nargs="+", default=list(SuiteSizes), help="bar counts to benchmark")
+    Parser.add_argument("--seed", type=int, default=0)
+    Parser.add_argument("--engines", nargs="+", default=["event", "vectorized"], help="backtest engines to time")
+    Parser.add_argument("--output", default="benchmark_results.json", help="where to write the JSON report")
+    Parser.add_argument("--baseline", help="earlier report whose thresholds this run must meet")
+    Parser.add_argument("--time-tolerance", type=float, default=1.5)
+    Parser.add_argument("--accuracy-tolerance", type=float, default=0.05)
+    return Parser.parse_args(Arguments)
+
+
+if __name__ == "__main__":
+    Arguments = _ParseArguments()
+    if not Arguments.suite:
+        print(BenchmarkMeanDeviation().to_string(index=False))
+        print(BenchmarkWarmRefit().to_string(index=False))
+        print(BenchmarkFeatureMemory().to_string(index=False))
+        print(BenchmarkCovarianceModes().to_string(index=False))
+        sys.exit(0)
+
+    Report = RunBenchmarkSuite(Arguments.sizes, Arguments.seed, Arguments.engines)
+    AddRegressionThresholds(Report, Arguments.time_tolerance, Arguments.accuracy_tolerance)
+    with open(Arguments.output, "w") as File:
+        json.dump(Report, File, indent=2)
+    print(pd.DataFrame(Report["Results"]).to_string(index=False))
+    if Arguments.baseline:
+        with open(Arguments.baseline) as File:
+            Regressions = CheckRegressions(Report, json.load(File))
+        for Regression in Regressions:
+            print(f"REGRESSION {Regression}")
+        sys.exit(1 if Regressions else 0)
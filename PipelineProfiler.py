@@ -0,0 +1,113 @@
+import json
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+
+
+class PipelineProfiler:
+    """
+    Records wall time and memory of named pipeline sections.
+
+    Sections are opened with Section as context managers and may nest, e.g. one
+    section per indicator inside the Features stage. With TrackMemory the Python
+    allocations are traced with tracemalloc, which also sees NumPy buffers, and
+    every section reports its peak above the allocation level it started from.
+    Tracing slows allocation-heavy code, so timings are best read with it off.
+    """
+
+    def __init__(self, TrackMemory: bool = True) -> None:
+        self.TrackMemory = TrackMemory
+        self.Sections: List[Dict] = []
+        self._Open: List[Dict] = []
+        self._StartedTracing = False
+
+    @contextmanager
+    def Section(self, Name: str, Category: str = "Stage") -> Iterator[Dict]:
+        """
+        Time the enclosed block and yield its record so callers can attach details.
+
+        Records are stored in the order the sections were opened, with the name of
+        the enclosing section as Parent.
+        """
+        if self.TrackMemory and not self._Open and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._StartedTracing = True
+        Record = {
+            "Name": Name,
+            "Category": Category,
+            "Parent": self._Open[-1]["Name"] if self._Open else None,
+        }
+        self.Sections.append(Record)
+        if self.TrackMemory:
+            Current, Peak = tracemalloc.get_traced_memory()
+            if self._Open:
+                # Keep the enclosing section's peak so far before the peak is reset for this one
+                Parent = self._Open[-1]
+                Parent["_Peak"] = max(Parent["_Peak"], Peak)
+            tracemalloc.reset_peak()
+            Record["_Start"] = Current
+            Record["_Peak"] = Current
+        self._Open.append(Record)
+        StartTime = time.perf_counter()
+        try:
+            yield Record
+        finally:
+            Record["Seconds"] = time.perf_counter() - StartTime
+            self._Open.pop()
+            if self.TrackMemory:
+                Current, Peak = tracemalloc.get_traced_memory()
+                Peak = max(Record.pop("_Peak"), Peak)
+                Start = Record.pop("_Start")
+                Record["PeakMegabytes"] = (Peak - Start) / 2**20
+                Record["AllocatedMegabytes"] = (Current - Start) / 2**20
+                if self._Open:
+                    self._Open[-1]["_Peak"] = max(self._Open[-1]["_Peak"], Peak)
+                tracemalloc.reset_peak()
+                if not self._Open and self._StartedTracing:
+                    tracemalloc.stop()
+                    self._StartedTracing = False
+
+    def Report(self) -> Dict:
+        """Return the sections and process totals as a JSON-serializable dict."""
+        MaxResidentSet = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        MaxResidentSet /= 2**20 if sys.platform == "darwin" else 2**10
+        return {
+            "TotalSeconds": sum(Record["Seconds"] for Record in self.Sections if Record["Parent"] is None),
+            "MaxResidentSetMegabytes": MaxResidentSet,
+            "Sections": [{Key: _JsonValue(Value) for Key, Value in Record.items()} for Record in self.Sections],
+        }
+
+    def ToJson(self, Path: Optional[str] = None) -> str:
+        """Serialize Report to JSON and optionally write it to Path."""
+        Text = json.dumps(self.Report(), indent=2)
+        if Path is not None:
+            with open(Path, "w") as File:
+                File.write(Text)
+        return Text
+
+    def ToFrame(self) -> pd.DataFrame:
+        """Return the sections as a DataFrame, one row per section."""
+        return pd.DataFrame(self.Report()["Sections"])
+
+
+def _JsonValue(Value: object) -> object:
+    """Convert NumPy scalars such as the bools in FitReport to plain Python values."""
+    return Value.item() if hasattr(Value, "item") else Value
+
+
+def AddFitReport(Record: Dict, FitReport: Dict) -> None:
+    """Attach a HiddenMarkovModel.FitReport to a section record, keeping the section's own Seconds."""
+    Record.update({("FitSeconds" if Key == "Seconds" else Key): Value for Key, Value in FitReport.items()})
+
+
+def ProfileSection(Profiler: Optional[PipelineProfiler], Name: str, Category: str = "Stage"):
+    """Profiler.Section when a profiler is given, otherwise a context that yields a throwaway record."""
+    if Profiler is None:
+        return nullcontext({})
+    return Profiler.Section(Name, Category)
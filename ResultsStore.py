@@ -0,0 +1,288 @@
+import hashlib
+import json
+import os
+import re
+import uuid
+from numbers import Number
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from ChartDownsampling import RegimeSpans
+
+RegimeColumns = ["Regime", "MostLikelyState"]
+
+_Schemas = {
+    "Runs": pa.schema([
+        ("RunId", pa.string()),
+        ("Ticker", pa.string()),
+        ("Interval", pa.string()),
+        ("CreatedAt", pa.timestamp("ns")),
+        ("DataStart", pa.timestamp("ns")),
+        ("DataEnd", pa.timestamp("ns")),
+        ("RegimeKey", pa.string()),
+        ("Parameters", pa.string()),
+    ]),
+    "Metrics": pa.schema([
+        ("RunId", pa.string()),
+        ("Ticker", pa.string()),
+        ("Source", pa.dictionary(pa.int8(), pa.string())),
+        ("Metric", pa.dictionary(pa.int16(), pa.string())),
+        ("Value", pa.float64()),
+    ]),
+    "Regimes": pa.schema([
+        ("RegimeKey", pa.string()),
+        ("Ticker", pa.string()),
+        ("Timestamp", pa.timestamp("ns")),
+        ("Regime", pa.dictionary(pa.int8(), pa.string())),
+        ("MostLikelyState", pa.dictionary(pa.int8(), pa.string())),
+        ("StateProbability", pa.float32()),
+    ]),
+    "Equity": pa.schema([
+        ("RunId", pa.string()),
+        ("Ticker", pa.string()),
+        ("Timestamp", pa.timestamp("ns")),
+        ("Equity", pa.float64()),
+    ]),
+}
+
+
+def _UtcNaive(Values: object) -> pd.DatetimeIndex:
+    """Timestamps as naive UTC so histories from different exchanges share one column type."""
+    Index = pd.DatetimeIndex(Values)
+    return Index.tz_convert("UTC").tz_localize(None) if Index.tz is not None else Index
+
+
+def _Timestamp(Value: object) -> pd.Timestamp:
+    return _UtcNaive([pd.Timestamp(Value)])[0]
+
+
+def _NumericMetrics(Values: Dict, Source: str) -> List[Dict]:
+    """Keep the numeric entries of a metrics dict or stats Series; private keys such as _trades are skipped."""
+    Rows = []
+    for Name, Value in Values.items():
+        if str(Name).startswith("_") or isinstance(Value, (bool, np.bool_)) or not isinstance(Value, Number):
+            continue
+        Rows.append({"Source": Source, "Metric": str(Name), "Value": float(Value)})
+    return Rows
+
+
+class ResultsStore:
+    """
+    Append-only columnar store of analysis runs, one Parquet file per run and table.
+
+    Runs, Metrics, Regimes and Equity are stored as Parquet datasets with one
+    directory per ticker, so queries only open the files of the requested tickers
+    and row-group statistics skip the dates outside the requested range. Regimes
+    are stored once per RegimeKey, the key of the decoded model, and runs reference
+    them through it, so reruns with new strategy parameters add no per-bar regime
+    rows. Regime labels are dictionary encoded, which Parquet run-length encodes,
+    so per-bar regimes cost bytes per regime change rather than per bar, and bar
+    timestamps are delta encoded. Timestamps are stored as naive UTC. A run becomes
+    visible once its Runs file is written, which happens last, so a crashed append
+    never shows up in queries.
+    """
+
+    def __init__(self, StoreDirectory: str = ".results_store") -> None:
+        self.StoreDirectory = StoreDirectory
+        for Table in _Schemas:
+            os.makedirs(os.path.join(StoreDirectory, Table), exist_ok=True)
+
+    def _TickerDirectory(self, Table: str, Ticker: str) -> str:
+        # The prefix keeps names such as ^GSPC from starting with "_", which dataset discovery skips
+        return os.path.join(self.StoreDirectory, Table, "Ticker=" + re.sub(r"[^A-Za-z0-9_.-]", "_", Ticker))
+
+    def _PartPath(self, Table: str, Ticker: str, Name: str) -> str:
+        return os.path.join(self._TickerDirectory(Table, Ticker), f"{Name}.parquet")
+
+    def _WriteTable(self, Table: str, Ticker: str, Name: str, Frame: pd.DataFrame) -> None:
+        Path = self._PartPath(Table, Ticker, Name)
+        os.makedirs(os.path.dirname(Path), exist_ok=True)
+        # Dot-prefixed, so concurrent queries never scan a part that is still being written, and unique,
+        # so two runs writing the same regimes never share a temporary file
+        TemporaryPath = os.path.join(os.path.dirname(Path), f".{Name}.{uuid.uuid4().hex}.parquet.tmp")
+        Data = pa.Table.from_pandas(Frame, schema=_Schemas[Table], preserve_index=False)
+        # Bar timestamps are evenly spaced, so delta encoding stores them in about a bit per row
+        Delta = [Name for Name in Data.column_names if Name == "Timestamp"]
+        # Write to a temporary file first so a crash never leaves a half-written part
+        pq.write_table(
+            Data,
+            TemporaryPath,
+            compression="zstd",
+            use_dictionary=[Name for Name in Data.column_names if Name not in Delta],
+            column_encoding={Name: "DELTA_BINARY_PACKED" for Name in Delta} or None,
+        )
+        os.replace(TemporaryPath, Path)
+
+    def Append(self, Ticker: str, Interval: str, RegimeData: pd.DataFrame, Metrics: Dict[str, float],
+               Stats: pd.Series, Parameters: Optional[Dict] = None, RegimeKey: Optional[str] = None) -> str:
+        """
+        Store the outputs of one run and return its RunId.
+
+        Args:
+            Ticker: Ticker symbol the run analysed
+            Interval: Bar interval of the data
+            RegimeData: Frame with the Regime, MostLikelyState and StateProbability columns
+            Metrics: EvaluateRegimePrediction metrics
+            Stats: RunBacktest statistics; numeric entries become metrics and _equity_curve is kept
+            Parameters: JSON-serializable run parameters such as dates, strategy and model options
+            RegimeKey: Key of the model that decoded RegimeData, such as the pipeline's model
+                stage key; the regimes are written only for the first run with that key.
+                Defaults to a hash of the regime columns
+        """
+        RunId = uuid.uuid4().hex
+        Decoded = RegimeData.dropna(subset=["Regime"])
+        if RegimeKey is None:
+            Hashed = pd.util.hash_pandas_object(Decoded[RegimeColumns + ["StateProbability"]], index=True)
+            RegimeKey = hashlib.sha1(Hashed.to_numpy().tobytes()).hexdigest()
+        if not os.path.exists(self._PartPath("Regimes", Ticker, RegimeKey)):
+            self._WriteTable("Regimes", Ticker, RegimeKey, pd.DataFrame({
+                "RegimeKey": RegimeKey,
+                "Ticker": Ticker,
+                "Timestamp": _UtcNaive(Decoded.index),
+                **{Column: Decoded[Column].astype("string").to_numpy() for Column in RegimeColumns},
+                "StateProbability": Decoded["StateProbability"].to_numpy(dtype=np.float32),
+            }))
+        EquityCurve = Stats._equity_curve["Equity"]
+        self._WriteTable("Equity", Ticker, RunId, pd.DataFrame({
+            "RunId": RunId,
+            "Ticker": Ticker,
+            "Timestamp": _UtcNaive(EquityCurve.index),
+            "Equity": EquityCurve.to_numpy(dtype=np.float64),
+        }))
+        MetricRows = _NumericMetrics(Metrics, "Evaluation") + _NumericMetrics(Stats, "Backtest")
+        self._WriteTable("Metrics", Ticker, RunId, pd.DataFrame(MetricRows).assign(RunId=RunId, Ticker=Ticker))
+        self._WriteTable("Runs", Ticker, RunId, pd.DataFrame({
+            "RunId": [RunId],
+            "Ticker": [Ticker],
+            "Interval": [Interval],
+            "CreatedAt": [pd.Timestamp.now(tz="UTC").tz_localize(None)],
+            "DataStart": [_Timestamp(RegimeData.index[0])],
+            "DataEnd": [_Timestamp(RegimeData.index[-1])],
+            "RegimeKey": [RegimeKey],
+            "Parameters": [json.dumps(Parameters or {}, sort_keys=True, default=str)],
+        }))
+        return RunId
+
+    def _Read(self, Table: str, Tickers: Optional[Sequence[str]] = None, Filter: Optional[ds.Expression] = None,
+              Columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Scan Table, opening only the directories of Tickers when given."""
+        Schema = _Schemas[Table]
+        if Tickers is None:
+            Dataset = ds.dataset(os.path.join(self.StoreDirectory, Table), schema=Schema, format="parquet")
+        else:
+            Directories = {self._TickerDirectory(Table, Ticker) for Ticker in Tickers}
+            Datasets = [ds.dataset(Path, schema=Schema, format="parquet") for Path in sorted(Directories)
+                        if os.path.isdir(Path)]
+            if not Datasets:
+                return Schema.empty_table().select(Columns or Schema.names).to_pandas()
+            Dataset = ds.dataset(Datasets)
+        return Dataset.to_table(columns=Columns, filter=Filter).to_pandas()
+
+    def _Filter(self, Tickers: Optional[Sequence[str]] = None, RunIds: Optional[Sequence[str]] = None,
+                Start: Optional[object] = None, End: Optional[object] = None,
+                RegimeKeys: Optional[Sequence[str]] = None) -> Optional[ds.Expression]:
+        """Combine the ticker, run, regime key and inclusive [Start, End] timestamp conditions of a query."""
+        Conditions = []
+        if Tickers is not None:
+            Conditions.append(pc.field("Ticker").isin(list(Tickers)))
+        if RunIds is not None:
+            Conditions.append(pc.field("RunId").isin(list(RunIds)))
+        if RegimeKeys is not None:
+            Conditions.append(pc.field("RegimeKey").isin(list(RegimeKeys)))
+        if Start is not None:
+            Conditions.append(pc.field("Timestamp") >= _Timestamp(Start))
+        if End is not None:
+            Conditions.append(pc.field("Timestamp") <= _Timestamp(End))
+        Filter = None
+        for Condition in Conditions:
+            Filter = Condition if Filter is None else Filter & Condition
+        return Filter
+
+    def Runs(self, Tickers: Optional[Sequence[str]] = None, Interval: Optional[str] = None,
+             Parameters: Optional[Dict] = None, Start: Optional[object] = None,
+             End: Optional[object] = None) -> pd.DataFrame:
+        """
+        Return one row per stored run with its parameters expanded into columns and its metrics pivoted
+        alongside, e.g. "Backtest.Sharpe Ratio".
+
+        Args:
+            Tickers: Only runs on these tickers
+            Interval: Only runs on this bar interval
+            Parameters: Only runs whose parameters equal all of these values
+            Start: Only runs whose data ends at or after Start
+            End: Only runs whose data starts at or before End
+        """
+        Filter = self._Filter(Tickers)
+        if Interval is not None:
+            Filter = pc.field("Interval") == Interval if Filter is None else Filter & (pc.field("Interval") == Interval)
+        Runs = self._Read("Runs", Tickers, Filter)
+        if Start is not None:
+            Runs = Runs[Runs["DataEnd"] >= _Timestamp(Start)]
+        if End is not None:
+            Runs = Runs[Runs["DataStart"] <= _Timestamp(End)]
+        Expanded = pd.json_normalize([json.loads(Text) for Text in Runs["Parameters"]]).set_index(Runs.index)
+        for Name, Value in (Parameters or {}).items():
+            if Name not in Expanded:
+                return Runs.iloc[:0].drop(columns="Parameters")
+            Runs, Expanded = Runs[Expanded[Name] == Value], Expanded[Expanded[Name] == Value]
+        Runs = pd.concat([Runs.drop(columns="Parameters"), Expanded], axis=1)
+        if Runs.empty:
+            return Runs.reset_index(drop=True)
+        Metrics = self.Metrics(Tickers=Runs["Ticker"].unique(), RunIds=Runs["RunId"])
+        Wide = Metrics.pivot_table(index="RunId", columns=["Source", "Metric"], values="Value", observed=True)
+        Wide.columns = [f"{Source}.{Metric}" for Source, Metric in Wide.columns]
+        return Runs.merge(Wide, left_on="RunId", right_index=True, how="left").sort_values("CreatedAt", ignore_index=True)
+
+    def Metrics(self, Tickers: Optional[Sequence[str]] = None, RunIds: Optional[Sequence[str]] = None,
+                Metric: Optional[str] = None, Source: Optional[str] = None, Minimum: Optional[float] = None,
+                Maximum: Optional[float] = None) -> pd.DataFrame:
+        """Return metric rows in long format, filtered by ticker, run, metric name, source and value range."""
+        Filter = self._Filter(Tickers, RunIds)
+        for Condition in (
+            pc.field("Metric") == Metric if Metric is not None else None,
+            pc.field("Source") == Source if Source is not None else None,
+            pc.field("Value") >= Minimum if Minimum is not None else None,
+            pc.field("Value") <= Maximum if Maximum is not None else None,
+        ):
+            if Condition is not None:
+                Filter = Condition if Filter is None else Filter & Condition
+        return self._Read("Metrics", Tickers, Filter)
+
+    def Regimes(self, Tickers: Optional[Sequence[str]] = None, RunIds: Optional[Sequence[str]] = None,
+                Start: Optional[object] = None, End: Optional[object] = None,
+                Columns: Optional[List[str]] = None, RegimeKeys: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Return per-bar regimes in [Start, End] with Regime and MostLikelyState as categoricals,
+        one set of rows per RegimeKey. RunIds select the regimes those runs reference.
+        """
+        if RunIds is not None:
+            Referenced = self._Read("Runs", Tickers, self._Filter(Tickers, RunIds), Columns=["RegimeKey"])
+            RegimeKeys = Referenced["RegimeKey"].unique().tolist() + list(RegimeKeys or [])
+        return self._Read("Regimes", Tickers, self._Filter(Tickers, None, Start, End, RegimeKeys), Columns)
+
+    def RegimeSpans(self, Tickers: Optional[Sequence[str]] = None, RunIds: Optional[Sequence[str]] = None,
+                    Start: Optional[object] = None, End: Optional[object] = None,
+                    RegimeKeys: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Return the Regime column run-length encoded per ticker and RegimeKey as RegimeKey, Ticker,
+        Start, End, Regime and Bars; join with Runs on RegimeKey to get the runs that share them.
+        """
+        Regimes = self.Regimes(Tickers, RunIds, Start, End, ["RegimeKey", "Ticker", "Timestamp", "Regime"], RegimeKeys)
+        Spans = [
+            RegimeSpans(Group.set_index("Timestamp")["Regime"]).assign(RegimeKey=RegimeKey, Ticker=Ticker)
+            for (RegimeKey, Ticker), Group in Regimes.groupby(["RegimeKey", "Ticker"], sort=False)
+        ]
+        if not Spans:
+            return pd.DataFrame(columns=["RegimeKey", "Ticker", "Start", "End", "Regime", "Bars"])
+        return pd.concat(Spans, ignore_index=True)[["RegimeKey", "Ticker", "Start", "End", "Regime", "Bars"]]
+
+    def EquityCurves(self, Tickers: Optional[Sequence[str]] = None, RunIds: Optional[Sequence[str]] = None,
+                     Start: Optional[object] = None, End: Optional[object] = None) -> pd.DataFrame:
+        """Return the equity curves of the matching runs in long format."""
+        return self._Read("Equity", Tickers, self._Filter(Tickers, RunIds, Start, End))
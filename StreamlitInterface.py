@@ -1,13 +1,21 @@
+import json
+import time
+import uuid
+import altair as alt
 import streamlit as st
-import numpy as np
 import pandas as pd
 from typing import Tuple, Dict
 
-from DataDownloader import DownloadTradingData
-from FeatureEngineering import FeatureEngineering
-from HiddenMarkovModel import HiddenMarkovModel
-from ModelEvaluation import EvaluateRegimePrediction
-from BacktestingModule import RunBacktest
+from AnalysisJobs import JobManager
+from AnalysisPipeline import AnalysisPipeline
+from ChartDownsampling import ClipSpans, RegimeSpans, WindowSeries
+from DataDownloader import OhlcvCache
+from ModelRegistry import ModelRegistry
+from PipelineProfiler import PipelineProfiler, ProfileSection
+from ResultsStore import ResultsStore
+
+# Points sent to the browser per chart; about one per horizontal pixel of a wide layout
+ChartPoints = 2000
 
 
 def RunAnalysis(
@@ -19,61 +27,130 @@ def RunAnalysis(
     RiskPercent: float,
     StateProbabilityThreshold: float,
     Data: pd.DataFrame | None = None,
+    Pipeline: AnalysisPipeline | None = None,
+    Profiler: PipelineProfiler | None = None,
+    Store: ResultsStore | None = None,
 ) -> Tuple[pd.DataFrame, Dict[str, float], pd.Series]:
-    """Execute the full analysis pipeline and return processed data, evaluation metrics and backtest statistics."""
+    """
+    Execute the full analysis pipeline and return processed data, evaluation metrics and backtest statistics.
+    A Profiler records the download and every pipeline stage; a Store keeps the results with the run parameters.
+    """
     if Data is None:
-        Data = DownloadTradingData(Ticker, StartDate, EndDate, Interval)
-
-    FeatureEngineer = FeatureEngineering()
-    IndicatorsToApply = [
-        "SMA",
-        "EMA",
-        "RSI",
-        "MACD",
-        "BollingerBands",
-        "OnBalanceVolume",
-        "WilliamsPercentR",
-        "CommodityChannelIndex",
-    ]
-    IndicatorParameters = {
-        "SMA": {"Window": 20},
-        "EMA": {"Window": 12},
-        "RSI": {"Window": 14},
-        "MACD": {"FastPeriod": 12, "SlowPeriod": 26, "SignalPeriod": 9},
-        "BollingerBands": {"Window": 20, "StandardDeviations": 2.0},
-        "OnBalanceVolume": {},
-        "WilliamsPercentR": {"Window": 14},
-        "CommodityChannelIndex": {"Window": 20},
-    }
-
-    Data = FeatureEngineer.ApplyTechnicalAnalysis(
-        Data, IndicatorsToApply, IndicatorParameters
-    )
-    Data["LogReturn"] = np.log(Data["Close"]).diff()
-    OriginalColumns = ["Open", "High", "Low", "Close", "Volume"]
-    TechnicalFeatureColumns = [
-        Column
-        for Column in Data.columns
-        if Column not in OriginalColumns
-    ]
-
-    MarketModel = HiddenMarkovModel()
-    MarketModel.Fit(Data, TechnicalFeatureColumns)
-    Metrics = EvaluateRegimePrediction(Data, TechnicalFeatureColumns)
-    Data = MarketModel.PredictRegime(Data, TechnicalFeatureColumns)
-    Data["MostLikelyState"] = Data["MostLikelyState"].shift(-1)
-    Data["StateProbability"] = Data["StateProbability"].shift(-1)
-    Stats = RunBacktest(
+        with ProfileSection(Profiler, "Download"):
+            Data = OhlcvCache().Load(Ticker, StartDate, EndDate, Interval)
+    if Pipeline is None:
+        Pipeline = AnalysisPipeline()
+    Data, Metrics, Stats = Pipeline.Run(
         Data,
         TrailingTakeProfit=TrailingTakeProfit,
         RiskPercent=RiskPercent,
         StateProbabilityThreshold=StateProbabilityThreshold,
+        TickerSymbol=Ticker,
+        Interval=Interval,
+        Profiler=Profiler,
     )
+    if Store is not None:
+        Parameters = {
+            "StartDate": StartDate,
+            "EndDate": EndDate,
+            "TrailingTakeProfit": TrailingTakeProfit,
+            "RiskPercent": RiskPercent,
+            "StateProbabilityThreshold": StateProbabilityThreshold,
+            "NumberOfStates": Pipeline.NumberOfStates,
+            **Pipeline.ModelOptions,
+        }
+        with ProfileSection(Profiler, "Store"):
+            Store.Append(Ticker, Interval, Data, Metrics, Stats, Parameters, RegimeKey=Data.attrs.get("RegimeKey"))
     return Data, Metrics, Stats
 
 
+@st.cache_resource
+def GetJobManager() -> JobManager:
+    """Job manager shared by every session, so identical runs coalesce into one computation."""
+    return JobManager()
+
+
+@st.cache_resource
+def GetPipeline() -> AnalysisPipeline:
+    """Pipeline shared by every session so reruns with new slider values reuse fitted stages."""
+    return AnalysisPipeline(Registry=ModelRegistry())
+
+
+@st.cache_resource
+def GetResultsStore() -> ResultsStore:
+    """Results store every finished run is appended to, for queries across runs outside the dashboard."""
+    return ResultsStore()
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def GetJobResult(Key: Tuple) -> Dict:
+    """
+    Picklable display payload of the finished job for Key, cached by its inputs so it
+    outlives the job manager's bounded list of finished jobs.
+    """
+    Job = GetJobManager().Get(Key)
+    if Job is None or Job.Status != "Finished":
+        raise KeyError(Key)
+    Data, Metrics, Stats = Job.Result()
+    return {
+        "Metrics": Metrics,
+        "Summary": Stats[[Name for Name in Stats.index if not Name.startswith("_")]].to_frame(),
+        "Equity": Stats._equity_curve["Equity"],
+        "Close": Data["Close"],
+        "Regimes": RegimeSpans(Data["Regime"]),
+        "Performance": Job.Progress.Report(),
+    }
+
+
+def _LineChart(Values: pd.Series, Name: str, Spans: pd.DataFrame | None = None) -> alt.Chart:
+    """Line chart of an already downsampled series, over regime shading when Spans is given."""
+    Frame = Values.rename(Name).rename_axis("Time").reset_index()
+    Chart = alt.Chart(Frame).mark_line().encode(x="Time:T", y=alt.Y(f"{Name}:Q", scale=alt.Scale(zero=False)))
+    if Spans is None or Spans.empty:
+        return Chart
+    Shading = alt.Chart(Spans).mark_rect(opacity=0.15).encode(
+        x="Start:T", x2="End:T", color=alt.Color("Regime:N"), tooltip=["Regime", "Start", "End", "Bars"]
+    )
+    return Shading + Chart
+
+
+def DisplayResult(Result: Dict, ShowPerformance: bool) -> None:
+    """
+    Render a job result. Charts are sliced to the visible range and downsampled to
+    ChartPoints on the server, so narrowing the range shows finer detail without
+    sending the full history to the browser; regimes are drawn as run-length spans.
+    """
+    st.subheader("Validation Metrics")
+    st.json(Result["Metrics"])
+    st.subheader("Backtest Performance")
+    st.write(Result["Summary"])
+
+    Close, Equity = Result["Close"], Result["Equity"]
+    First, Last = Close.index[0].to_pydatetime(), Close.index[-1].to_pydatetime()
+    Start, End = (First, Last) if First == Last else st.slider("Visible range", First, Last, (First, Last))
+    Method = st.radio("Downsampling", ["minmax", "lttb"], horizontal=True)
+    st.subheader("Equity Curve")
+    st.altair_chart(_LineChart(WindowSeries(Equity, Start, End, ChartPoints, Method), "Equity"), use_container_width=True)
+    st.subheader("Closing Price")
+    st.altair_chart(
+        _LineChart(WindowSeries(Close, Start, End, ChartPoints, Method), "Close", ClipSpans(Result["Regimes"], Start, End)),
+        use_container_width=True,
+    )
+    if ShowPerformance:
+        Report = Result["Performance"]
+        st.subheader("Performance")
+        st.write(f"Total {Report['TotalSeconds']:.2f} s, peak RSS {Report['MaxResidentSetMegabytes']:.0f} MB")
+        st.dataframe(pd.DataFrame(Report["Sections"]))
+        st.download_button("Download report", json.dumps(Report, indent=2), file_name="performance.json")
+
+
 def DisplayInterface() -> None:
-    """Launch a Streamlit interface for running the analysis pipeline."""
+    """
+    Launch a Streamlit interface for running the analysis pipeline.
+
+    Runs execute on a background job so the page stays responsive; while a job is
+    queued or running the page polls its stage progress and offers to cancel it.
+    """
     st.title("HMM Market State Backtester")
     TickerInput = st.text_input("Ticker Symbol", "AAPL")
     StartDateInput = st.date_input("Start Date")
@@ -82,9 +159,12 @@ def DisplayInterface() -> None:
     TrailingTakeProfitInput = st.slider("Trailing Take Profit", 0.01, 0.2, 0.03)
     RiskPercentInput = st.slider("Risk Percent", 0.01, 0.2, 0.01)
     StateProbabilityThresholdInput = st.slider("State Probability Threshold", 0.5, 1.0, 0.6)
+    ShowPerformance = st.checkbox("Show performance panel")
 
+    Manager = GetJobManager()
+    SessionId = st.session_state.setdefault("SessionId", uuid.uuid4().hex)
     if st.button("Run Backtest"):
-        Data, Metrics, Stats = RunAnalysis(
+        Inputs = (
             TickerInput,
             StartDateInput.strftime("%Y-%m-%d"),
             EndDateInput.strftime("%Y-%m-%d"),
@@ -93,15 +173,38 @@ def DisplayInterface() -> None:
             RiskPercentInput,
             StateProbabilityThresholdInput,
         )
-        st.subheader("Validation Metrics")
-        st.json(Metrics)
-        st.subheader("Backtest Performance")
-        st.write(Stats.to_frame())
-        EquityCurve = Stats._equity_curve
-        st.subheader("Equity Curve")
-        st.line_chart(EquityCurve["Equity"])
-        st.subheader("Closing Price")
-        st.line_chart(Data["Close"])  # Price chart
+        PreviousKey = st.session_state.get("JobKey")
+        if PreviousKey is not None and PreviousKey != Inputs:
+            Manager.Cancel(PreviousKey, SessionId)
+        Pipeline, Store = GetPipeline(), GetResultsStore()
+        Manager.Submit(
+            Inputs, lambda Progress: RunAnalysis(*Inputs, Pipeline=Pipeline, Profiler=Progress, Store=Store), SessionId
+        )
+        st.session_state["JobKey"] = Inputs
+
+    Key = st.session_state.get("JobKey")
+    if Key is None:
+        return
+    Job = Manager.Get(Key)
+    Status = Job.Status if Job is not None else "Finished"
+    if Status in ("Queued", "Running"):
+        st.progress(Job.Progress.Fraction, text=f"{Status}: {Job.Progress.CurrentStage or 'waiting for a worker'}")
+        if st.button("Cancel"):
+            Manager.Cancel(Key, SessionId)
+            del st.session_state["JobKey"]
+            st.rerun()
+        time.sleep(0.5)
+        st.rerun()
+    elif Status == "Cancelled":
+        st.info("The run was cancelled.")
+    elif Status == "Failed":
+        st.error(f"The run failed: {Job.Future.exception()}")
+    else:
+        try:
+            DisplayResult(GetJobResult(Key), ShowPerformance)
+        except KeyError:
+            # Neither cached nor still held by the job manager
+            del st.session_state["JobKey"]
 
 
 if __name__ == "__main__":
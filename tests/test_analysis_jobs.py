@@ -0,0 +1,57 @@
+import threading
+
+import pytest
+
+from AnalysisJobs import JobCancelled, JobManager
+
+
+def GatedJob(Gate: threading.Event, Started: threading.Event):
+    """Job that opens a stage, waits for Gate and then opens another stage, where cancellation is seen."""
+
+    def Run(Progress):
+        with Progress.Section("Features"):
+            Started.set()
+            Gate.wait(5)
+        with Progress.Section("Model"):
+            pass
+        return "Done"
+
+    return Run
+
+
+def test_identical_submissions_share_one_job():
+    Manager = JobManager()
+    Gate, Started = threading.Event(), threading.Event()
+    First = Manager.Submit("Key", GatedJob(Gate, Started), "SessionA")
+    Second = Manager.Submit("Key", GatedJob(Gate, Started), "SessionB")
+    assert First is Second
+    Gate.set()
+    assert First.Future.result(5) == "Done"
+    assert First.Status == "Finished"
+
+
+def test_job_runs_on_until_every_subscriber_cancels():
+    Manager = JobManager()
+    Gate, Started = threading.Event(), threading.Event()
+    Job = Manager.Submit("Key", GatedJob(Gate, Started), "SessionA")
+    Manager.Submit("Key", GatedJob(Gate, Started), "SessionB")
+    Started.wait(5)
+    Manager.Cancel("Key", "SessionA")
+    Gate.set()
+    assert Job.Future.result(5) == "Done"
+
+
+def test_resubmitting_a_cancelled_running_job_starts_a_new_one():
+    Manager = JobManager()
+    Gate, Started = threading.Event(), threading.Event()
+    Cancelled = Manager.Submit("Key", GatedJob(Gate, Started), "SessionA")
+    Started.wait(5)
+    Manager.Cancel("Key", "SessionA")
+    # The cancelled job is still inside its first section and will raise at the next one
+    Restarted = Manager.Submit("Key", GatedJob(Gate, threading.Event()), "SessionA")
+    assert Restarted is not Cancelled
+    Gate.set()
+    with pytest.raises(JobCancelled):
+        Cancelled.Future.result(5)
+    assert Cancelled.Status == "Cancelled"
+    assert Restarted.Future.result(5) == "Done"
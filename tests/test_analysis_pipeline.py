@@ -0,0 +1,63 @@
+from unittest import mock
+
+import pytest
+
+import AnalysisPipeline as PipelineModule
+from AnalysisPipeline import AnalysisPipeline
+from ModelRegistry import ModelRegistry
+from PerformanceBenchmark import GenerateSyntheticOhlcv
+
+pytestmark = pytest.mark.filterwarnings("ignore::UserWarning", "ignore::RuntimeWarning")
+
+
+@pytest.fixture(scope="module")
+def Data():
+    return GenerateSyntheticOhlcv(1500, Seed=3).drop(columns="PlantedRegime")
+
+
+def RunPipeline(Pipeline, Data):
+    return Pipeline.Run(Data, TrailingTakeProfit=0.03, RiskPercent=0.05, StateProbabilityThreshold=0.5,
+                        TickerSymbol="SPY", Interval="15m")
+
+
+def test_evaluation_uses_the_pipeline_model_arguments(Data):
+    Pipeline = AnalysisPipeline(NumberOfStates=2, Iterations=20, Restarts=2, CovarianceType="diag")
+    with mock.patch.object(
+        PipelineModule, "EvaluateRegimePrediction", wraps=PipelineModule.EvaluateRegimePrediction
+    ) as Evaluate:
+        RunPipeline(Pipeline, Data)
+        Pipeline.NumberOfStates = 3
+        RunPipeline(Pipeline, Data)
+    Options = [Call.kwargs["ModelOptions"] for Call in Evaluate.call_args_list]
+    assert [Option["NumberOfStates"] for Option in Options] == [2, 3]
+    assert Options[0]["Iterations"] == 20 and Options[0]["Restarts"] == 2
+    assert Options[0]["CovarianceType"] == "diag"
+
+
+def test_run_results_do_not_share_the_cache(Data):
+    Pipeline = AnalysisPipeline(Iterations=20)
+    RegimeData, Metrics, Stats = RunPipeline(Pipeline, Data)
+    Expected = RegimeData["Regime"].copy(), dict(Metrics), Stats["_equity_curve"]["Equity"].copy()
+    RegimeData["Regime"] = "Mutated"
+    Metrics["Accuracy"] = -1.0
+    Stats["_equity_curve"]["Equity"] = 0.0
+
+    RegimeData, Metrics, Stats = RunPipeline(Pipeline, Data)
+    assert Pipeline.ComputedStages == []
+    assert RegimeData["Regime"].equals(Expected[0])
+    assert Metrics == Expected[1]
+    assert Stats["_equity_curve"]["Equity"].equals(Expected[2])
+
+
+def test_registry_refits_when_bar_values_change(tmp_path, Data):
+    Registry = ModelRegistry(str(tmp_path))
+    RunPipeline(AnalysisPipeline(Iterations=20, Registry=Registry), Data)
+    Reloaded = AnalysisPipeline(Iterations=20, Registry=Registry)
+    RunPipeline(Reloaded, Data)
+    assert len(list(tmp_path.iterdir())) == 1
+
+    # Same timestamps, revised values, as when intraday bars are downloaded again
+    Revised = Data.copy()
+    Revised.iloc[-200:, Revised.columns.get_loc("Close")] *= 1.001
+    RunPipeline(AnalysisPipeline(Iterations=20, Registry=Registry), Revised)
+    assert len(list(tmp_path.iterdir())) == 2
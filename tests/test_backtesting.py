@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from BacktestingModule import OptimizeBacktest, RunBacktest
+
+# Margin cancellations are part of what the engines must agree on
+pytestmark = pytest.mark.filterwarnings("ignore:.*Broker canceled:UserWarning")
+
+RegimeLabels = np.array(["Uptrend", "Downtrend", "Sideway"], dtype=object)
+
+
+def MakeRegimeFrame(Seed: int, Bars: int = 400, Volatility: float = 0.01) -> pd.DataFrame:
+    """Random OHLC bars with sticky regimes and noisy predictions, like a decoded pipeline frame."""
+    Generator = np.random.default_rng(Seed)
+    Close = 100 * np.exp(np.cumsum(Generator.normal(0, Volatility, Bars)))
+    Open = np.r_[Close[0], Close[:-1]] * np.exp(Generator.normal(0, Volatility / 4, Bars))
+    High = np.maximum(Open, Close) * np.exp(np.abs(Generator.normal(0, Volatility / 2, Bars)))
+    Low = np.minimum(Open, Close) * np.exp(-np.abs(Generator.normal(0, Volatility / 2, Bars)))
+    Regimes = np.repeat(Generator.integers(0, 3, Bars // 10 + 1), 10)[:Bars]
+    Predicted = np.where(Generator.random(Bars) < 0.8, Regimes, Generator.integers(0, 3, Bars))
+    return pd.DataFrame(
+        {
+            "Open": Open,
+            "High": High,
+            "Low": Low,
+            "Close": Close,
+            "Volume": Generator.integers(1_000, 10_000, Bars).astype(float),
+            "Regime": RegimeLabels[Regimes],
+            "MostLikelyState": RegimeLabels[Predicted],
+            "StateProbability": Generator.uniform(0.4, 1.0, Bars),
+        },
+        index=pd.date_range("2020-01-01", periods=Bars, freq="h"),
+    )
+
+
+@pytest.mark.parametrize("Seed", range(12))
+@pytest.mark.parametrize(
+    "Volatility, TrailingTakeProfit, RiskPercent",
+    [(0.01, 0.03, 0.01), (0.04, 0.05, 0.2), (0.08, 0.02, 0.5)],
+)
+def test_vectorized_engine_matches_event_engine(Seed, Volatility, TrailingTakeProfit, RiskPercent):
+    Data = MakeRegimeFrame(Seed, Volatility=Volatility)
+    Parameters = dict(TrailingTakeProfit=TrailingTakeProfit, RiskPercent=RiskPercent, StateProbabilityThreshold=0.6)
+    Event = RunBacktest(Data, Engine="event", **Parameters)
+    Vectorized = RunBacktest(Data, Engine="vectorized", **Parameters)
+
+    assert list(Vectorized.index) == list(Event.index)
+    assert Vectorized["# Trades"] == Event["# Trades"]
+    np.testing.assert_allclose(
+        Vectorized._equity_curve["Equity"].to_numpy(), Event._equity_curve["Equity"].to_numpy(), rtol=1e-9
+    )
+
+
+def test_unknown_engine_is_rejected():
+    with pytest.raises(ValueError):
+        RunBacktest(MakeRegimeFrame(0), Engine="gpu")
+
+
+Grid = {"TrailingTakeProfit": [0.02, 0.05], "RiskPercent": [0.05, 0.2], "StateProbabilityThreshold": [0.5, 0.8]}
+
+
+@pytest.mark.parametrize("Engine", ["event", "vectorized"])
+def test_grid_search_matches_run_backtest_for_any_workers(Engine):
+    Data = MakeRegimeFrame(3, Volatility=0.02)
+    Serial = OptimizeBacktest(Data, Grid, Workers=1, Engine=Engine)
+    Parallel = OptimizeBacktest(Data, Grid, Workers=2, Engine=Engine)
+    pd.testing.assert_frame_equal(Serial, Parallel)
+    assert len(Serial) == 8
+
+    for _, Row in Serial.iterrows():
+        Parameters = {Name: Row[Name] for Name in Grid}
+        Stats = RunBacktest(Data, Engine=Engine, **Parameters)
+        Expected = Stats[[Key for Key in Stats.index if not Key.startswith("_")]]
+        pd.testing.assert_series_equal(Row[Expected.index], Expected, check_names=False, check_dtype=False)
+
+
+def test_grid_search_rejects_unknown_parameters():
+    with pytest.raises(ValueError):
+        OptimizeBacktest(MakeRegimeFrame(0), {"StopLoss": [0.01]})
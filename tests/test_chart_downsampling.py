@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ChartDownsampling import LargestTriangleThreeBuckets, MinMaxDownsample, RegimeSpans, WindowSeries
+
+Methods = [MinMaxDownsample, LargestTriangleThreeBuckets]
+
+
+@pytest.fixture(scope="module")
+def Prices():
+    Generator = np.random.default_rng(7)
+    Index = pd.date_range("2020-01-01", periods=20000, freq="15min")
+    Values = pd.Series(100 * np.exp(np.cumsum(Generator.normal(0, 0.002, len(Index)))), index=Index)
+    Values.iloc[5000:5100] = np.nan
+    return Values
+
+
+@pytest.mark.parametrize("Method", Methods)
+def test_downsampling_keeps_the_endpoints_and_the_extrema(Prices, Method):
+    Reduced = Method(Prices, 500)
+    Clean = Prices.dropna()
+    assert len(Reduced) <= 502
+    assert Reduced.index.is_monotonic_increasing
+    assert Reduced.index[0] == Clean.index[0] and Reduced.index[-1] == Clean.index[-1]
+    assert Reduced.notna().all()
+    assert Reduced.eq(Clean.loc[Reduced.index]).all()
+    if Method is MinMaxDownsample:
+        assert Clean.idxmax() in Reduced.index and Clean.idxmin() in Reduced.index
+
+
+@pytest.mark.parametrize("Method", Methods)
+def test_short_series_are_returned_whole(Prices, Method):
+    Short = Prices.iloc[:300]
+    assert Method(Short, 500).equals(Short)
+
+
+def test_window_series_downsamples_only_the_visible_range(Prices):
+    Start, End = Prices.index[1000], Prices.index[1499]
+    Window = WindowSeries(Prices, Start, End, Points=2000)
+    assert Window.equals(Prices.loc[Start:End])
+    Wide = WindowSeries(Prices, Points=1000, Method="lttb")
+    assert len(Wide) == 1000
+    with pytest.raises(ValueError):
+        WindowSeries(Prices, Method="unknown")
+
+
+def test_regime_spans_tile_the_decoded_bars():
+    Index = pd.date_range("2020-01-01", periods=8, freq="D")
+    Regimes = pd.Series([np.nan, np.nan, "Uptrend", "Uptrend", "Sideway", "Uptrend", "Uptrend", "Downtrend"],
+                        index=Index)
+    Spans = RegimeSpans(Regimes)
+    assert Spans["Regime"].astype(str).tolist() == ["Uptrend", "Sideway", "Uptrend", "Downtrend"]
+    assert Spans["Bars"].tolist() == [2, 1, 2, 1]
+    assert Spans["Start"].tolist() == [Index[2], Index[4], Index[5], Index[7]]
+    assert Spans["End"].tolist() == [Index[4], Index[5], Index[7], Index[7]]
+
+
+@pytest.mark.parametrize("Regimes", [
+    pd.Series([], dtype=object, index=pd.DatetimeIndex([])),
+    pd.Series([np.nan] * 5, dtype=object, index=pd.date_range("2020-01-01", periods=5, freq="D")),
+], ids=["empty", "warm-up"])
+def test_regime_spans_without_a_regime_are_empty(Regimes):
+    Spans = RegimeSpans(Regimes)
+    assert Spans.empty
+    assert list(Spans.columns) == ["Start", "End", "Regime", "Bars"]
@@ -0,0 +1,92 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from DataDownloader import DownloadBatchTradingData, OhlcvCache
+
+
+class FixtureDownloader:
+    """Offline stand-in for DownloadTradingData serving deterministic daily bars and recording every request."""
+
+    def __init__(self, Delay: float = 0.0, Failures: int = 0) -> None:
+        self.Delay = Delay
+        # Number of first requests answered with an empty frame, as yfinance does when a request fails
+        self.Failures = Failures
+        self.Requests = []
+        self.Lock = threading.Lock()
+
+    def __call__(self, TickerSymbol: str, StartDate: str, EndDate: str, Interval: str) -> pd.DataFrame:
+        with self.Lock:
+            self.Requests.append((TickerSymbol, StartDate, EndDate, Interval))
+            Failed = len(self.Requests) <= self.Failures
+        # Widen the window between reading and writing the cache entry
+        time.sleep(self.Delay)
+        Index = pd.date_range(StartDate, EndDate, freq="D", inclusive="left")
+        if Failed:
+            Index = Index[:0]
+        Close = 100 + (Index - pd.Timestamp("2020-01-01")).days.to_numpy(dtype=np.float64)
+        return pd.DataFrame(
+            {"Open": Close, "High": Close + 1, "Low": Close - 1, "Close": Close, "Volume": np.full(len(Index), 1e6)},
+            index=Index,
+        )
+
+
+def test_only_missing_ranges_are_downloaded(tmp_path):
+    Downloader = FixtureDownloader()
+    Cache = OhlcvCache(str(tmp_path), Downloader)
+    First = Cache.Load("SPY", "2020-01-01", "2020-02-01", "1d")
+    assert len(First) == 31
+    assert Cache.Load("SPY", "2020-01-10", "2020-01-20", "1d").equals(First.loc["2020-01-10":"2020-01-19"])
+    Second = Cache.Load("SPY", "2020-01-15", "2020-03-01", "1d")
+    assert Downloader.Requests == [("SPY", "2020-01-01", "2020-02-01", "1d"), ("SPY", "2020-02-01", "2020-03-01", "1d")]
+    assert len(Second) == len(pd.date_range("2020-01-15", "2020-02-29"))
+
+
+def test_concurrent_loads_keep_every_range(tmp_path):
+    Downloader = FixtureDownloader(Delay=0.05)
+    Months = [(f"2020-{Month:02d}-01", f"2020-{Month + 1:02d}-01") for Month in range(1, 9)]
+    Threads = [
+        threading.Thread(target=OhlcvCache(str(tmp_path), Downloader).Load, args=("SPY", Start, End, "1d"))
+        for Start, End in Months
+    ]
+    for Thread in Threads:
+        Thread.start()
+    for Thread in Threads:
+        Thread.join()
+
+    Merged = OhlcvCache(str(tmp_path), Downloader).Load("SPY", "2020-01-01", "2020-09-01", "1d")
+    assert len(Downloader.Requests) == len(Months)
+    assert Merged.index.equals(pd.date_range("2020-01-01", "2020-08-31", freq="D"))
+    assert not [Path.name for Path in tmp_path.iterdir() if Path.name.endswith(".tmp")]
+
+
+def test_batch_download_goes_through_the_cache(tmp_path):
+    Downloader = FixtureDownloader()
+    Cache = OhlcvCache(str(tmp_path), Downloader)
+    Frames = DownloadBatchTradingData(["SPY", "QQQ", "^GSPC"], "2020-01-01", "2020-01-11", "1d", Cache)
+    assert {Ticker: len(Frame) for Ticker, Frame in Frames.items()} == {"SPY": 10, "QQQ": 10, "^GSPC": 10}
+    DownloadBatchTradingData(["SPY", "QQQ", "^GSPC"], "2020-01-01", "2020-01-11", "1d", Cache)
+    assert len(Downloader.Requests) == 3
+
+
+def test_empty_downloads_are_retried(tmp_path):
+    Downloader = FixtureDownloader()
+    Cache = OhlcvCache(str(tmp_path), Downloader)
+    Cache.Load("SPY", "2020-01-01", "2020-02-01", "1d")
+    # The entry already holds bars, so the failed range must not be recorded as covered next to them
+    Downloader.Failures = 2
+    assert Cache.Load("SPY", "2020-02-01", "2020-03-01", "1d").empty
+    assert len(Cache.Load("SPY", "2020-02-01", "2020-03-01", "1d")) == 29
+    assert len(Cache.Load("SPY", "2020-01-01", "2020-03-01", "1d")) == 60
+    assert len(Downloader.Requests) == 3
+
+
+def test_empty_weekend_downloads_are_covered(tmp_path):
+    Downloader = FixtureDownloader()
+    Cache = OhlcvCache(str(tmp_path), Downloader)
+    Cache.Load("SPY", "2020-01-06", "2020-01-11", "1d")
+    Downloader.Failures = len(Downloader.Requests) + 1
+    assert Cache.Load("SPY", "2020-01-11", "2020-01-13", "1d").empty
+    Cache.Load("SPY", "2020-01-11", "2020-01-13", "1d")
+    assert len(Downloader.Requests) == 2
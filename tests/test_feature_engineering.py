@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import FeatureEngineering as FeatureEngineeringModule
+from FeatureEngineering import FeatureEngineering, RollingMeanAbsoluteDeviation, StreamingFeatureEngineering
+from PerformanceBenchmark import GenerateSyntheticOhlcv
+
+pytestmark = pytest.mark.filterwarnings("ignore::FutureWarning", "ignore::RuntimeWarning")
+
+Indicators = [
+    "SMA",
+    "EMA",
+    "RSI",
+    "MACD",
+    "BollingerBands",
+    "ATR",
+    "Stochastic",
+    "OnBalanceVolume",
+    "WilliamsPercentR",
+    "CommodityChannelIndex",
+]
+Parameters = {
+    "SMA": {"Window": 20},
+    "EMA": {"Window": 12},
+    "RSI": {"Window": 14},
+    "MACD": {"FastPeriod": 12, "SlowPeriod": 26, "SignalPeriod": 9},
+    "BollingerBands": {"Window": 20, "StandardDeviations": 2.0},
+    "ATR": {"Window": 14},
+    "Stochastic": {"KPeriod": 14, "DPeriod": 3},
+    "OnBalanceVolume": {},
+    "WilliamsPercentR": {"Window": 14},
+    "CommodityChannelIndex": {"Window": 20},
+}
+
+
+@pytest.fixture(scope="module")
+def Bars():
+    return GenerateSyntheticOhlcv(600, Seed=5).drop(columns="PlantedRegime")
+
+
+@pytest.fixture(scope="module")
+def Batch(Bars):
+    return FeatureEngineering().ApplyTechnicalAnalysis(Bars, Indicators, Parameters)
+
+
+def Stream(Bars, ChunkSizes):
+    Streaming = StreamingFeatureEngineering(Indicators, Parameters)
+    Chunks, Position = [], 0
+    for Size in ChunkSizes:
+        Chunks.append(Streaming.Update(Bars.iloc[Position:Position + Size]))
+        Position += Size
+    assert Position == len(Bars)
+    return pd.concat(Chunks)
+
+
+@pytest.mark.parametrize("ChunkSizes", [[600], [1] * 600, [250, 1, 7, 100, 42, 200]], ids=["whole", "bars", "chunks"])
+def test_streaming_matches_batch(Bars, Batch, ChunkSizes):
+    Streamed = Stream(Bars, ChunkSizes)
+    assert list(Streamed.columns) == list(Batch.columns)
+    for Column in Batch.columns:
+        np.testing.assert_allclose(Streamed[Column], Batch[Column], rtol=1e-9, atol=1e-9, err_msg=Column)
+
+
+def ReferenceMeanAbsoluteDeviation(Values, Window):
+    return pd.Series(Values).rolling(Window).apply(lambda x: np.abs(x - x.mean()).mean(), raw=True).to_numpy()
+
+
+Kernels = [
+    pytest.param(FeatureEngineeringModule._RollingMeanAbsoluteDeviationNumpy, id="numpy"),
+    pytest.param(
+        getattr(FeatureEngineeringModule, "_RollingMeanAbsoluteDeviationCompiled", None), id="numba",
+        marks=pytest.mark.skipif(FeatureEngineeringModule.njit is None, reason="numba is not installed"),
+    ),
+    pytest.param(RollingMeanAbsoluteDeviation, id="dispatch"),
+]
+
+
+@pytest.mark.parametrize("Kernel", Kernels)
+@pytest.mark.parametrize("Window", [1, 3, 20, 500, 501, 800])
+def test_rolling_mean_absolute_deviation_matches_pandas(Kernel, Window):
+    Generator = np.random.default_rng(Window)
+    Values = 100 + np.cumsum(Generator.normal(0, 1, 500))
+    Values[[40, 41, 300]] = np.nan
+    Expected = ReferenceMeanAbsoluteDeviation(Values, Window)
+    np.testing.assert_allclose(Kernel(np.ascontiguousarray(Values), Window), Expected, rtol=1e-12, atol=1e-12)
+
+
+def test_numpy_kernel_chunks_match_one_pass():
+    Values = np.random.default_rng(0).normal(0, 1, 1000)
+    np.testing.assert_allclose(
+        FeatureEngineeringModule._RollingMeanAbsoluteDeviationNumpy(Values, 20, ChunkSize=7),
+        ReferenceMeanAbsoluteDeviation(Values, 20), rtol=1e-12, atol=1e-12,
+    )
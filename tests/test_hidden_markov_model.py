@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from HiddenMarkovModel import BatchRegimeDecoder, HiddenMarkovModel, OnlineRegimeFilter, StackFeatureFrames
+from PerformanceBenchmark import BuildFeatureFrame, GenerateSyntheticOhlcv
+
+pytestmark = pytest.mark.filterwarnings("ignore::RuntimeWarning")
+
+CovarianceModes = [
+    {},
+    {"CovarianceType": "diag"},
+    {"CovarianceType": "tied"},
+    {"VarianceRatio": 0.95},
+    {"CovarianceType": "diag", "VarianceRatio": 0.95, "Whiten": True},
+]
+
+
+@pytest.fixture(scope="module")
+def FeatureFrame():
+    return BuildFeatureFrame(GenerateSyntheticOhlcv(3000, Seed=1))
+
+
+@pytest.mark.parametrize("Options", CovarianceModes)
+def test_decoders_match_predict_regime_in_every_mode(FeatureFrame, Options):
+    Features, FeatureColumns = FeatureFrame
+    Model = HiddenMarkovModel(RandomState=0, **Options)
+    Model.Fit(Features, FeatureColumns)
+    CleanData = Features.dropna(subset=FeatureColumns)
+    ScaledMatrix = Model.TransformFeatures(CleanData[FeatureColumns].values)
+    Expected = Model.PredictRegime(Features, FeatureColumns).loc[CleanData.index]
+
+    Observations, TickerSymbols, Index = StackFeatureFrames({"A": Features}, FeatureColumns)
+    Decoded = BatchRegimeDecoder(Model).DecodeFrame(Observations, TickerSymbols, Index).set_index("Timestamp")
+    Decoded = Decoded.loc[CleanData.index]
+    assert (Decoded["Regime"].astype(str) == Expected["Regime"]).all()
+    np.testing.assert_allclose(Decoded["StateProbability"], Expected["StateProbability"], atol=1e-6)
+
+    # The forward filter's last step equals the smoothed posterior of the last bar
+    Filter = OnlineRegimeFilter(Model, FeatureColumns)
+    for Observation in CleanData[FeatureColumns].to_numpy():
+        State, Probability = Filter.Update(Observation)
+    Smoothed = Model.Model.predict_proba(ScaledMatrix)[-1]
+    np.testing.assert_allclose(Filter.ForwardProbabilities, Smoothed, atol=1e-6)
+    assert State == Expected["MostLikelyState"].iloc[-1]
+
+
+def test_whiten_requires_variance_ratio():
+    with pytest.raises(ValueError):
+        HiddenMarkovModel(Whiten=True)
+
+
+@pytest.mark.parametrize("Options", CovarianceModes)
+def test_save_load_round_trip(FeatureFrame, Options, tmp_path):
+    Features, FeatureColumns = FeatureFrame
+    Model = HiddenMarkovModel(RandomState=0, **Options)
+    Model.Fit(Features, FeatureColumns)
+    Path = str(tmp_path / "model.npz")
+    Model.Save(Path)
+    Loaded = HiddenMarkovModel.Load(Path)
+    Expected = Model.PredictRegime(Features, FeatureColumns)
+    Actual = Loaded.PredictRegime(Features, FeatureColumns)
+    assert Actual["Regime"].equals(Expected["Regime"])
+    np.testing.assert_allclose(Actual["StateProbability"], Expected["StateProbability"], equal_nan=True)
+
+
+def test_batch_decoder_matches_predict_regime_per_ticker_with_gaps(FeatureFrame):
+    Features, FeatureColumns = FeatureFrame
+    Model = HiddenMarkovModel(RandomState=0)
+    Model.Fit(Features, FeatureColumns)
+
+    Other = BuildFeatureFrame(GenerateSyntheticOhlcv(2500, Seed=2))[0]
+    Gapped = Features.copy()
+    Gapped.iloc[1200:1260, Gapped.columns.get_loc(FeatureColumns[0])] = np.nan
+    Frames = {"A": Gapped, "B": Other.iloc[300:], "C": Features.drop(Features.index[::7])}
+    Observations, TickerSymbols, Index = StackFeatureFrames(Frames, FeatureColumns)
+    Decoded = BatchRegimeDecoder(Model, BatchSize=2).DecodeFrame(Observations, TickerSymbols, Index)
+
+    for TickerSymbol, Frame in Frames.items():
+        CleanData = Frame.dropna(subset=FeatureColumns)
+        Expected = Model.PredictRegime(Frame, FeatureColumns).loc[CleanData.index]
+        Rows = Decoded[Decoded["Ticker"] == TickerSymbol].set_index("Timestamp")
+        assert Rows.index.equals(CleanData.index)
+        assert (Rows["Regime"].astype(str) == Expected["Regime"]).all()
+        np.testing.assert_allclose(Rows["StateProbability"], Expected["StateProbability"], atol=1e-6)
+
+
+def test_restarts_keep_the_best_seed_and_do_not_depend_on_workers(FeatureFrame):
+    Features, FeatureColumns = FeatureFrame
+    Models = []
+    for Workers in (1, 2):
+        Model = HiddenMarkovModel(Iterations=30, Restarts=3, Workers=Workers, RandomState=0)
+        Model.Fit(Features, FeatureColumns)
+        Models.append(Model)
+    Serial, Parallel = Models
+
+    assert len(Serial.RestartReport) == 3
+    Best = max(Report["LogLikelihood"] for Report in Serial.RestartReport)
+    CleanData = Features.dropna(subset=FeatureColumns + ["LogReturn"])
+    assert Serial.Model.score(Serial.TransformFeatures(CleanData[FeatureColumns].values)) == Best
+    assert Serial.RestartReport == [{**Report, "Seconds": Serial.RestartReport[Position]["Seconds"]}
+                                    for Position, Report in enumerate(Parallel.RestartReport)]
+    for Attribute in ("startprob_", "transmat_", "means_", "covars_"):
+        np.testing.assert_array_equal(getattr(Serial.Model, Attribute), getattr(Parallel.Model, Attribute))
+    assert Serial.StateMapping == Parallel.StateMapping
+
+    # A later fit without restarts must not report the restarts of the previous one
+    ScaledMatrix = Serial.TransformFeatures(CleanData[FeatureColumns].values)
+    Serial.FitMatrix(ScaledMatrix, CleanData["LogReturn"].to_numpy(), WarmStart=True)
+    assert Serial.RestartReport == []
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from HiddenMarkovModel import HiddenMarkovModel
+from ModelEvaluation import WalkForwardEvaluate, _EvaluateFold
+from PerformanceBenchmark import BuildFeatureFrame, GenerateSyntheticOhlcv
+
+pytestmark = pytest.mark.filterwarnings("ignore::RuntimeWarning")
+
+TimingColumns = ["FitSeconds"]
+
+
+@pytest.fixture(scope="module")
+def FeatureFrame():
+    return BuildFeatureFrame(GenerateSyntheticOhlcv(4000, Seed=2))
+
+
+@pytest.mark.parametrize("Window", ["expanding", "rolling"])
+def test_walk_forward_results_do_not_depend_on_workers(FeatureFrame, Window):
+    Features, FeatureColumns = FeatureFrame
+    Serial = WalkForwardEvaluate(Features, FeatureColumns, Folds=4, Workers=1, Window=Window)
+    Parallel = WalkForwardEvaluate(Features, FeatureColumns, Folds=4, Workers=3, Window=Window)
+    pd.testing.assert_frame_equal(Serial.drop(columns=TimingColumns), Parallel.drop(columns=TimingColumns))
+    assert not Serial["WarmStart"].iloc[0]
+
+
+def test_walk_forward_is_reproducible(FeatureFrame):
+    Features, FeatureColumns = FeatureFrame
+    First = WalkForwardEvaluate(Features, FeatureColumns, Folds=3, RandomState=7)
+    Second = WalkForwardEvaluate(Features, FeatureColumns, Folds=3, RandomState=7)
+    pd.testing.assert_frame_equal(First.drop(columns=TimingColumns), Second.drop(columns=TimingColumns))
+
+
+def test_walk_forward_passes_model_options(FeatureFrame):
+    Features, FeatureColumns = FeatureFrame
+    Results = WalkForwardEvaluate(
+        Features, FeatureColumns, Folds=3, Window="rolling",
+        ModelOptions={"NumberOfStates": 2, "CovarianceType": "diag"},
+    )
+    assert len(Results) == 3
+    assert Results[["LogLikelihood", "Accuracy", "F1Score"]].notna().all().all()
+
+
+def test_warm_started_folds_relabel_their_states(FeatureFrame):
+    Features, FeatureColumns = FeatureFrame
+    CleanData = Features.dropna(subset=FeatureColumns + ["LogReturn"])
+    LogReturns = CleanData["LogReturn"].to_numpy()
+    Model = HiddenMarkovModel(RandomState=0)
+    ScaledMatrix = Model.FitTransformFeatures(CleanData[FeatureColumns].to_numpy())
+    Model.FitMatrix(ScaledMatrix[:1000], LogReturns[:1000])
+    # Labels that no fit would produce, as if inherited from a model of a different period
+    Model.StateMapping = {State: "Sideway" for State in Model.StateMapping}
+
+    _EvaluateFold(Model, ScaledMatrix, LogReturns, (1, 1000, 2000, 2000, 2500), WarmStart=True)
+    assert Model.FitReport["WarmStart"]
+    States = Model.Model.predict(ScaledMatrix[1000:2000])
+    Means = {State: LogReturns[1000:2000][States == State].mean() for State in np.unique(States)}
+    assert Model.StateMapping[max(Means, key=Means.get)] == "Uptrend"
+    assert Model.StateMapping[min(Means, key=Means.get)] == "Downtrend"
@@ -0,0 +1,39 @@
+import os
+import threading
+from unittest import mock
+
+import pytest
+
+from HiddenMarkovModel import HiddenMarkovModel
+from ModelRegistry import ModelRegistry
+from PerformanceBenchmark import BuildFeatureFrame, GenerateSyntheticOhlcv
+
+pytestmark = pytest.mark.filterwarnings("ignore::RuntimeWarning", "ignore::FutureWarning")
+
+
+def test_concurrent_saves_of_one_key_leave_a_loadable_model(tmp_path):
+    Features, FeatureColumns = BuildFeatureFrame(GenerateSyntheticOhlcv(1500, Seed=6))
+    Model = HiddenMarkovModel(Iterations=20, RandomState=0)
+    Model.Fit(Features, FeatureColumns)
+    Registry = ModelRegistry(str(tmp_path))
+    Key = ("SPY", "15m", FeatureColumns, Features.index[0], Features.index[-1])
+
+    Sources, Replace = [], os.replace
+
+    def RecordingReplace(Source, Destination):
+        Sources.append(Source)
+        Replace(Source, Destination)
+
+    Threads = [threading.Thread(target=Registry.Save, args=(Model, *Key)) for _ in range(8)]
+    with mock.patch("ModelRegistry.os.replace", RecordingReplace):
+        for Thread in Threads:
+            Thread.start()
+        for Thread in Threads:
+            Thread.join()
+
+    assert len(set(Sources)) == len(Threads)
+
+    assert [Path.name for Path in tmp_path.iterdir()] == [Registry.GetPath(*Key).rsplit("/", 1)[-1]]
+    Loaded = Registry.Load(*Key)
+    assert (Loaded.PredictRegime(Features, FeatureColumns)["Regime"].fillna("")
+            == Model.PredictRegime(Features, FeatureColumns)["Regime"].fillna("")).all()
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from PerformanceBenchmark import AddRegressionThresholds, CheckRegressions
+
+
+def MakeReport(**Values):
+    Result = {"Benchmark": "Decode", "Bars": 1000, "Seconds": 1.0, "PlantedAccuracy": 0.8, "BestMappingAccuracy": 0.9}
+    return {"Results": [{**Result, **Values}]}
+
+
+def test_unchanged_report_passes():
+    Baseline = AddRegressionThresholds(MakeReport())
+    assert CheckRegressions(MakeReport(), Baseline) == []
+
+
+def test_slower_or_less_accurate_results_are_reported():
+    Baseline = AddRegressionThresholds(MakeReport())
+    Regressions = CheckRegressions(MakeReport(Seconds=2.0, PlantedAccuracy=0.5), Baseline)
+    assert len(Regressions) == 2
+    assert "exceeds" in Regressions[0] and "PlantedAccuracy 0.500 below" in Regressions[1]
+
+
+@pytest.mark.parametrize("Value", [np.nan, None, np.inf], ids=["nan", "none", "inf"])
+def test_missing_accuracy_is_a_regression(Value):
+    Baseline = AddRegressionThresholds(MakeReport())
+    Regressions = CheckRegressions(MakeReport(BestMappingAccuracy=Value), Baseline)
+    assert len(Regressions) == 1 and "BestMappingAccuracy is missing" in Regressions[0]
+
+
+def test_absent_accuracy_is_a_regression():
+    Baseline = AddRegressionThresholds(MakeReport())
+    Report = MakeReport()
+    del Report["Results"][0]["PlantedAccuracy"]
+    assert len(CheckRegressions(Report, Baseline)) == 1
+
+
+def test_no_floor_without_a_baseline_accuracy():
+    Baseline = AddRegressionThresholds(MakeReport(BestMappingAccuracy=np.nan))
+    assert CheckRegressions(MakeReport(BestMappingAccuracy=np.nan), Baseline) == []
@@ -0,0 +1,52 @@
+import pytest
+
+from AnalysisPipeline import AnalysisPipeline
+from PerformanceBenchmark import GenerateSyntheticOhlcv
+from ResultsStore import ResultsStore
+
+pytestmark = pytest.mark.filterwarnings("ignore::UserWarning", "ignore::RuntimeWarning", "ignore::FutureWarning")
+
+
+@pytest.fixture(scope="module")
+def Results():
+    Pipeline = AnalysisPipeline(Iterations=20)
+    Data = GenerateSyntheticOhlcv(1200, Seed=4).drop(columns="PlantedRegime")
+    return [
+        Pipeline.Run(Data, TrailingTakeProfit=TakeProfit, RiskPercent=0.05, StateProbabilityThreshold=0.5)
+        for TakeProfit in (0.02, 0.04)
+    ]
+
+
+def RegimeParts(Store, Ticker):
+    return list((Store.StoreDirectory / "Regimes" / Ticker).glob("*.parquet"))
+
+
+def test_regimes_are_stored_once_per_regime_key(tmp_path, Results):
+    Store = ResultsStore(tmp_path)
+    RunIds = [
+        Store.Append("^GSPC", "15m", RegimeData, Metrics, Stats, {"TrailingTakeProfit": TakeProfit},
+                     RegimeKey=RegimeData.attrs["RegimeKey"])
+        for (RegimeData, Metrics, Stats), TakeProfit in zip(Results, (0.02, 0.04))
+    ]
+    assert len(RegimeParts(Store, "Ticker=_GSPC")) == 1
+
+    Runs = Store.Runs(["^GSPC"])
+    assert Runs["RunId"].tolist() == RunIds
+    assert Runs["RegimeKey"].nunique() == 1
+
+    RegimeData = Results[0][0].dropna(subset=["Regime"])
+    Regimes = Store.Regimes(["^GSPC"], RunIds=RunIds[1:])
+    assert len(Regimes) == len(RegimeData)
+    assert (Regimes["Regime"].astype(str).to_numpy() == RegimeData["Regime"].to_numpy()).all()
+
+    Spans = Store.RegimeSpans(["^GSPC"], RunIds=RunIds)
+    assert Spans["Bars"].sum() == len(RegimeData)
+    assert len(Store.EquityCurves(["^GSPC"])["RunId"].unique()) == 2
+
+
+def test_regime_key_defaults_to_the_regime_content(tmp_path, Results):
+    Store = ResultsStore(tmp_path)
+    for RegimeData, Metrics, Stats in Results:
+        Store.Append("SPY", "15m", RegimeData, Metrics, Stats)
+    assert len(RegimeParts(Store, "Ticker=SPY")) == 1
+    assert len(Store.Runs(["SPY"])) == 2